@@ -0,0 +1,75 @@
+"""How long a cold ``import chat_bot_ui_handler`` takes, and what it pulls in.
+
+Each run is a fresh interpreter with ``-X importtime``, so nothing is cached
+in sys.modules between runs.
+
+    python benchmarks/import_time.py                  # 5 runs
+    python benchmarks/import_time.py -m chat_bot_ui_handler.gemini.handler -n 10
+
+The report gives the median cumulative import time of the module and the
+heaviest modules it imported. The run fails (exit code 1) when the median is
+over ``--max-ms``, or when importing the bare package loads any of HEAVY,
+which belong behind the lazy attributes in ``__init__``.
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Must not be loaded by ``import chat_bot_ui_handler`` alone.
+HEAVY = ('playwright', 'browser_manager', 'custom_logger', 'jebin_lib', 'requests', 'PIL')
+
+
+def measure(module):
+	"""One cold import. Returns {module: cumulative microseconds} in import order"""
+	proc = subprocess.run(
+		[sys.executable, '-X', 'importtime', '-c', f"import {module}"],
+		capture_output=True, text=True, cwd=ROOT,
+	)
+	if proc.returncode != 0:
+		raise RuntimeError(f"import {module} failed:\n{proc.stderr.strip().splitlines()[-1]}")
+
+	timings = {}
+	for line in proc.stderr.splitlines():
+		# "import time: self [us] | cumulative | imported package"
+		if not line.startswith('import time:') or 'cumulative' in line:
+			continue
+		_, cumulative, name = line[len('import time:'):].split('|')
+		timings[name.strip()] = int(cumulative)
+	return timings
+
+
+def main(argv=None):
+	parser = argparse.ArgumentParser(description="Benchmark the cold import of the package")
+	parser.add_argument('-m', '--module', default='chat_bot_ui_handler')
+	parser.add_argument('-n', '--runs', type=int, default=5)
+	parser.add_argument('--max-ms', type=float, default=50.0)
+	parser.add_argument('--top', type=int, default=10, help="heaviest imports to list")
+	args = parser.parse_args(argv)
+
+	runs = [measure(args.module) for _ in range(args.runs)]
+	median_ms = statistics.median(run.get(args.module, 0) for run in runs) / 1000
+	last = runs[-1]
+
+	print(f"import {args.module}: {median_ms:.1f}ms median of {args.runs}, {len(last)} modules")
+	for name, us in sorted(last.items(), key=lambda item: -item[1])[:args.top]:
+		print(f"  {us / 1000:8.1f}ms  {name}")
+
+	failures = []
+	if median_ms > args.max_ms:
+		failures.append(f"{median_ms:.1f}ms > {args.max_ms:.1f}ms")
+	if args.module == 'chat_bot_ui_handler':
+		loaded = sorted({name.split('.')[0] for name in last} & set(HEAVY))
+		if loaded:
+			failures.append(f"the bare package import loaded {', '.join(loaded)}")
+	for message in failures:
+		print(f"REGRESSION {message}")
+	return 1 if failures else 0
+
+
+if __name__ == '__main__':
+	sys.exit(main())
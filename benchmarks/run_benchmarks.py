@@ -0,0 +1,157 @@
+"""Offline latency benchmark for every handler, against the stub pages.
+
+Each handler runs its real flow (load_url, login, fill_prompt, send,
+wait_for_generation, get_response) on a headless Chromium pointed at its stub
+page from stub_server.py, so timings change only when the code does. Google
+sign-in is skipped; file uploads are not exercised.
+
+    python benchmarks/run_benchmarks.py                       # every handler, 3 runs
+    python benchmarks/run_benchmarks.py -H gemini,brave -n 5 --token-ms 10
+    python benchmarks/run_benchmarks.py --update              # record new thresholds
+
+The report gives the median wall-clock seconds per step and in total for each
+handler. Medians are compared with thresholds.json; any that exceed their
+threshold by more than its ``tolerance`` fail the run (exit code 1), and so
+does a handler with no recorded total: an empty baseline would pass anything.
+Steps without a threshold are reported but not checked. ``--update`` records
+the thresholds from this run; run it on the machine that runs the check.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from chat_bot_ui_handler.registry import HANDLERS, get_handler  # noqa: E402
+from stub_server import STUBS, StubServer  # noqa: E402
+
+PROMPT = "Describe the scene in one sentence."
+THRESHOLDS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'thresholds.json')
+
+
+def stub_handler(name, url):
+	"""The handler class, pointed at its stub page and without Google sign-in"""
+	handler_cls = get_handler(name)
+	return type(f"Stub{handler_cls.__name__}", (handler_cls,), {
+		'get_url': lambda self: url,
+		'need_google_login': lambda self: False,
+	})
+
+
+def run_handler(browser, name, url, runs):
+	"""Run one handler `runs` times. Returns a list of (ok, step timings, wall seconds)"""
+	from browser_manager.browser_config import BrowserConfig
+
+	handler = stub_handler(name, url)(BrowserConfig())
+	handler.response_cache = None
+	results = []
+	for _ in range(runs):
+		context = browser.new_context()
+		page = context.new_page()
+		started = time.monotonic()
+		try:
+			answer = handler.process(page, PROMPT, None, None)
+		finally:
+			wall = time.monotonic() - started
+			context.close()
+		results.append((bool(answer), dict(handler.step_timings), wall))
+	return results
+
+
+def summarize(results):
+	steps = {}
+	for _, timings, _ in results:
+		for step, seconds in timings.items():
+			steps.setdefault(step, []).append(seconds)
+	summary = {step: statistics.median(values) for step, values in steps.items()}
+	summary['total'] = statistics.median(wall for _, _, wall in results)
+	return summary
+
+
+def check(name, summary, thresholds):
+	"""Messages for every step of this handler that is over its threshold"""
+	tolerance = thresholds.get('tolerance', 0.15)
+	limits = thresholds.get('handlers', {}).get(name, {})
+	if 'total' not in limits:
+		return [f"{name}: no baseline total in thresholds.json; record one with --update"]
+	failures = []
+	for step, limit in limits.items():
+		if step in summary and summary[step] > limit * (1 + tolerance):
+			failures.append(f"{name}.{step}: {summary[step]:.2f}s > {limit:.2f}s (+{tolerance:.0%})")
+	return failures
+
+
+def print_report(report):
+	for name, (summary, ok, runs) in report.items():
+		steps = " ".join(f"{step}={seconds:.2f}s" for step, seconds in summary.items() if step != 'total')
+		print(f"{name:<14} {ok}/{runs} ok  total={summary['total']:.2f}s  {steps}")
+
+
+def main(argv=None):
+	parser = argparse.ArgumentParser(description="Benchmark handlers against local stub pages")
+	parser.add_argument('-H', '--handlers', default=','.join(HANDLERS), help="comma separated, default all")
+	parser.add_argument('-n', '--runs', type=int, default=3)
+	parser.add_argument('--token-ms', type=int, default=30)
+	parser.add_argument('--tokens', type=int, default=60)
+	parser.add_argument('--think-ms', type=int, default=300)
+	parser.add_argument('--thresholds', default=THRESHOLDS)
+	parser.add_argument('--update', action='store_true', help="write this run's medians as the thresholds")
+	parser.add_argument('--json', help="also write the report to this file")
+	args = parser.parse_args(argv)
+
+	names = [name.strip() for name in args.handlers.split(',') if name.strip()]
+	unknown = [name for name in names if name not in HANDLERS or name not in STUBS]
+	if unknown:
+		parser.error(f"unknown handlers: {', '.join(unknown)}")
+
+	from playwright.sync_api import sync_playwright
+
+	report = {}
+	with StubServer(token_ms=args.token_ms, tokens=args.tokens, think_ms=args.think_ms) as server, \
+			sync_playwright() as playwright:
+		browser = playwright.chromium.launch(headless=True)
+		try:
+			for name in names:
+				results = run_handler(browser, name, server.url_for(name), args.runs)
+				report[name] = (summarize(results), sum(ok for ok, _, _ in results), len(results))
+		finally:
+			browser.close()
+
+	print_report(report)
+
+	if args.json:
+		with open(args.json, 'w') as f:
+			json.dump({name: {'median': summary, 'ok': ok, 'runs': runs}
+				for name, (summary, ok, runs) in report.items()}, f, indent=2)
+
+	try:
+		with open(args.thresholds) as f:
+			thresholds = json.load(f)
+	except FileNotFoundError:
+		thresholds = {'tolerance': 0.15, 'handlers': {}}
+
+	if args.update:
+		for name, (summary, _, _) in report.items():
+			thresholds.setdefault('handlers', {})[name] = {
+				step: round(seconds, 2) for step, seconds in summary.items()
+			}
+		with open(args.thresholds, 'w') as f:
+			json.dump(thresholds, f, indent=2, sort_keys=True)
+			f.write("\n")
+		print(f"Thresholds written to {args.thresholds}")
+		return 0
+
+	failures = [message for name, (summary, _, _) in report.items() for message in check(name, summary, thresholds)]
+	failures += [f"{name}: {runs - ok}/{runs} runs failed" for name, (_, ok, runs) in report.items() if ok < runs]
+	for message in failures:
+		print(f"REGRESSION {message}")
+	return 1 if failures else 0
+
+
+if __name__ == '__main__':
+	sys.exit(main())
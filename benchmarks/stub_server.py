@@ -0,0 +1,320 @@
+"""Local stand-ins for every chatbot page, for offline benchmarks.
+
+Each stub is a minimal page carrying the elements its handler's selectors
+look for: the input, the send control, a stop button or "answering" marker
+while the answer is written, the result container, and whatever the handler
+waits for to know it is done (Pally's Copy button, Brave's
+``.answering-label`` reading Finished, DuckDuckGo's ``data-activeresponse``,
+and so on). Sending a prompt streams a canned answer into the result one
+token at a time.
+
+    python benchmarks/stub_server.py --port 8765 --token-ms 30
+
+    http://127.0.0.1:8765/gemini          one page per key in STUBS
+    http://127.0.0.1:8765/gemini?token_ms=5&tokens=200&think_ms=500
+
+Query parameters override the server defaults per page load:
+    token_ms - delay between streamed tokens
+    tokens   - answer length in tokens
+    think_ms - delay before the first token
+"""
+
+import argparse
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+# Per handler:
+#   body       - static markup: input, send control, anything login() clicks
+#   submit     - selector clicked to send, or 'enter' to send on Enter in the input
+#   prompt     - selector the prompt is read from
+#   container  - where answer elements are appended
+#   answer     - markup for one answer; its [data-stream] element receives the text
+#   busy       - markup shown while generating, removed at the end
+#   done       - markup added when the answer is complete
+#   start      - optional JS run when a prompt is sent
+#   finish     - optional JS run at the end, with the answer element as `answer`
+STUBS = {
+	'gemini': {
+		'body': '''<rich-textarea><div class="ql-editor" contenteditable="true"></div></rich-textarea>
+			<button aria-label="Send message">Send</button><div id="chat"></div><div id="busy"></div>''',
+		'submit': 'button[aria-label="Send message"]',
+		'prompt': 'div.ql-editor',
+		'container': '#chat',
+		'answer': '<model-response><message-content data-stream></message-content></model-response>',
+		'busy': '<button aria-label="Stop response">Stop</button>',
+		'done': '',
+	},
+	'aistudio': {
+		'body': '''<textarea></textarea><button type="submit">Run</button>
+			<div id="chat"></div><div id="busy"></div>''',
+		'submit': 'button[type="submit"]',
+		'prompt': 'textarea',
+		'container': '#chat',
+		'answer': '<ms-chat-turn><div data-turn-role="Model" data-stream></div></ms-chat-turn>',
+		'busy': '<span class="generating">Running</span>',
+		'done': '',
+	},
+	'search_google': {
+		'body': '''<button>AI Mode</button><textarea></textarea><div id="chat"></div><div id="busy"></div>''',
+		'submit': 'enter',
+		'prompt': 'textarea',
+		'container': '#chat',
+		'answer': '<div data-container-id="main-col" data-stream></div>',
+		'busy': '',
+		'done': '',
+	},
+	'pally': {
+		'body': '''<form onsubmit="return false"><input name="description">
+			<button type="submit">Generate</button></form><div id="chat"></div><div id="busy"></div>''',
+		'submit': 'button[type="submit"]',
+		'prompt': 'input[name="description"]',
+		'container': '#chat',
+		'answer': '<div><p data-stream></p></div>',
+		'busy': '',
+		'done': '',
+		'finish': "answer.insertAdjacentHTML('beforeend', '<button type=\"button\">Copy</button>');",
+	},
+	'qwen': {
+		'body': '''<div class="message-input-container"><textarea></textarea></div>
+			<button class="send-button">Send</button><div id="chat"></div><div id="busy"></div>''',
+		'submit': '.send-button',
+		'prompt': '.message-input-container textarea',
+		'container': '#chat',
+		'answer': '<div class="response-message-content" data-stream></div>',
+		'busy': '',
+		'done': '',
+		'finish': "document.querySelector('.send-button').disabled = true;",
+	},
+	'perplexity': {
+		'body': '''<textarea id="ask-input"></textarea><button aria-label="Submit">Ask</button>
+			<div id="chat"></div><div id="busy"></div>''',
+		'submit': 'button[aria-label="Submit"]',
+		'prompt': '#ask-input',
+		'container': '#chat',
+		'answer': '<div id="markdown-content-0" data-stream></div>',
+		'busy': '',
+		'done': '',
+		'finish': "document.querySelector('button[aria-label=\"Submit\"]').disabled = true;",
+	},
+	'meta': {
+		'body': '''<div role="textbox" contenteditable="true"></div><div aria-label="Send" role="button">Send</div>
+			<div aria-label="Add media and more" aria-disabled="false">+</div><div id="chat"></div><div id="busy"></div>''',
+		'submit': 'div[aria-label="Send"]',
+		'prompt': 'div[role="textbox"]',
+		'container': '#chat',
+		'answer': '<div dir="auto" data-stream></div>',
+		'busy': '',
+		'done': '',
+		'start': "document.querySelector('div[aria-label=\"Add media and more\"]').setAttribute('aria-disabled', 'true');",
+		'finish': "document.querySelector('div[aria-label=\"Add media and more\"]').setAttribute('aria-disabled', 'false');",
+	},
+	'grok': {
+		'body': '''<div contenteditable="true"></div><button type="submit">Send</button>
+			<div id="last-reply-container"></div><div id="busy"></div>''',
+		'submit': 'button[type="submit"]',
+		'prompt': 'div[contenteditable="true"]',
+		'container': '#last-reply-container',
+		'answer': '<div class="message-bubble" data-stream></div>',
+		'busy': '',
+		'done': '<button aria-label="Enter voice mode">Voice</button>',
+	},
+	'copilot': {
+		'body': '''<textarea id="userInput"></textarea><button aria-label="Submit message">Send</button>
+			<div id="chat"></div><div id="busy"></div>''',
+		'submit': 'button[aria-label="Submit message"]',
+		'prompt': '#userInput',
+		'container': '#chat',
+		'answer': '<div data-content="ai-message"><p data-stream></p></div>',
+		'busy': '',
+		'done': '<button aria-label="Talk to Copilot">Talk</button>',
+	},
+	'bing': {
+		'body': '''<input id="sb_form_q"><button id="sb_form_go">Go</button><div id="chat"></div><div id="busy"></div>''',
+		'submit': '#sb_form_go',
+		'prompt': '#sb_form_q',
+		'container': '#chat',
+		'answer': '<div class="answer_container" data-stream></div>',
+		'busy': '',
+		'done': '',
+	},
+	'mistral': {
+		'body': '''<div contenteditable="true"></div><button type="submit">Send</button>
+			<div id="chat"></div><div id="busy"></div>''',
+		'submit': 'button[type="submit"]',
+		'prompt': 'div[contenteditable="true"]',
+		'container': '#chat',
+		'answer': '<div data-message-part-type="answer" data-stream></div>',
+		'busy': '',
+		'done': '<button aria-label="Voice Mode">Voice</button>',
+	},
+	'moondream': {
+		'body': '''<main><div id="image-container"></div><button type="button">Caption</button>
+			<form id="playground-form" onsubmit="return false"><button data-slot="button" type="button"><svg width="10" height="10"><rect width="10" height="10"/></svg></button></form>
+			<div id="chat"></div><div id="busy"></div></main>''',
+		'submit': '#playground-form button[data-slot="button"]',
+		'prompt': None,
+		'container': '#chat',
+		'answer': '<div class="break-words" data-stream></div>',
+		'busy': '',
+		'done': '<button data-slot="button" type="button">Show Code</button>',
+	},
+	'brave': {
+		'body': '''<textarea id="tap-input-field"></textarea><button aria-label="Ask">Ask</button>
+			<div class="answering-label"></div><div id="chat"></div><div id="busy"></div>''',
+		'submit': 'button[aria-label="Ask"]',
+		'prompt': '#tap-input-field',
+		'container': '#chat',
+		'answer': '<div class="llm-output" data-stream></div>',
+		'busy': '',
+		'done': '',
+		'start': "document.querySelector('.answering-label').innerText = 'Answering';",
+		'finish': "document.querySelector('.answering-label').innerText = 'Finished';",
+	},
+	'duckduckgo': {
+		'body': '''<main><textarea name="user-prompt"></textarea><button type="submit">Send</button>
+			<div id="chat"></div><div id="busy"></div></main>''',
+		'submit': 'main button[type="submit"]',
+		'prompt': 'textarea[name="user-prompt"]',
+		'container': '#chat',
+		'answer': '<div data-activeresponse="true"><p data-stream></p></div>',
+		'busy': '<div data-activeresponse="false"><span>Thinking</span></div>',
+		'done': '',
+	},
+}
+
+_PAGE = """<!doctype html>
+<html><head><meta charset="utf-8"><title>{name} stub</title>
+<style>[contenteditable] {{ min-height: 1.5em; min-width: 20em; border: 1px solid #999; }}</style>
+</head>
+<body>
+{body}
+<script>
+const STUB = {stub};
+const SETTINGS = {settings};
+const WORDS = "The scene shows a quiet street at dusk where a cyclist passes a row of lit shop windows while rain begins to fall".split(' ');
+
+function readPrompt() {{
+	if (!STUB.prompt) return '';
+	const el = document.querySelector(STUB.prompt);
+	return el ? (el.value !== undefined ? el.value : el.innerText) : '';
+}}
+
+function generate() {{
+	readPrompt();
+	if (STUB.start) new Function(STUB.start)();
+	document.querySelector('#busy').innerHTML = STUB.busy;
+	const holder = document.createElement('div');
+	holder.innerHTML = STUB.answer;
+	const answer = holder.firstElementChild;
+	document.querySelector(STUB.container).appendChild(answer);
+	const target = answer.matches('[data-stream]') ? answer : answer.querySelector('[data-stream]');
+	let n = 0;
+	const tick = () => {{
+		if (n >= SETTINGS.tokens) {{
+			document.querySelector('#busy').innerHTML = '';
+			if (STUB.done) document.body.insertAdjacentHTML('beforeend', STUB.done);
+			if (STUB.finish) new Function('answer', STUB.finish)(answer);
+			return;
+		}}
+		target.textContent += (n ? ' ' : '') + WORDS[n % WORDS.length];
+		n++;
+		setTimeout(tick, SETTINGS.token_ms);
+	}};
+	setTimeout(tick, SETTINGS.think_ms);
+}}
+
+if (STUB.submit === 'enter') {{
+	document.querySelector(STUB.prompt).addEventListener('keydown', e => {{
+		if (e.key === 'Enter') {{ e.preventDefault(); generate(); }}
+	}});
+}} else {{
+	document.querySelector(STUB.submit).addEventListener('click', e => {{ e.preventDefault(); generate(); }});
+}}
+</script>
+</body></html>
+"""
+
+
+def render(name, settings):
+	stub = dict(STUBS[name])
+	body = stub.pop('body')
+	return _PAGE.format(name=name, body=body, stub=json.dumps(stub), settings=json.dumps(settings))
+
+
+class StubServer:
+	"""Serves every stub on a background thread"""
+
+	def __init__(self, host='127.0.0.1', port=0, token_ms=30, tokens=60, think_ms=300):
+		self.defaults = {'token_ms': token_ms, 'tokens': tokens, 'think_ms': think_ms}
+		defaults = self.defaults
+
+		class _Handler(BaseHTTPRequestHandler):
+			def do_GET(self):
+				url = urlparse(self.path)
+				name = url.path.strip('/')
+				if name not in STUBS:
+					self.send_error(404)
+					return
+				query = parse_qs(url.query)
+				settings = {
+					key: int(query[key][0]) if key in query else value
+					for key, value in defaults.items()
+				}
+				body = render(name, settings).encode('utf-8')
+				self.send_response(200)
+				self.send_header('Content-Type', 'text/html; charset=utf-8')
+				self.send_header('Content-Length', str(len(body)))
+				self.end_headers()
+				self.wfile.write(body)
+
+			def log_message(self, format, *args):
+				pass
+
+		self.httpd = ThreadingHTTPServer((host, port), _Handler)
+		self.thread = None
+
+	@property
+	def base_url(self):
+		host, port = self.httpd.server_address[:2]
+		return f"http://{host}:{port}"
+
+	def url_for(self, name):
+		return f"{self.base_url}/{name}"
+
+	def start(self):
+		self.thread = threading.Thread(target=self.httpd.serve_forever, name="stub-server", daemon=True)
+		self.thread.start()
+		return self
+
+	def stop(self):
+		self.httpd.shutdown()
+		self.httpd.server_close()
+
+	def __enter__(self):
+		return self.start()
+
+	def __exit__(self, *exc):
+		self.stop()
+
+
+def main(argv=None):
+	parser = argparse.ArgumentParser(description="Serve stub chatbot pages")
+	parser.add_argument('--host', default='127.0.0.1')
+	parser.add_argument('--port', type=int, default=8765)
+	parser.add_argument('--token-ms', type=int, default=30)
+	parser.add_argument('--tokens', type=int, default=60)
+	parser.add_argument('--think-ms', type=int, default=300)
+	args = parser.parse_args(argv)
+
+	server = StubServer(args.host, args.port, args.token_ms, args.tokens, args.think_ms)
+	print(f"Serving {', '.join(STUBS)} on {server.base_url}")
+	try:
+		server.httpd.serve_forever()
+	except KeyboardInterrupt:
+		pass
+
+
+if __name__ == '__main__':
+	main()
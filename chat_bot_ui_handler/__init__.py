@@ -1,32 +1,75 @@
 # chat_bot_ui_handler/__init__.py
 """
 Chat Bot UI Handler - A package for automating various chatbot UI interactions
+
+Importing the package loads nothing else: each name below is imported on
+first access (PEP 562), so ``from chat_bot_ui_handler import GeminiUIChat``
+imports the Gemini handler and the base flow, not the other handlers.
+The .env file is loaded when the first handler is built, or by calling
+``load_env()``.
 """
 
 __version__ = "0.1.0"
 
-# Import main functions for easy access
-from .base_ui_flow import BaseUIChat
-from .aistudio.handler import AIStudioUIChat
-from .search_google.ai_mode import GoogleAISearchChat
-from .pally.handler import PallyUIChat
-from .qwen.handler import QwenUIChat
-from .perplexity.handler import PerplexityUIChat
-from .gemini.handler import GeminiUIChat
-from .meta.handler import MetaUIChat
-from .grok.handler import GrokUIChat
-from .copilot.handler import CopilotUIChat
-from .bing.handler import BingUIChat
-from .mistral.handler import MistralUIChat
-from .moondream.handler import MoonDream
-from .brave.handler import BraveAISearch
-from .duckduckgo.handler import DuckDuckGoAISearch
-
-from jebin_lib import load_env
-load_env()
+import importlib
+
+from .env import load_env
+from .registry import HANDLERS, get_handler, handler_names
+
+# Attribute -> module it is imported from on first access
+_LAZY = {
+    "BaseUIChat": ".base_ui_flow",
+    "AsyncBaseUIChat": ".async_base_ui_flow",
+    "HandlerPool": ".pool",
+    "MultiChat": ".multi_chat",
+    "ChatScheduler": ".scheduler",
+    "ProcessChatPool": ".process_pool",
+    "ProfileTemplates": ".profiles",
+    "Conversation": ".conversation",
+    "ChatResult": ".metrics",
+    "prometheus_text": ".metrics",
+    "serve_metrics": ".metrics",
+    "ResponseCache": ".response_cache",
+    "MemoryBackend": ".response_cache",
+    "SQLiteBackend": ".response_cache",
+    "SpecRegistry": ".specs",
+    "spec_handler": ".specs",
+    "ResourcePolicy": ".resources",
+    "AssetCache": ".asset_cache",
+}
+_LAZY.update({
+    target.split(":")[1]: target.split(":")[0] for target in HANDLERS.values()
+})
+
+
+def __getattr__(name):
+    module_name = _LAZY.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY))
+
 
 __all__ = [
     "BaseUIChat",
+    "AsyncBaseUIChat",
+    "HandlerPool",
+    "MultiChat",
+    "ChatScheduler",
+    "ProcessChatPool",
+    "ProfileTemplates",
+    "Conversation",
+    "ChatResult",
+    "prometheus_text",
+    "serve_metrics",
+    "ResponseCache",
+    "MemoryBackend",
+    "SQLiteBackend",
     "AIStudioUIChat",
     "GoogleAISearchChat",
     "PallyUIChat",
@@ -40,5 +83,10 @@ __all__ = [
     "MistralUIChat",
     "MoonDream",
     "BraveAISearch",
-    "DuckDuckGoAISearch"
-]
\ No newline at end of file
+    "DuckDuckGoAISearch",
+    "SpecRegistry",
+    "spec_handler",
+    "get_handler",
+    "handler_names",
+    "load_env"
+]
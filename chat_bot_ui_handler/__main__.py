@@ -0,0 +1,29 @@
+"""Command line entry points.
+
+    python -m chat_bot_ui_handler batch prompts.jsonl -o answers.jsonl --handler pally
+    python -m chat_bot_ui_handler handlers
+"""
+
+import argparse
+import sys
+
+
+def main(argv=None):
+	parser = argparse.ArgumentParser(prog="python -m chat_bot_ui_handler")
+	commands = parser.add_subparsers(dest='command', required=True)
+
+	from chat_bot_ui_handler import batch
+	batch.add_arguments(commands.add_parser('batch', help="answer a JSONL file of prompts, resumably"))
+	commands.add_parser('handlers', help="list the handler names")
+
+	args = parser.parse_args(argv)
+	if args.command == 'batch':
+		return batch.run(args)
+	if args.command == 'handlers':
+		from chat_bot_ui_handler.registry import handler_names
+		print("\n".join(handler_names()))
+		return 0
+
+
+if __name__ == '__main__':
+	sys.exit(main())
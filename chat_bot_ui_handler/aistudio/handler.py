@@ -1,10 +1,11 @@
 from functools import partial
 from chat_bot_ui_handler.base_ui_flow import BaseUIChat
 from custom_logger import logger_config
-import os
 from playwright.sync_api import expect
 
 class AIStudioUIChat(BaseUIChat):
+	upload_via_attach_folder = True
+
 	def __init__(self, config=None):
 		super().__init__(config)
 
@@ -22,43 +23,51 @@ class AIStudioUIChat(BaseUIChat):
 			'input': 'textarea',
 			'send_button': 'button[type="submit"]',
 			'wait_selector': 'button[type="submit"]',
+			'stop_button': 'button[type="submit"]:has-text("Stop")',
+			# "Remove image", "Remove video", "Remove document" on each attachment
+			'upload_done': 'button[aria-label^="Remove "]',
 			'result': 'ms-chat-turn div[data-turn-role="Model"]'
 		}
 
 	def _dismiss_popup(self, page):
 		"""Dismiss any popup dialogs that might appear"""
+		self.save_screenshot(page)
+		popups = {'close': 'button[aria-label="close"]', 'got_it': 'button:has-text("Got it")'}
+		# The dialogs open a few seconds after load; wait for them that long at most.
+		state = self.wait_for_visible(page, popups, 6000)
 		try:
-			self.save_screenshot(page)
-			page.wait_for_timeout(2000)
-			close_button = page.locator('button[aria-label="close"]')
-			close_button.click(timeout=4000)
-			page.wait_for_timeout(2000)
-			self.save_screenshot(page)
+			if state['close']['visible']:
+				page.locator(popups['close']).click(timeout=4000)
+				page.wait_for_timeout(2000)
+				self.save_screenshot(page)
+				state = self.probe(page, popups)
 		except Exception:
 			pass
 
 		try:
-			self.save_screenshot(page)
-			page.locator('button:has-text("Got it")').click()
-			page.wait_for_timeout(2000)
-			self.save_screenshot(page)
-			page.keyboard.press("Escape")
-			page.wait_for_timeout(2000)
-			self.save_screenshot(page)
+			if state['got_it']['visible']:
+				page.locator(popups['got_it']).click(timeout=4000)
+				page.wait_for_timeout(2000)
+				self.save_screenshot(page)
+				page.keyboard.press("Escape")
+				page.wait_for_timeout(2000)
+				self.save_screenshot(page)
 		except Exception:
 			pass
 
 	def _acknowledge_copyright(self, page) -> None:
 		"""Acknowledge copyright notice if it appears"""
+		selector = 'button[aria-label="Agree to the copyright acknowledgement"]'
+		self.save_screenshot(page)
+		if not self.wait_for_visible(page, [selector], 4000)[selector]['visible']:
+			self.logger.debug("No copyright dialog to acknowledge")
+			return
 		try:
-			self.save_screenshot(page)
-			page.wait_for_timeout(2000)
-			acknowledge_button = page.locator('button[aria-label="Agree to the copyright acknowledgement"]')
-			acknowledge_button.click(timeout=2000)
+			page.locator(selector).click(timeout=2000)
 			page.wait_for_timeout(2000)
 			self.save_screenshot(page)
 		except Exception as e:
-			self.logger.debug(f"No copyright dialog to acknowledge: {e}")
+			self.logger.debug(f"Could not acknowledge copyright dialog: {e}")
 
 	def login(self, page):
 		"""Handle initial setup after page load"""
@@ -93,30 +102,14 @@ class AIStudioUIChat(BaseUIChat):
 				self.get_browser_manager().launcher.choose_file_via_xdotool, 
 				config=self.config
 			)
+			before = self.attachment_count(page)
 			choose_file_via_xdotool(file_path=file_path)
 			self.save_screenshot(page)
 			self._acknowledge_copyright(page)
 			self.save_screenshot(page)
+			self.wait_for_upload(page, before, cap_ms=25000)
 			self.logger.info("File uploaded successfully")
-			page.wait_for_timeout(5000)
 			self.save_screenshot(page)
-			# Wait for upload completion (look for remove buttons)
-			file_extension = os.path.splitext(file_path)[1].lower()
-			removal_selectors = {
-				".mp4": 'button[aria-label="Remove video"]',
-				".mov": 'button[aria-label="Remove video"]',
-				".jpg": 'button[aria-label="Remove image"]',
-				".jpeg": 'button[aria-label="Remove image"]',
-				".png": 'button[aria-label="Remove image"]',
-				".pdf": 'button[aria-label="Remove document"]',
-			}
-
-			removal_selector = removal_selectors.get(file_extension)
-			if removal_selector:
-				try:
-					page.wait_for_selector(removal_selector, timeout=20000)
-				except Exception:
-					pass
 
 			# Close dialogs
 			page.keyboard.press("Escape")
@@ -154,13 +147,3 @@ class AIStudioUIChat(BaseUIChat):
 		page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
 		# send_button.click()
 		self.save_screenshot(page)
-
-	def post_response_wait(self, page):
-		try: retry = int(os.getenv("POST_RESPONSE_WAIT_RETRY") or 50)
-		except Exception: retry = 50
-		for i in range(retry):
-			try:
-				self.logger.info(f"Waiting for response... iteration {i}", overwrite=True)
-				page.wait_for_timeout(5000)
-			except Exception:
-				pass
\ No newline at end of file
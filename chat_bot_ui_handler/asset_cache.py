@@ -0,0 +1,384 @@
+"""Keep providers' static assets on disk, shared by every browser on the node.
+
+Every chat_fresh page and every new worker downloads the same JS bundles,
+stylesheets and fonts from gemini.google.com, chat.qwen.ai or perplexity.ai
+again. The browser's own cache does not help: cloned or wiped profiles start
+empty, and Playwright turns it off for pages that have routes (see
+resources.py). AssetCache answers those requests through a route instead:
+
+    cache = AssetCache()
+    cache.attach(page)     # before the page loads anything
+
+Only GET requests for scripts, stylesheets and fonts go through it. A
+response is stored when it is a 200 that its headers allow to be kept
+(no ``no-store`` or ``private``: the folder is shared by every worker and
+account; a ``Vary`` of at most Accept-Encoding) and that carries
+either a lifetime (``max-age``, ``Expires``, or a heuristic tenth of the time
+since ``Last-Modified``) or a validator (``ETag``, ``Last-Modified``). A
+fresh copy is served from disk without touching the network; a stale one is
+revalidated with ``If-None-Match``/``If-Modified-Since`` and served from disk
+on a 304, or when the revalidation fails. A request the cache cannot answer
+for any other reason is passed on as if the cache were not there.
+
+Bodies are stored once per content hash (``blobs/<2 hex>/<sha256>``) and
+the URL index is SQLite in WAL mode, so any number of worker processes can
+share one folder. Beyond ASSET_CACHE_MAX_MB the least recently used entries
+are dropped.
+
+Replay mode serves a page from a HAR recorded earlier, for benchmark runs
+that must not depend on the network or on a provider deploying new assets:
+
+    ASSET_CACHE=record  - record every request of each handler's pages into
+                          <ASSET_HAR_DIR>/<HandlerClass>.har (written when the
+                          browser context closes)
+    ASSET_CACHE=replay  - answer from that HAR; requests it does not have go
+                          to the network, or fail with ASSET_HAR_NOT_FOUND=abort
+
+Environment variables:
+    ASSET_CACHE         - off (default) | cache | record | replay
+    ASSET_CACHE_DIR     - default ~/.chat_bot_ui_handler/assets
+    ASSET_CACHE_MAX_MB  - default 512
+    ASSET_HAR_DIR       - default <ASSET_CACHE_DIR>/har
+    ASSET_HAR_NOT_FOUND - fallback (default) | abort
+"""
+
+import email.utils
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+
+from custom_logger import logger_config
+
+CACHED_TYPES = ('script', 'stylesheet', 'font')
+
+# Not replayed from disk: they describe the stored transfer, not the asset.
+_DROP_HEADERS = ('content-encoding', 'content-length', 'transfer-encoding', 'set-cookie', 'connection', 'date', 'age')
+
+
+def _cache_control(headers):
+	directives = {}
+	for part in (headers.get('cache-control') or '').lower().split(','):
+		name, _, value = part.strip().partition('=')
+		if name:
+			directives[name] = value.strip('"')
+	return directives
+
+
+def _http_date(value):
+	try:
+		return email.utils.parsedate_to_datetime(value).timestamp()
+	except Exception:
+		return None
+
+
+def freshness(headers, now=None):
+	"""Seconds a response stays fresh by its headers; 0 when it must be revalidated"""
+	now = now or time.time()
+	control = _cache_control(headers)
+	if 'no-cache' in control:
+		return 0.0
+	for directive in ('s-maxage', 'max-age'):
+		if directive in control:
+			try:
+				return max(0.0, float(control[directive]))
+			except ValueError:
+				return 0.0
+	expires = _http_date(headers.get('expires') or '')
+	if expires is not None:
+		date = _http_date(headers.get('date') or '') or now
+		return max(0.0, expires - date)
+	modified = _http_date(headers.get('last-modified') or '')
+	if modified is not None:
+		return max(0.0, (now - modified) / 10)
+	return 0.0
+
+
+def storable(status, headers):
+	"""Whether a response may be kept at all"""
+	if status != 200:
+		return False
+	control = _cache_control(headers)
+	if 'no-store' in control or 'private' in control:
+		return False
+	vary = {part.strip().lower() for part in (headers.get('vary') or '').split(',') if part.strip()}
+	if vary - {'accept-encoding'}:
+		return False
+	has_validator = headers.get('etag') or headers.get('last-modified')
+	return bool(has_validator) or freshness(headers) > 0
+
+
+class AssetCache:
+	def __init__(self, folder=None, max_bytes=None):
+		self.folder = folder or os.getenv("ASSET_CACHE_DIR") or os.path.expanduser('~/.chat_bot_ui_handler/assets')
+		if max_bytes is None:
+			try: max_bytes = int(float(os.getenv("ASSET_CACHE_MAX_MB") or 512) * 1024 * 1024)
+			except Exception: max_bytes = 512 * 1024 * 1024
+		self.max_bytes = max_bytes
+		self.hits = 0
+		self.revalidated = 0
+		self.stale = 0
+		self.misses = 0
+		self._stores = 0
+		os.makedirs(os.path.join(self.folder, 'blobs'), exist_ok=True)
+		self._lock = threading.Lock()
+		self._conn = sqlite3.connect(os.path.join(self.folder, 'index.db'), check_same_thread=False, isolation_level=None, timeout=10)
+		self._conn.execute("PRAGMA journal_mode=WAL")
+		self._conn.execute(
+			"CREATE TABLE IF NOT EXISTS assets ("
+			"url TEXT PRIMARY KEY, sha TEXT NOT NULL, size INTEGER NOT NULL, headers TEXT NOT NULL, "
+			"stored_at REAL NOT NULL, fresh_until REAL NOT NULL, used_at REAL NOT NULL)"
+		)
+		self._conn.execute("CREATE INDEX IF NOT EXISTS assets_used_at ON assets (used_at)")
+
+	# storage
+
+	def _blob_path(self, sha):
+		return os.path.join(self.folder, 'blobs', sha[:2], sha)
+
+	def lookup(self, url):
+		"""(headers, body path, fresh) for url, or None"""
+		with self._lock:
+			row = self._conn.execute("SELECT sha, headers, fresh_until FROM assets WHERE url = ?", (url,)).fetchone()
+			if row is None:
+				return None
+			self._conn.execute("UPDATE assets SET used_at = ? WHERE url = ?", (time.time(), url))
+		sha, headers, fresh_until = row
+		path = self._blob_path(sha)
+		if not os.path.exists(path):
+			return None
+		return json.loads(headers), path, time.time() < fresh_until
+
+	def store(self, url, headers, body):
+		sha = hashlib.sha256(body).hexdigest()
+		path = self._blob_path(sha)
+		if not os.path.exists(path):
+			os.makedirs(os.path.dirname(path), exist_ok=True)
+			partial = f"{path}.partial-{os.getpid()}-{threading.get_ident()}"
+			with open(partial, 'wb') as f:
+				f.write(body)
+			os.replace(partial, path)
+		kept = {name: value for name, value in headers.items() if name.lower() not in _DROP_HEADERS}
+		now = time.time()
+		with self._lock:
+			self._conn.execute(
+				"INSERT OR REPLACE INTO assets (url, sha, size, headers, stored_at, fresh_until, used_at) "
+				"VALUES (?, ?, ?, ?, ?, ?, ?)",
+				(url, sha, len(body), json.dumps(kept), now, now + freshness(headers, now), now)
+			)
+			self._stores += 1
+			evict = self._stores % 50 == 0
+		if evict:
+			self.evict()
+
+	def refresh(self, url, headers):
+		"""Extend a stored entry after a 304"""
+		now = time.time()
+		with self._lock:
+			self._conn.execute(
+				"UPDATE assets SET fresh_until = ?, used_at = ? WHERE url = ?",
+				(now + freshness(headers, now), now, url)
+			)
+
+	def evict(self):
+		"""Drop least recently used entries beyond max_bytes, and bodies nothing points at"""
+		with self._lock:
+			total = 0
+			drop = []
+			for url, size in self._conn.execute("SELECT url, size FROM assets ORDER BY used_at DESC"):
+				total += size
+				if total > self.max_bytes:
+					drop.append((url,))
+			self._conn.executemany("DELETE FROM assets WHERE url = ?", drop)
+			live = {sha for (sha,) in self._conn.execute("SELECT DISTINCT sha FROM assets")}
+		if not drop:
+			return
+		blobs = os.path.join(self.folder, 'blobs')
+		for prefix in os.listdir(blobs):
+			for name in os.listdir(os.path.join(blobs, prefix)):
+				if name not in live and '.partial-' not in name:
+					try:
+						os.remove(os.path.join(blobs, prefix, name))
+					except OSError:
+						pass
+
+	def stats(self):
+		return {'hits': self.hits, 'revalidated': self.revalidated, 'stale': self.stale, 'misses': self.misses}
+
+	# routing
+
+	def wants(self, request):
+		return request.method == 'GET' and request.resource_type in CACHED_TYPES and request.url.startswith(('https://', 'http://'))
+
+	def _conditional_headers(self, request, stored):
+		headers = dict(request.headers)
+		if stored.get('etag'):
+			headers['if-none-match'] = stored['etag']
+		if stored.get('last-modified'):
+			headers['if-modified-since'] = stored['last-modified']
+		return headers
+
+	def _handle(self, route):
+		try:
+			self._serve(route)
+		except Exception as e:
+			logger_config.debug(f"[AssetCache] Passing on {route.request.url}: {e}")
+			try:
+				route.fallback()
+			except Exception:
+				# Already handled, or the page is gone.
+				pass
+
+	def _serve(self, route):
+		request = route.request
+		if not self.wants(request):
+			return route.fallback()
+		url = request.url
+		cached = self.lookup(url)
+		if cached is not None:
+			stored, path, fresh = cached
+			if fresh:
+				self.hits += 1
+				return route.fulfill(status=200, headers=stored, path=path)
+			try:
+				response = route.fetch(headers=self._conditional_headers(request, stored))
+			except Exception as e:
+				# Offline or refused: the stale copy beats a failed request.
+				logger_config.debug(f"[AssetCache] Serving stale {url}: {e}")
+				self.stale += 1
+				return route.fulfill(status=200, headers=stored, path=path)
+			if response.status == 304:
+				self.revalidated += 1
+				self.refresh(url, dict(stored, **response.headers))
+				return route.fulfill(status=200, headers=stored, path=path)
+		else:
+			response = route.fetch()
+
+		self.misses += 1
+		body = response.body()
+		if storable(response.status, response.headers):
+			try:
+				self.store(url, response.headers, body)
+			except Exception as e:
+				logger_config.debug(f"[AssetCache] Could not store {url}: {e}")
+		route.fulfill(response=response, body=body)
+
+	async def _ahandle(self, route):
+		try:
+			await self._aserve(route)
+		except Exception as e:
+			logger_config.debug(f"[AssetCache] Passing on {route.request.url}: {e}")
+			try:
+				await route.fallback()
+			except Exception:
+				pass
+
+	async def _aserve(self, route):
+		request = route.request
+		if not self.wants(request):
+			return await route.fallback()
+		url = request.url
+		cached = self.lookup(url)
+		if cached is not None:
+			stored, path, fresh = cached
+			if fresh:
+				self.hits += 1
+				return await route.fulfill(status=200, headers=stored, path=path)
+			try:
+				response = await route.fetch(headers=self._conditional_headers(request, stored))
+			except Exception as e:
+				logger_config.debug(f"[AssetCache] Serving stale {url}: {e}")
+				self.stale += 1
+				return await route.fulfill(status=200, headers=stored, path=path)
+			if response.status == 304:
+				self.revalidated += 1
+				self.refresh(url, dict(stored, **response.headers))
+				return await route.fulfill(status=200, headers=stored, path=path)
+		else:
+			response = await route.fetch()
+
+		self.misses += 1
+		body = await response.body()
+		if storable(response.status, response.headers):
+			try:
+				self.store(url, response.headers, body)
+			except Exception as e:
+				logger_config.debug(f"[AssetCache] Could not store {url}: {e}")
+		await route.fulfill(response=response, body=body)
+
+	def attach(self, page):
+		page.route('**/*', self._handle)
+
+	async def aattach(self, page):
+		await page.route('**/*', self._ahandle)
+
+
+def mode():
+	value = (os.getenv("ASSET_CACHE") or "off").lower()
+	if value not in ('off', 'cache', 'record', 'replay'):
+		logger_config.info(f"[AssetCache] Unknown ASSET_CACHE {value!r}, leaving it off")
+		return 'off'
+	return value
+
+
+def har_path(name):
+	folder = os.getenv("ASSET_HAR_DIR") or os.path.join(
+		os.getenv("ASSET_CACHE_DIR") or os.path.expanduser('~/.chat_bot_ui_handler/assets'), 'har'
+	)
+	return os.path.join(folder, f"{re.sub(r'[^A-Za-z0-9_.-]', '_', name)}.har")
+
+
+def _har_args(name):
+	path = har_path(name)
+	if mode() == 'record':
+		os.makedirs(os.path.dirname(path), exist_ok=True)
+		return path, {'update': True, 'update_content': 'attach', 'update_mode': 'minimal'}
+	not_found = 'abort' if os.getenv("ASSET_HAR_NOT_FOUND") == 'abort' else 'fallback'
+	return path, {'not_found': not_found}
+
+
+_shared = None
+_shared_lock = threading.Lock()
+
+
+def shared_asset_cache():
+	"""One AssetCache per process"""
+	global _shared
+	with _shared_lock:
+		if _shared is None:
+			_shared = AssetCache()
+		return _shared
+
+
+def attach(page, name):
+	"""Put ASSET_CACHE's mode on page; name names the HAR. Returns False when it is off"""
+	current = mode()
+	if current == 'off':
+		return False
+	if current == 'cache':
+		shared_asset_cache().attach(page)
+		return True
+	path, options = _har_args(name)
+	if current == 'replay' and not os.path.exists(path):
+		logger_config.info(f"[AssetCache] No HAR at {path} to replay; record one with ASSET_CACHE=record")
+		return False
+	page.route_from_har(path, **options)
+	return True
+
+
+async def aattach(page, name):
+	current = mode()
+	if current == 'off':
+		return False
+	if current == 'cache':
+		await shared_asset_cache().aattach(page)
+		return True
+	path, options = _har_args(name)
+	if current == 'replay' and not os.path.exists(path):
+		logger_config.info(f"[AssetCache] No HAR at {path} to replay; record one with ASSET_CACHE=record")
+		return False
+	await page.route_from_har(path, **options)
+	return True
@@ -0,0 +1,563 @@
+"""BaseUIChat on playwright.async_api, so one event loop can run many chats.
+
+The sync flow spends nearly all of its time in ``wait_for_timeout``, which
+holds a whole thread per chat. AsyncBaseUIChat has the same hooks as
+BaseUIChat (load_url, login, upload_file, fill_prompt, send,
+wait_for_generation, get_response, ...) as coroutines, and every
+``chat_fresh`` opens its own page in one shared browser context:
+
+    gemini = AsyncBaseUIChat.from_sync(GeminiUIChat)
+    answers = await asyncio.gather(*(gemini.chat_fresh(p) for p in prompts))
+    await gemini.cleanup()
+
+``from_sync`` runs an existing handler on the async flow without rewriting
+it: the URL, selectors (including ``'ready'``), docker name and
+post_process_response come from the sync class. Page-level overrides such as
+Gemini's file chooser upload are sync code and cannot be reused; the async
+defaults are used instead and the skipped overrides are logged. Write an
+AsyncBaseUIChat subclass to port one.
+
+BrowserManager only hands out sync pages, so the async flow opens its own
+browser: a persistent context on ``config.user_data_dir`` (the same profile
+the sync handler signs into), or an existing browser over CDP when
+``cdp_url`` is given. GoogleLoginInjector is sync as well, so Google sign-in
+comes from the profile or from the snapshot the sync flow saved in the
+session cache (see session_cache.py) rather than from the injector.
+"""
+
+import asyncio
+import contextvars
+import os
+import threading
+import time
+import traceback
+import weakref
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+
+from browser_manager.browser_config import BrowserConfig
+
+from chat_bot_ui_handler.base_ui_flow import BaseUIChat, ChatCancelled, _PrefixedLogger
+from chat_bot_ui_handler import asset_cache
+from chat_bot_ui_handler.completion import CompletionDetector, get_latency_tracker
+from chat_bot_ui_handler.env import load_env
+from chat_bot_ui_handler.metrics import ChatResult, get_registry, new_attempt_id
+from chat_bot_ui_handler.page_scripts import with_query_all
+from chat_bot_ui_handler.probe import aprobe, await_visible
+from chat_bot_ui_handler.readiness import async_wait_until_ready, default_conditions
+from chat_bot_ui_handler.resources import ResourceStats, resource_policy
+from chat_bot_ui_handler.screenshots import get_writer
+from chat_bot_ui_handler.uploads import default_limits, get_pipeline
+
+# Timings of the chat running in the current task. A handler runs many chats
+# at once, so they cannot share one dict on the instance.
+_step_timings = contextvars.ContextVar('step_timings')
+_attempt_id = contextvars.ContextVar('attempt_id', default=None)
+_completion_baseline = contextvars.ContextVar('completion_baseline', default=None)
+_staged_upload = contextvars.ContextVar('staged_upload', default=None)
+
+# Hooks that drive the page. A sync handler overriding one of these has
+# behaviour the async flow cannot borrow.
+_PAGE_HOOKS = (
+	'google_login', 'load_url', 'login', 'show_input_file_tag', 'upload_file', 'fill_prompt',
+	'send', 'wait_for_selector', 'wait_for_generation', 'post_response_wait', 'get_response_text',
+)
+
+
+class AsyncBaseUIChat(ABC):
+	resource_profile = 'trackers'
+
+	def __init__(self, config=None, cdp_url=None):
+		load_env()
+		self.config = config or BrowserConfig()
+		self.config.docker_name = self.get_docker_name()
+		if not self.config.user_data_dir:
+			self.config.user_data_dir = os.path.expanduser(f'~/.{self.__class__.__name__.lower()}')
+			os.makedirs(self.config.user_data_dir, exist_ok=True)
+
+		self.cdp_url = cdp_url
+		self.logger = _PrefixedLogger(self.__class__.__name__)
+		self.step_timings = {}
+		self.cancel_event = threading.Event()
+		self._playwright = None
+		self._browser = None
+		self._context = None
+		self._page = None
+		self._context_lock = None
+		self._resource_stats = weakref.WeakKeyDictionary()
+
+	@classmethod
+	def from_sync(cls, handler, config=None, cdp_url=None):
+		"""An async handler that takes its URL, selectors and post-processing from a BaseUIChat"""
+		if isinstance(handler, BaseUIChat):
+			sync_handler = handler
+		else:
+			sync_handler = handler(config)
+		handler_cls = type(sync_handler)
+
+		adapter_cls = type(f"Async{handler_cls.__name__}", (_SyncSpecAdapter,), {})
+		adapter = adapter_cls(sync_handler, config or sync_handler.config, cdp_url)
+
+		skipped = [
+			hook for hook in _PAGE_HOOKS
+			if getattr(handler_cls, hook) is not getattr(BaseUIChat, hook)
+		]
+		if skipped:
+			adapter.logger.info(f"Using async defaults for overridden hooks: {', '.join(skipped)}")
+		return adapter
+
+	async def get_context(self):
+		"""Start the browser on first use. Every page of this handler lives in this context"""
+		if self._context_lock is None:
+			self._context_lock = asyncio.Lock()
+		async with self._context_lock:
+			if self._context is None:
+				from playwright.async_api import async_playwright
+
+				self._playwright = await async_playwright().start()
+				if self.cdp_url:
+					self._browser = await self._playwright.chromium.connect_over_cdp(self.cdp_url)
+					self._context = (
+						self._browser.contexts[0] if self._browser.contexts
+						else await self._browser.new_context()
+					)
+				else:
+					self._context = await self._playwright.chromium.launch_persistent_context(
+						self.config.user_data_dir,
+						headless=bool(getattr(self.config, 'headless', False)),
+						executable_path=getattr(self.config, 'browser_executable', None) or None,
+					)
+		return self._context
+
+	async def new_page(self):
+		context = await self.get_context()
+		return await context.new_page()
+
+	@abstractmethod
+	def get_docker_name(self):
+		"""Return the docker name for this chat handler"""
+		pass
+
+	@abstractmethod
+	def get_url(self):
+		"""Return the URL to navigate to"""
+		pass
+
+	@abstractmethod
+	def get_selectors(self):
+		"""Return a dict with required selectors"""
+		pass
+
+	def need_google_login(self):
+		return False
+
+	async def google_login(self, page):
+		"""Restore the session snapshot the sync flow saved; the injector itself is sync only"""
+		if self.need_google_login():
+			from chat_bot_ui_handler import session_cache
+
+			if not session_cache.is_enabled():
+				return
+			cache = session_cache.SessionCache()
+			account = session_cache.google_account()
+			restored = await cache.arestore(page, account)
+			signed_in = await cache.ais_signed_in(page)
+			if not signed_in and not restored and await cache.arestore(page, account, replace=True):
+				restored = True
+				signed_in = await cache.ais_signed_in(page)
+			if signed_in:
+				self.logger.info(f"Google session {'restored' if restored else 'still valid'}")
+				await cache.asave(page, account)
+			else:
+				self.logger.error("No valid Google session; sign in once with the sync handler to save one")
+
+	def get_ready_conditions(self, step):
+		"""Readiness conditions declared for a step, or None to keep the fixed sleep"""
+		selectors = self.get_selectors()
+		ready = selectors.get('ready')
+		if not ready:
+			return None
+		if ready is True:
+			ready = default_conditions(selectors)
+		return ready.get(step)
+
+	async def settle(self, page, step, fallback_ms):
+		"""Wait until a step is ready, or sleep fallback_ms for handlers that did not opt in"""
+		conditions = self.get_ready_conditions(step)
+		if conditions is None:
+			await page.wait_for_timeout(fallback_ms)
+			return
+
+		started = time.monotonic()
+		ready = await async_wait_until_ready(page, conditions, fallback_ms, self.logger)
+		elapsed = time.monotonic() - started
+		self.logger.debug(
+			f"{step} {'ready' if ready else 'hit its cap'} after {elapsed:.2f}s (cap {fallback_ms / 1000:.1f}s)"
+		)
+
+	def check_cancelled(self):
+		if self.cancel_event.is_set():
+			raise ChatCancelled(f"{self.get_docker_name()} was cancelled")
+
+	@contextmanager
+	def timed_step(self, step):
+		self.check_cancelled()
+		timings = _step_timings.get(self.step_timings)
+		started = time.monotonic()
+		ok = False
+		try:
+			yield
+			ok = True
+		finally:
+			elapsed = time.monotonic() - started
+			timings[step] = timings.get(step, 0.0) + elapsed
+			get_registry().record_span(self.__class__.__name__, step, _attempt_id.get(), elapsed, ok)
+
+	def record_iterations(self, loop, count):
+		"""Record how many rounds a poll or retry loop took"""
+		get_registry().record_iterations(self.__class__.__name__, loop, count)
+
+	def log_step_timings(self, timings=None):
+		timings = self.step_timings if timings is None else timings
+		if timings:
+			total = sum(timings.values())
+			breakdown = " ".join(f"{step}={seconds:.2f}s" for step, seconds in timings.items())
+			self.logger.info(f"Step timings: {breakdown} total={total:.2f}s")
+
+	def get_resource_policy(self):
+		return resource_policy(self.resource_profile)
+
+	async def resource_stats(self, page):
+		stats = self._resource_stats.get(page)
+		if stats is None:
+			try:
+				await asset_cache.aattach(page, self.__class__.__name__)
+			except Exception as e:
+				self.logger.error(f"Asset cache not attached: {e}")
+			try:
+				# After the asset cache: routes added last run first, so blocked
+				# requests never reach it.
+				stats = await self.get_resource_policy().aapply(page)
+			except Exception as e:
+				self.logger.error(f"Resource policy not applied: {e}")
+				stats = ResourceStats()
+			self._resource_stats[page] = stats
+		return stats
+
+	async def load_url(self, page):
+		url = self.get_url()
+		self.logger.info(f"Loading URL: {url}")
+		stats = await self.resource_stats(page)
+		stats.reset()
+		await page.goto(url, wait_until='domcontentloaded')
+		self.logger.info("Page loaded successfully, waiting for content...")
+		await self.settle(page, 'load_url', 5000)
+		await page.keyboard.press("Escape")
+		await self.settle(page, 'dismiss', 1000)
+		await page.keyboard.press("Escape")
+		await self.settle(page, 'dismiss', 1000)
+		self.logger.info(f"Page load: {stats.summary()}")
+		await self.save_screenshot(page)
+
+	async def login(self, page):
+		"""Override this method if login is required"""
+		pass
+
+	async def show_input_file_tag(self, page):
+		"""Override this method if show_input_file_tag is required"""
+		pass
+
+	def get_upload_limits(self):
+		return default_limits()
+
+	def stage_upload(self, file_path):
+		"""Start preparing file_path for upload on the pipeline's threads"""
+		future = get_pipeline().submit(file_path, self.get_upload_limits()) if file_path else None
+		_staged_upload.set((file_path, future) if future else None)
+
+	async def staged_upload(self, file_path):
+		if not file_path:
+			return file_path
+		staged = _staged_upload.get()
+		_staged_upload.set(None)
+		try:
+			if staged and staged[0] == file_path:
+				return await asyncio.wrap_future(staged[1])
+			return await asyncio.wrap_future(get_pipeline().submit(file_path, self.get_upload_limits()))
+		except Exception as e:
+			self.logger.error(f"Could not prepare {file_path} for upload, sending it as is: {e}")
+			return file_path
+
+	async def attachment_count(self, page):
+		selector = self.get_selectors().get('upload_done')
+		if not selector:
+			return None
+		return (await self.probe(page, {'done': selector}))['done']['count']
+
+	async def wait_for_upload(self, page, before, cap_ms=5000):
+		"""Async twin of BaseUIChat.wait_for_upload"""
+		selector = self.get_selectors().get('upload_done')
+		if selector and before is not None:
+			try:
+				await page.wait_for_function(
+					with_query_all("([selector, before]) => queryAll(selector).length > before"),
+					arg=[selector, before], polling=100, timeout=cap_ms,
+				)
+			except Exception:
+				self.logger.debug(f"No new '{selector}' within {cap_ms}ms")
+			return
+		conditions = self.get_ready_conditions('upload_file')
+		if conditions is None:
+			conditions = [('network_idle',), ('dom_quiet', 500)]
+		await async_wait_until_ready(page, conditions, cap_ms, self.logger)
+
+	async def upload_file(self, page, file_path):
+		if file_path:
+			await self.show_input_file_tag(page)
+
+			selectors = self.get_selectors()
+			self.logger.info(f"Uploading file: {file_path}")
+
+			file_input = page.locator(selectors.get("input_file", 'input[type="file"]')).first
+			await file_input.wait_for(state="attached", timeout=5000)
+			before = await self.attachment_count(page)
+			await file_input.set_input_files(file_path)
+			await self.wait_for_upload(page, before)
+			input_file_wait_selector = selectors.get("input_file_wait_selector", None)
+			if input_file_wait_selector:
+				await page.wait_for_selector(input_file_wait_selector, timeout=15000)
+				await page.wait_for_timeout(1000)
+			self.logger.info("File uploaded successfully")
+
+			await self.save_screenshot(page)
+
+	async def fill_prompt(self, page, user_prompt, system_prompt=None):
+		full_prompt = user_prompt
+		if system_prompt:
+			full_prompt = f"SYSTEM INSTRUCTIONS:: {system_prompt}\n\nUSER PROMPT:: {user_prompt}"
+
+		selectors = self.get_selectors()
+		self.logger.info("Filling user prompt into input...")
+		await page.locator(selectors['input']).first.fill(full_prompt)
+		self.logger.info("Prompt filled successfully")
+		await self.settle(page, 'fill_prompt', 2000)
+		await self.save_screenshot(page)
+
+	async def send(self, page):
+		selectors = self.get_selectors()
+		self.logger.info("Clicking 'Send' button...")
+		await page.locator(selectors['send_button']).first.click()
+		self.logger.info("'Send' button clicked")
+		await self.settle(page, 'send', 2000)
+		await page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
+		await self.save_screenshot(page)
+
+	def post_process_response(self, result):
+		return result
+
+	async def wait_for_selector(self, page, i=0):
+		selectors = self.get_selectors()
+		self.logger.info(f"Waiting for results in '{selectors['wait_selector']}' container... iteration {i}")
+		await page.wait_for_selector(selectors['wait_selector'], timeout=10000)
+
+	async def generation_state(self, page):
+		"""Whether a stop button is showing, and how much response text there is so far"""
+		selectors = self.get_selectors()
+		return await page.evaluate(with_query_all("""([stop, result]) => ({
+			generating: !!stop && queryAll(stop).length > 0,
+			length: queryAll(result).reduce((n, el) => n + (el.innerText || '').length, 0),
+		})"""), [selectors.get('stop_button'), selectors.get('generation_container', selectors['result'])])
+
+	def generation_timeout(self):
+		"""Upper bound in seconds on the wait for an answer, or None for GENERATION_TIMEOUT"""
+		return None
+
+	async def wait_for_generation(self, page):
+		"""Wait until the answer is complete, as decided in the page (see completion.py)"""
+		provider = self.__class__.__name__
+		tracker = get_latency_tracker()
+		timeout = tracker.timeout_for(provider, self.generation_timeout())
+		started = time.monotonic()
+		detector = CompletionDetector(self.get_selectors(), _completion_baseline.get())
+		summary = await detector.await_done(page, timeout, self.check_cancelled)
+		tracker.record(provider, time.monotonic() - started)
+		if summary is None:
+			self.logger.error(f"Response did not settle within {timeout:.0f}s; using what is on screen")
+			return
+		self.record_iterations('wait_for_generation', summary.get('polls', 0))
+
+	async def post_response_wait(self, page):
+		pass
+
+	async def probe(self, page, selectors):
+		return await aprobe(page, selectors)
+
+	async def wait_for_visible(self, page, selectors, timeout_ms):
+		return await await_visible(page, selectors, timeout_ms)
+
+	async def get_response_text(self, page):
+		selectors = self.get_selectors()
+		element = page.locator(selectors['result']).last
+		try:
+			await element.scroll_into_view_if_needed()
+		except Exception:
+			self.logger.info("Failed to scroll into view")
+
+		await self.post_response_wait(page)
+		return await element.inner_text()
+
+	async def get_response(self, page):
+		result_text = await self.get_response_text(page)
+		result_text = self.post_process_response(result_text)
+		self.logger.info("Result fetched successfully")
+		self.logger.info(f"Result from {self.get_docker_name()}: {result_text}")
+		await self.save_screenshot(page)
+		return result_text
+
+	async def save_screenshot(self, page, error=False):
+		"""Override to customize screenshot naming. Writing happens in the background, see screenshots.py"""
+		writer = get_writer()
+		name = self.get_docker_name()
+		if writer.should_capture(name, error):
+			writer.submit(name, await page.screenshot(**writer.screenshot_options()), error)
+
+	async def prepare(self, page):
+		"""Bring a page to the point where a prompt can be typed"""
+		with self.timed_step('google_login'):
+			await self.google_login(page)
+
+		with self.timed_step('load_url'):
+			await self.load_url(page)
+
+		with self.timed_step('login'):
+			await self.login(page)
+
+	async def submit(self, page, user_prompt, system_prompt, file_path):
+		"""Attach the file, type the prompt and send it"""
+		with self.timed_step('upload_file'):
+			await self.upload_file(page, await self.staged_upload(file_path))
+
+		with self.timed_step('fill_prompt'):
+			await self.fill_prompt(page, user_prompt, system_prompt)
+
+		_completion_baseline.set(await CompletionDetector.abaseline(page, self.get_selectors()))
+		with self.timed_step('send'):
+			await self.send(page)
+
+	async def process(self, page, user_prompt, system_prompt, file_path, prepared=False):
+		timings = {}
+		attempt = new_attempt_id()
+		_step_timings.set(timings)
+		_attempt_id.set(attempt)
+		self.step_timings = timings
+		result = None
+		try:
+			self.stage_upload(file_path)
+			if not prepared:
+				await self.prepare(page)
+
+			await self.submit(page, user_prompt, system_prompt, file_path)
+
+			with self.timed_step('wait_for_generation'):
+				await self.wait_for_generation(page)
+
+			with self.timed_step('get_response'):
+				result = await self.get_response(page)
+			return result
+
+		except ChatCancelled as e:
+			self.logger.info(str(e))
+		except Exception as e:
+			self.logger.error(f"Error during {self.get_docker_name()}: {e} {traceback.format_exc()}")
+			try:
+				await self.save_screenshot(page, error=True)
+			except Exception:
+				pass
+		finally:
+			self.log_step_timings(timings)
+			get_registry().finish_attempt(self.__class__.__name__, attempt, result is not None)
+
+	def _result(self, text, return_result):
+		"""The answer, or with return_result=True a ChatResult carrying its step timings"""
+		if not return_result:
+			return text
+		return ChatResult(text, self.__class__.__name__, _attempt_id.get(), dict(_step_timings.get({})))
+
+	async def chat(self, user_prompt, system_prompt=None, file_path=None, return_result=False):
+		"""Chat on this handler's one long-lived page"""
+		result = None
+		try:
+			if self._page is None or self._page.is_closed():
+				self._page = await self.new_page()
+			result = await self.process(self._page, user_prompt, system_prompt, file_path)
+		except Exception as e:
+			self.logger.error(f"Error in chat: {e}")
+
+		return self._result(result, return_result)
+
+	async def chat_fresh(self, user_prompt, system_prompt=None, file_path=None, return_result=False):
+		"""Chat on a page of its own, closed afterwards. Safe to run many at once"""
+		page = None
+		result = None
+		try:
+			page = await self.new_page()
+			result = await self.process(page, user_prompt, system_prompt, file_path)
+		except Exception as e:
+			self.logger.error(f"Error in chat_fresh: {e}")
+		finally:
+			if page is not None:
+				try:
+					await page.close()
+				except Exception:
+					pass
+
+		return self._result(result, return_result)
+
+	async def cleanup(self):
+		try:
+			if self._context is not None:
+				await self._context.close()
+			if self._browser is not None:
+				await self._browser.close()
+			if self._playwright is not None:
+				await self._playwright.stop()
+		except Exception as e:
+			self.logger.error(f"Error while stopping async browser: {e}")
+		finally:
+			self._playwright = self._browser = self._context = self._page = None
+
+
+class _SyncSpecAdapter(AsyncBaseUIChat):
+	"""Runs a sync handler's declarations on the async flow. Built by AsyncBaseUIChat.from_sync"""
+
+	def __init__(self, sync_handler, config, cdp_url=None):
+		self.sync_handler = sync_handler
+		# Already resolved by the sync handler; asking it again would append
+		# its suffix a second time.
+		self._docker_name = sync_handler.config.docker_name
+		super().__init__(config, cdp_url)
+
+	def get_docker_name(self):
+		return self._docker_name
+
+	def get_url(self):
+		return self.sync_handler.get_url()
+
+	def get_selectors(self):
+		selectors = self.sync_handler.get_selectors()
+		if type(self.sync_handler).wait_for_selector is not BaseUIChat.wait_for_selector:
+			# Its wait_selector is not what its own wait_for_selector checks for.
+			selectors = dict(selectors, wait_selector=None)
+		return selectors
+
+	def need_google_login(self):
+		return self.sync_handler.need_google_login()
+
+	def post_process_response(self, result):
+		return self.sync_handler.post_process_response(result)
+
+	def get_upload_limits(self):
+		return self.sync_handler.get_upload_limits()
+
+	def get_resource_policy(self):
+		return self.sync_handler.get_resource_policy()
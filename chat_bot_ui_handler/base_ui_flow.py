@@ -2,10 +2,29 @@ from browser_manager import BrowserManager
 from browser_manager.browser_config import BrowserConfig
 from custom_logger import logger_config
 import os
+import threading
+import time
 import traceback
+import weakref
 from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 import json
 
+from chat_bot_ui_handler import asset_cache
+from chat_bot_ui_handler.completion import CompletionDetector, get_latency_tracker
+from chat_bot_ui_handler.env import load_env
+from chat_bot_ui_handler.flow import Step, critical_path, run_steps
+from chat_bot_ui_handler.metrics import ChatResult, get_registry, new_attempt_id
+from chat_bot_ui_handler import probe as probe_mod
+from chat_bot_ui_handler.page_scripts import with_query_all
+from chat_bot_ui_handler.readiness import default_conditions, wait_until_ready
+from chat_bot_ui_handler.resources import ResourceStats, resource_policy
+from chat_bot_ui_handler.response_cache import shared_cache
+from chat_bot_ui_handler.screenshots import get_writer
+from chat_bot_ui_handler.streaming import iterate_in_thread, stream_response
+from chat_bot_ui_handler.uploads import default_limits, get_pipeline
+
 class _PrefixedLogger:
 	def __init__(self, prefix):
 		self._prefix = prefix
@@ -20,8 +39,19 @@ class _PrefixedLogger:
 		logger_config.debug(f"[{self._prefix}] {msg}", overwrite=overwrite)
 
 
+class ChatCancelled(Exception):
+	"""Raised inside a chat whose cancel_event was set"""
+
+
 class BaseUIChat(ABC):
+	# True for handlers that pick the file in the browser's own file dialog,
+	# which only sees the attach folder mounted into the container.
+	upload_via_attach_folder = False
+	# What pages may download; see resources.py
+	resource_profile = 'trackers'
+
 	def __init__(self, config=None):
+		load_env()
 		self.config = config or BrowserConfig()
 		self.config.docker_name = self.get_docker_name()
 		if not self.config.user_data_dir:
@@ -30,6 +60,28 @@ class BaseUIChat(ABC):
 
 		self.browser_manager = None
 		self.logger = _PrefixedLogger(self.__class__.__name__)
+		self.step_timings = {}
+		self.attempt_id = None
+		# Wall-clock seconds of the last chat; its steps can overlap.
+		self.attempt_seconds = None
+		self._attempt_started = None
+		# Set to a ResponseCache to answer repeated questions without the browser.
+		self.response_cache = shared_cache()
+		self._stream_executor = None
+		# Set from another thread to stop a running chat at its next step.
+		self.cancel_event = threading.Event()
+		self._completion_baseline = None
+		# Set by Conversation: read the answer to this turn, not whichever is last on the page.
+		self.read_turn = False
+		self._turn_start = None
+		self._turn_prompt = None
+		# Speculative tabs for chat_fresh, see prefetch(): [(page, started)]
+		try: self.prefetch_limit = int(os.getenv("PREFETCH_PAGES") or 0)
+		except Exception: self.prefetch_limit = 0
+		try: self.prefetch_max_age = float(os.getenv("PREFETCH_MAX_AGE") or 600)
+		except Exception: self.prefetch_max_age = 600.0
+		self._prefetched = []
+		self._resource_stats = weakref.WeakKeyDictionary()
 
 	def get_browser_manager(self):
 		if not self.browser_manager:
@@ -52,28 +104,187 @@ class BaseUIChat(ABC):
 
 	def google_login(self, page):
 		if self.need_google_login():
-			self.logger.info("Starting Google OAuth login injection...")
-			from chat_bot_ui_handler.google_login_injector import GoogleLoginInjector
-			login_injector = GoogleLoginInjector()
-			login_injector.login(page)
-			page.wait_for_timeout(5000)
+			from chat_bot_ui_handler import session_cache
+
+			cache = session_cache.SessionCache() if session_cache.is_enabled() else None
+			account = session_cache.google_account()
+			if cache:
+				restored = cache.restore(page, account)
+				signed_in = cache.is_signed_in(page)
+				if not signed_in and not restored and cache.restore(page, account, replace=True):
+					# The context's own session is gone; try the snapshot before signing in.
+					restored = True
+					signed_in = cache.is_signed_in(page)
+				if signed_in:
+					self.logger.info(f"Google session {'restored' if restored else 'still valid'}, skipping login")
+					# Google rotates session cookies; keep the snapshot current.
+					cache.save(page, account)
+					return
+
+			self.inject_google_login(page, cache, account)
+
+	def inject_google_login(self, page, cache=None, account=None):
+		"""Walk the Google sign-in flow on page and save the session"""
+		self.logger.info("Starting Google OAuth login injection...")
+		from chat_bot_ui_handler.google_login_injector import GoogleLoginInjector
+		login_injector = GoogleLoginInjector()
+		login_injector.login(page)
+		self.settle(page, 'google_login', 5000)
+		if cache:
+			cache.save(page, account)
+
+	def google_login_steps(self, page):
+		"""google_login, load_url and login as steps.
+
+		With a session snapshot, the snapshot is put in place and the page
+		starts loading at once; the check that it is still signed in follows
+		the load, and only a failed check costs a sign-in and a second load.
+		"""
+		from chat_bot_ui_handler import session_cache
+
+		if not (self.need_google_login() and session_cache.is_enabled()):
+			return [
+				Step('google_login', lambda done: self.google_login(page)),
+				Step('load_url', lambda done: self.load_url(page), after=['google_login']),
+				Step('login', lambda done: self.login(page), after=['load_url']),
+			]
+
+		cache = session_cache.SessionCache()
+		account = session_cache.google_account()
+
+		def restore(done):
+			if cache.restore(page, account) or cache.load(account):
+				# Restored, or the context holds a session of its own: verify decides.
+				return True
+			self.inject_google_login(page, cache, account)
+			return False
+
+		def verify(done):
+			if not done['google_login']:
+				return
+			if cache.is_signed_in(page):
+				self.logger.info("Google session restored, skipping login")
+				cache.save(page, account)
+				return
+			if cache.restore(page, account, replace=True) and cache.is_signed_in(page):
+				self.logger.info("Google session restored from the snapshot, skipping login")
+			else:
+				self.inject_google_login(page, cache, account)
+			self.load_url(page)
+
+		return [
+			Step('google_login', restore),
+			Step('load_url', lambda done: self.load_url(page), after=['google_login']),
+			Step('verify_session', verify, after=['load_url']),
+			Step('login', lambda done: self.login(page), after=['verify_session']),
+		]
 
 	@abstractmethod
 	def get_selectors(self):
 		"""Return a dict with required selectors"""
 		pass
 
+	def get_ready_conditions(self, step):
+		"""Readiness conditions declared for a step, or None to keep the fixed sleep"""
+		selectors = self.get_selectors()
+		ready = selectors.get('ready')
+		if not ready:
+			return None
+		if ready is True:
+			ready = default_conditions(selectors)
+		return ready.get(step)
+
+	def settle(self, page, step, fallback_ms):
+		"""Wait until a step is ready, or sleep fallback_ms for handlers that did not opt in"""
+		conditions = self.get_ready_conditions(step)
+		if conditions is None:
+			page.wait_for_timeout(fallback_ms)
+			return
+
+		started = time.monotonic()
+		ready = wait_until_ready(page, conditions, fallback_ms, self.logger)
+		elapsed = time.monotonic() - started
+		self.logger.debug(
+			f"{step} {'ready' if ready else 'hit its cap'} after {elapsed:.2f}s (cap {fallback_ms / 1000:.1f}s)"
+		)
+
+	def check_cancelled(self):
+		if self.cancel_event.is_set():
+			raise ChatCancelled(f"{self.get_docker_name()} was cancelled")
+
+	def start_attempt(self):
+		"""Reset the timings and tag the spans that follow with a new attempt id"""
+		self.step_timings = {}
+		self.attempt_id = new_attempt_id()
+		self.attempt_seconds = None
+		self._attempt_started = time.monotonic()
+
+	def finish_attempt(self, ok):
+		self.attempt_seconds = time.monotonic() - self._attempt_started
+		self.log_step_timings()
+		get_registry().finish_attempt(self.__class__.__name__, self.attempt_id, ok, self.attempt_seconds)
+
+	@contextmanager
+	def timed_step(self, step):
+		self.check_cancelled()
+		started = time.monotonic()
+		ok = False
+		try:
+			yield
+			ok = True
+		finally:
+			elapsed = time.monotonic() - started
+			self.step_timings[step] = self.step_timings.get(step, 0.0) + elapsed
+			get_registry().record_span(self.__class__.__name__, step, self.attempt_id, elapsed, ok)
+
+	def record_iterations(self, loop, count):
+		"""Record how many rounds a poll or retry loop took"""
+		get_registry().record_iterations(self.__class__.__name__, loop, count)
+
+	def log_step_timings(self):
+		if self.step_timings:
+			total = self.attempt_seconds if self.attempt_seconds is not None else sum(self.step_timings.values())
+			breakdown = " ".join(f"{step}={seconds:.2f}s" for step, seconds in self.step_timings.items())
+			self.logger.info(f"Step timings: {breakdown} total={total:.2f}s")
+
+	def get_resource_policy(self):
+		return resource_policy(self.resource_profile)
+
+	def resource_stats(self, page):
+		"""The ResourceStats of page, putting the asset cache and resource policy on it the first time"""
+		stats = self._resource_stats.get(page)
+		if stats is None:
+			try:
+				asset_cache.attach(page, self.__class__.__name__)
+			except Exception as e:
+				self.logger.error(f"Asset cache not attached: {e}")
+			try:
+				# After the asset cache: routes added last run first, so blocked
+				# requests never reach it.
+				stats = self.get_resource_policy().apply(page)
+			except Exception as e:
+				self.logger.error(f"Resource policy not applied: {e}")
+				stats = ResourceStats()
+			self._resource_stats[page] = stats
+		return stats
+
 	def load_url(self, page):
 		# Navigate to URL
 		url = self.get_url()
 		self.logger.info(f"Loading URL: {url}")
+		stats = self.resource_stats(page)
+		stats.reset()
 		page.goto(url, wait_until='domcontentloaded')
-		self.logger.info("Page loaded successfully, waiting 5s for content...")
-		page.wait_for_timeout(5000)
+		self.logger.info("Page loaded successfully, waiting for content...")
+		self.settle(page, 'load_url', 5000)
+		self.dismiss_overlays(page)
+		self.logger.info(f"Page load: {stats.summary()}")
+
+	def dismiss_overlays(self, page):
 		page.keyboard.press("Escape")
-		page.wait_for_timeout(1000)
+		self.settle(page, 'dismiss', 1000)
 		page.keyboard.press("Escape")
-		page.wait_for_timeout(1000)
+		self.settle(page, 'dismiss', 1000)
 		self.save_screenshot(page)
 
 	def cloudflare_bypass(self, page):
@@ -102,6 +313,52 @@ class BaseUIChat(ABC):
 		"""Override this method if show_input_file_tag is required"""
 		pass
 
+	def get_upload_limits(self):
+		"""Size limits files are shrunk to before upload; see uploads.py"""
+		return default_limits()
+
+	def prepare_upload(self, file_path):
+		"""The file to upload in place of file_path (see uploads.py). Safe off the page's thread"""
+		if not file_path:
+			return file_path
+		try:
+			return get_pipeline().prepare(file_path, self.get_upload_limits(), self.upload_via_attach_folder)
+		except Exception as e:
+			self.logger.error(f"Could not prepare {file_path} for upload, sending it as is: {e}")
+			return file_path
+
+	def attachment_count(self, page):
+		"""How many elements match the 'upload_done' selector, or None without one"""
+		selector = self.get_selectors().get('upload_done')
+		if not selector:
+			return None
+		return self.probe(page, {'done': selector})['done']['count']
+
+	def wait_for_upload(self, page, before, cap_ms=5000):
+		"""Wait until the upload shows on the page rather than for a fixed time.
+
+		With an 'upload_done' selector that is one more match than ``before``
+		(from attachment_count() taken before the upload); otherwise the
+		'upload_file' readiness conditions, by default the network going idle
+		and the DOM settling.
+		"""
+		selector = self.get_selectors().get('upload_done')
+		started = time.monotonic()
+		if selector and before is not None:
+			try:
+				page.wait_for_function(
+					with_query_all("([selector, before]) => queryAll(selector).length > before"),
+					arg=[selector, before], polling=100, timeout=cap_ms,
+				)
+			except Exception:
+				self.logger.debug(f"No new '{selector}' within {cap_ms}ms")
+		else:
+			conditions = self.get_ready_conditions('upload_file')
+			if conditions is None:
+				conditions = [('network_idle',), ('dom_quiet', 500)]
+			wait_until_ready(page, conditions, cap_ms, self.logger)
+		self.logger.debug(f"Upload settled after {time.monotonic() - started:.2f}s")
+
 	def upload_file(self, page, file_path):
 		if file_path:
 			self.show_input_file_tag(page)
@@ -111,8 +368,9 @@ class BaseUIChat(ABC):
 
 			file_input = page.locator(selectors.get("input_file", 'input[type="file"]')).first
 			file_input.wait_for(state="attached", timeout=5000)
+			before = self.attachment_count(page)
 			file_input.set_input_files(file_path)
-			page.wait_for_timeout(5000)
+			self.wait_for_upload(page, before)
 			input_file_wait_selector = selectors.get("input_file_wait_selector", None)
 			if input_file_wait_selector:
 				page.wait_for_selector(input_file_wait_selector, timeout=15000)
@@ -130,8 +388,9 @@ class BaseUIChat(ABC):
 		self.logger.info("Filling user prompt into input...")
 		input_field = page.locator(selectors['input']).first
 		input_field.fill(full_prompt)
+		self._turn_prompt = full_prompt
 		self.logger.info("Prompt filled successfully")
-		page.wait_for_timeout(2000)
+		self.settle(page, 'fill_prompt', 2000)
 		self.save_screenshot(page)
 
 	def send(self, page):
@@ -140,7 +399,7 @@ class BaseUIChat(ABC):
 		send_button = page.locator(selectors['send_button']).first
 		send_button.click()
 		self.logger.info("'Send' button clicked")
-		page.wait_for_timeout(2000)
+		self.settle(page, 'send', 2000)
 		page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
 		self.save_screenshot(page)
 
@@ -156,24 +415,92 @@ class BaseUIChat(ABC):
 		)
 
 	def wait_for_generation(self, page):
-		page.wait_for_timeout(10000)
-		try: retry = int(os.getenv("WAIT_FOR_GENERATION_RETRY") or 100)
-		except Exception: retry = 100
-		for i in range(retry):
+		"""Wait until the answer is complete, as decided in the page (see completion.py)"""
+		selectors = self.get_selectors()
+		# A handler with its own wait_for_selector decides the end marker itself.
+		custom_marker = type(self).wait_for_selector is not BaseUIChat.wait_for_selector
+		if custom_marker:
+			selectors = dict(selectors, wait_selector=None)
+
+		provider = self.__class__.__name__
+		tracker = get_latency_tracker()
+		timeout = tracker.timeout_for(provider, self.generation_timeout())
+		started = time.monotonic()
+		summary = CompletionDetector(selectors, self._completion_baseline).wait(page, timeout, self.check_cancelled)
+		# Timeouts count too, or short answers would shrink the next timeout under a long one.
+		tracker.record(provider, time.monotonic() - started)
+		if summary is None:
+			self.logger.error(f"Response did not settle within {timeout:.0f}s; using what is on screen")
+		else:
+			self.record_iterations('wait_for_generation', summary.get('polls', 0))
+
+		if custom_marker:
 			try:
-				self.save_screenshot(page)
-				self.wait_for_selector(page, i)
-				page.wait_for_timeout(2000)
-				break
-			except Exception:
-				pass
+				self.wait_for_selector(page)
+			except Exception as e:
+				self.logger.error(f"wait_for_selector failed: {e}")
+		self.save_screenshot(page)
+
+	def generation_timeout(self):
+		"""Upper bound in seconds on the wait for an answer, or None for GENERATION_TIMEOUT"""
+		return None
+
+	def generation_state(self, page):
+		"""Whether a stop button is showing, and how much response text there is so far"""
+		selectors = self.get_selectors()
+		return page.evaluate(with_query_all("""([stop, result]) => ({
+			generating: !!stop && queryAll(stop).length > 0,
+			length: queryAll(result).reduce((n, el) => n + (el.innerText || '').length, 0),
+		})"""), [selectors.get('stop_button'), selectors.get('generation_container', selectors['result'])])
 
 	def post_response_wait(self, page):
 		pass
 
-	def get_response_text(self, page):
+	def probe(self, page, selectors):
+		"""Visibility and text of many selectors in one evaluate; see probe.py"""
+		return probe_mod.probe(page, selectors)
+
+	def wait_for_visible(self, page, selectors, timeout_ms):
+		"""probe() once one of selectors is visible, or at timeout_ms; for dialogs that show up late"""
+		return probe_mod.wait_for_visible(page, selectors, timeout_ms)
+
+	def response_locator(self, page, fallback='last'):
+		"""The last (or first) result element on the page; the last during a read_turn chat"""
+		locator = page.locator(self.get_selectors()['result'])
+		if self._turn_start is not None:
+			return locator.last
+		return locator.last if fallback == 'last' else locator.first
+
+	def turn_text(self, page):
+		"""The answer to the current turn, or None when the page shows none yet.
+
+		With a 'turn' selector (one element per answer) that is the text of the
+		result elements inside the turn's element, or of the element itself.
+		Without one it is every result element that appeared since the prompt
+		was sent, joined, less any leading ones that only echo the prompt: a
+		result selector can match paragraphs, and the user's own message.
+		"""
 		selectors = self.get_selectors()
-		element = page.locator(selectors['result']).last
+		return page.evaluate(with_query_all("""([turn, result, start, prompt]) => {
+			const text = el => (el.innerText || '').trim();
+			const squash = value => value.replace(/\\s+/g, ' ').trim();
+			let parts;
+			if (turn) {
+				const container = queryAll(turn)[start];
+				if (!container) return null;
+				parts = queryAll(result).filter(el => container.contains(el));
+				if (!parts.length) return text(container);
+			} else {
+				parts = queryAll(result).slice(start);
+				const asked = squash(prompt || '');
+				while (parts.length && asked && asked.includes(squash(text(parts[0])))) parts.shift();
+			}
+			parts = parts.filter(el => !parts.some(other => other !== el && other.contains(el)));
+			return parts.length ? parts.map(text).filter(Boolean).join('\\n') : null;
+		}"""), [selectors.get('turn'), selectors['result'], self._turn_start, self._turn_prompt])
+
+	def get_response_text(self, page):
+		element = self.response_locator(page)
 		try:
 			self.logger.info("Scrolling into view...")
 			element.scroll_into_view_if_needed()
@@ -182,6 +509,10 @@ class BaseUIChat(ABC):
 			self.logger.info("Failed to scroll into view")
 
 		self.post_response_wait(page)
+		if self._turn_start is not None:
+			text = self.turn_text(page)
+			if text is not None:
+				return text
 		return element.inner_text()
 
 	def get_response(self, page):
@@ -192,68 +523,286 @@ class BaseUIChat(ABC):
 		self.save_screenshot(page)
 		return result_text
 
-	def save_screenshot(self, page):
-		"""Override to customize screenshot naming"""
-		folder = os.getenv("TEMP_OUTPUT", "chat_bot_ui_handler_logs")
-		if not os.path.exists(folder):
-			os.mkdir(folder)
-		page.screenshot(path=f"chat_bot_ui_handler_logs/{self.get_docker_name()}.png")
+	def save_screenshot(self, page, error=False):
+		"""Override to customize screenshot naming. Writing happens in the background, see screenshots.py"""
+		get_writer().capture(page, self.get_docker_name(), error=error)
 
-	def process(self, page, user_prompt, system_prompt, file_path):
-		try:
+	def prepare(self, page):
+		"""Bring a page to the point where a prompt can be typed"""
+		with self.timed_step('google_login'):
 			self.google_login(page)
 
+		with self.timed_step('load_url'):
 			self.load_url(page)
 
+		with self.timed_step('login'):
 			self.login(page)
 
-			#page.wait_for_timeout(200000)
-			self.upload_file(page, file_path)
-
-			self.fill_prompt(page, user_prompt, system_prompt)
-
-			self.send(page)
+	def send_turn(self, page):
+		"""send(), after noting what the page held before it for wait_for_generation and read_turn"""
+		selectors = self.get_selectors()
+		self._completion_baseline = CompletionDetector.baseline(page, selectors)
+		self._turn_start = None
+		if self.read_turn:
+			# Turns, when the handler can tell them apart, else result elements.
+			self._turn_start = page.locator(selectors.get('turn') or selectors['result']).count()
+		self.send(page)
+
+	def setup_steps(self, page, user_prompt, system_prompt, file_path, prepared=False):
+		"""The steps from a new page (or, prepared, one past login()) to a sent prompt.
+
+		Override to add steps or declare what may overlap; see flow.py. Steps
+		named like the methods they call are timed under those names.
+		"""
+		steps = [Step('stage_upload', lambda done: self.prepare_upload(file_path), page=False)]
+		ready = []
+		if not prepared:
+			steps += self.google_login_steps(page)
+			ready = ['login']
+		return steps + [
+			Step('upload_file', lambda done: self.upload_file(page, done['stage_upload']), after=ready + ['stage_upload']),
+			Step('fill_prompt', lambda done: self.fill_prompt(page, user_prompt, system_prompt), after=['upload_file']),
+			Step('send', lambda done: self.send_turn(page), after=['fill_prompt']),
+		]
+
+	def process(self, page, user_prompt, system_prompt, file_path, prepared=False):
+		"""Run one chat on page. prepared=True skips prepare() for pages that are already past login()"""
+		self.start_attempt()
+		result = None
+		try:
+			steps = self.setup_steps(page, user_prompt, system_prompt, file_path, prepared)
+			spans = {}
+			run_steps(steps, self.timed_step, spans=spans)
+			self.logger.debug(f"Critical path: {' > '.join(critical_path(steps, spans))}")
 
-			self.wait_for_generation(page)
+			with self.timed_step('wait_for_generation'):
+				self.wait_for_generation(page)
 
-			return self.get_response(page)
+			with self.timed_step('get_response'):
+				result = self.get_response(page)
+			return result
 
+		except ChatCancelled as e:
+			self.logger.info(str(e))
 		except Exception as e:
 			self.logger.error(f"Error during {self.get_docker_name()}: {e} {traceback.format_exc()}")
 			try:
-				self.save_screenshot(page)
+				self.save_screenshot(page, error=True)
+			except Exception:
+				pass
+		finally:
+			self.finish_attempt(result is not None)
+
+	def _result(self, text, return_result):
+		"""The answer, or with return_result=True a ChatResult carrying its step timings"""
+		if not return_result:
+			return text
+		return ChatResult(text, self.__class__.__name__, self.attempt_id, dict(self.step_timings), self.attempt_seconds)
+
+	def _cached(self, run, user_prompt, system_prompt, file_path, return_result):
+		"""Answer from response_cache when it has this question, else run() and store the answer"""
+		cache = self.response_cache
+		key = None
+		if cache:
+			try:
+				key = cache.key(self.__class__.__name__, user_prompt, system_prompt, file_path)
+			except Exception as e:
+				self.logger.error(f"Response cache disabled for this chat: {e}")
+			cached = cache.get(key) if key else None
+			if cached is not None:
+				self.logger.info("Answered from the response cache")
+				self.step_timings = {}
+				self.attempt_id = None
+				self.attempt_seconds = None
+				return self._result(cached, return_result)
+
+		result = run()
+		if key and result is not None:
+			cache.put(key, result)
+		return self._result(result, return_result)
+
+	def quick_chat(self, user_prompt, system_prompt=None, file_path=None, return_result=False):
+		def run():
+			try:
+				with self.get_browser_manager() as page:
+					return self.process(page, user_prompt, system_prompt, file_path)
 			except Exception:
 				pass
 
-	def quick_chat(self, user_prompt, system_prompt=None, file_path=None):
-		try:
-			with self.get_browser_manager() as page:
+			return None
+
+		return self._cached(run, user_prompt, system_prompt, file_path, return_result)
+
+	def chat(self, user_prompt, system_prompt=None, file_path=None, return_result=False):
+		def run():
+			try:
+				page = self.get_browser_manager().start()
 				return self.process(page, user_prompt, system_prompt, file_path)
-		except Exception:
-			pass
+			except Exception:
+				pass
 
-		return None
+			return None
 
-	def chat(self, user_prompt, system_prompt=None, file_path=None):
-		try:
-			page = self.get_browser_manager().start()
-			return self.process(page, user_prompt, system_prompt, file_path)
-		except Exception:
-			pass
+		return self._cached(run, user_prompt, system_prompt, file_path, return_result)
 
+	def chat_fresh(self, user_prompt, system_prompt=None, file_path=None, return_result=False):
+		def run():
+			try:
+				page = self.take_prefetched()
+				prepared = page is not None
+				if not prepared:
+					page = self.get_browser_manager().get_fresh_page()
+				return self.process(page, user_prompt, system_prompt, file_path, prepared=prepared)
+			except Exception as e:
+				self.logger.error(f"Error in chat_fresh: {e}")
+				pass
+
+			return None
+
+		return self._cached(run, user_prompt, system_prompt, file_path, return_result)
+
+	def prefetch(self, idle=None):
+		"""Ready tabs for the next chat_fresh calls, up to prefetch_limit (PREFETCH_PAGES).
+
+		Each tab goes through google_login, load_url and login, so chat_fresh
+		(and chat_stream with fresh=True) starts it at the prompt box. Tabs
+		older than PREFETCH_MAX_AGE seconds (default 600) are replaced.
+
+		Nothing calls this on the way to an answer: the caller runs it when it
+		is idle, as ChatScheduler's fresh workers do between jobs. idle() is
+		asked before each tab; prefetching stops once it returns False.
+		"""
+		self._prune_prefetched()
+		manager = self.get_browser_manager()
+		while len(self._prefetched) < self.prefetch_limit and (idle is None or idle()):
+			page = None
+			try:
+				started = time.monotonic()
+				page = manager.get_fresh_page()
+				# Setup spans feed the step histograms but belong to no chat attempt.
+				self.step_timings = {}
+				self.attempt_id = None
+				run_steps(self.google_login_steps(page), self.timed_step)
+				self._prefetched.append((page, started))
+				self.logger.info(f"Prefetched a page in {time.monotonic() - started:.2f}s")
+			except Exception as e:
+				self.logger.error(f"Could not prefetch a page: {e}")
+				self._close_page(page)
+				return
+
+	def _prune_prefetched(self):
+		"""Close prefetched tabs that were closed or are older than prefetch_max_age"""
+		kept = []
+		for page, started in self._prefetched:
+			try:
+				usable = not page.is_closed() and time.monotonic() - started < self.prefetch_max_age
+			except Exception:
+				usable = False
+			if usable:
+				kept.append((page, started))
+			else:
+				self._close_page(page)
+		self._prefetched = kept
+
+	def take_prefetched(self):
+		"""A prefetched page, already past login(), or None"""
+		self._prune_prefetched()
+		if self._prefetched:
+			return self._prefetched.pop(0)[0]
 		return None
 
-	def chat_fresh(self, user_prompt, system_prompt=None, file_path=None):
+	def _close_page(self, page):
+		if page is None:
+			return
 		try:
-			page = self.get_browser_manager().get_fresh_page()
-			return self.process(page, user_prompt, system_prompt, file_path)
+			if not page.is_closed():
+				page.close()
 		except Exception as e:
-			self.logger.error(f"Error in chat_fresh: {e}")
-			pass
+			self.logger.debug(f"Error while closing page: {e}")
 
-		return None
+	def chat_stream(self, user_prompt, system_prompt=None, file_path=None, fresh=False):
+		"""Like chat(), but yields the response in pieces while it is being generated.
+
+		With fresh=True the prompt goes to a new page, as with chat_fresh().
+
+		The pieces are what the page showed while it was written. The settled
+		answer, after post_process_response, is the generator's return value
+		(None when the chat failed): use it rather than the joined pieces,
+		which it replaces when the page rewrote the text.
+		"""
+		self.start_attempt()
+		page = None
+		final = None
+		try:
+			manager = self.get_browser_manager()
+			prepared = False
+			if fresh:
+				page = self.take_prefetched()
+				prepared = page is not None
+				if not prepared:
+					page = manager.get_fresh_page()
+			else:
+				page = manager.start()
+			run_steps(self.setup_steps(page, user_prompt, system_prompt, file_path, prepared), self.timed_step)
+
+			started = time.monotonic()
+			streamed = ""
+			# Counted before the click, so an answer that starts while send settles is streamed too.
+			baseline = (self._completion_baseline or {}).get('results')
+			for delta in stream_response(self, page, baseline=baseline):
+				if not streamed:
+					self.logger.info(f"First text after {time.monotonic() - started:.2f}s")
+				streamed += delta
+				yield delta
+			self.step_timings['stream'] = time.monotonic() - started
+			get_registry().record_span(
+				self.__class__.__name__, 'stream', self.attempt_id, self.step_timings['stream']
+			)
+
+			# The settled text is authoritative: pick up anything the observer
+			# missed and apply post_process_response.
+			with self.timed_step('get_response'):
+				final = self.get_response(page)
+			if final and not streamed:
+				yield final
+			elif final and final.startswith(streamed) and len(final) > len(streamed):
+				yield final[len(streamed):]
+			elif final and final != streamed:
+				self.logger.info("Settled answer differs from the streamed text; the returned answer replaces it")
+
+		except Exception as e:
+			self.logger.error(f"Error in chat_stream: {e} {traceback.format_exc()}")
+			try:
+				if page:
+					self.save_screenshot(page, error=True)
+			except Exception:
+				pass
+		finally:
+			self.finish_attempt(final is not None)
+		return final
+
+	async def achat_stream(self, user_prompt, system_prompt=None, file_path=None, fresh=False):
+		"""Async twin of chat_stream(). The browser is driven on a thread owned by this handler.
+
+		An async generator has no return value, so the settled answer is not
+		passed on; callers that need it should use the scheduler or chat().
+		"""
+		if self._stream_executor is None:
+			self._stream_executor = ThreadPoolExecutor(max_workers=1)
+		async for delta in iterate_in_thread(
+			lambda: self.chat_stream(user_prompt, system_prompt, file_path, fresh),
+			executor=self._stream_executor,
+		):
+			yield delta
+
+	def conversation(self, fresh=False):
+		"""A Conversation on this handler's persistent page, or on a new one with fresh=True"""
+		from chat_bot_ui_handler.conversation import Conversation
+		return Conversation(self, fresh=fresh)
 
 	def cleanup(self):
+		while self._prefetched:
+			self._close_page(self._prefetched.pop()[0])
 		if self.browser_manager:
 			try:
 				self.browser_manager.stop()
@@ -0,0 +1,202 @@
+"""Answer a JSONL file of prompts, resumably.
+
+    python -m chat_bot_ui_handler batch prompts.jsonl -o answers.jsonl --handler pally --workers 4
+
+Each input line is a JSON object:
+
+    {"id": "img-001", "prompt": "Describe this image", "file_path": "img/001.png",
+     "handler": "gemini", "system_prompt": "..."}
+
+Only ``prompt`` (or ``user_prompt``) is required. ``handler`` defaults to
+--handler, and ``id`` to the line number. The input is read line by line and
+at most a few jobs per worker are queued at a time, so any size of file
+works. Chats run on the worker browsers of a ChatScheduler, ``--workers`` per
+handler; with ``--fresh`` each row gets a new page, readied while the worker
+waits (PREFETCH_PAGES).
+
+Every answer is appended to the output as soon as it arrives and flushed to
+disk:
+
+    {"id": "img-001", "handler": "gemini", "ok": true, "answer": "...", "seconds": 12.3}
+
+The output is the checkpoint. Run the same command again after a crash and
+rows already answered are skipped; failed rows are tried again, and the
+newest line for an id is the one that counts. Progress, throughput and ETA
+are logged every ``--report-every`` seconds.
+"""
+
+import argparse
+import json
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, wait
+
+
+def row_id(row, line_number):
+	return str(row.get('id', line_number))
+
+
+def read_rows(path):
+	"""Yield (line number, row) for every non-empty line"""
+	with open(path, encoding='utf-8') as f:
+		for line_number, line in enumerate(f, 1):
+			line = line.strip()
+			if not line:
+				continue
+			try:
+				yield line_number, json.loads(line)
+			except ValueError as e:
+				raise ValueError(f"{path}:{line_number}: not JSON: {e}")
+
+
+def finished_ids(path):
+	"""Ids whose newest line in the output is a success"""
+	done = set()
+	if not os.path.exists(path):
+		return done
+	with open(path, encoding='utf-8') as f:
+		for line in f:
+			try:
+				row = json.loads(line)
+			except ValueError:
+				# A line cut short by a crash.
+				continue
+			if row.get('ok'):
+				done.add(str(row.get('id')))
+			else:
+				done.discard(str(row.get('id')))
+	return done
+
+
+class Progress:
+	def __init__(self, total, skipped, every):
+		self.total = total
+		self.skipped = skipped
+		self.every = every
+		self.done = 0
+		self.failed = 0
+		self.started = time.monotonic()
+		self._last = self.started
+
+	def add(self, ok):
+		self.done += 1
+		self.failed += 0 if ok else 1
+
+	def line(self):
+		elapsed = time.monotonic() - self.started
+		rate = self.done / elapsed if elapsed else 0.0
+		remaining = self.total - self.skipped - self.done
+		eta = f"{remaining / rate / 60:.1f}m" if rate else "?"
+		return (
+			f"{self.skipped + self.done}/{self.total} rows ({self.failed} failed, {self.skipped} resumed) "
+			f"{rate * 60:.1f} rows/min ETA {eta}"
+		)
+
+	def due(self):
+		now = time.monotonic()
+		if now - self._last >= self.every:
+			self._last = now
+			return True
+		return False
+
+
+def run(args):
+	from custom_logger import logger_config
+
+	from chat_bot_ui_handler.env import load_env
+	from chat_bot_ui_handler.registry import get_handler
+	from chat_bot_ui_handler.scheduler import ChatScheduler
+
+	load_env()
+	done = finished_ids(args.output)
+
+	# First pass: how many rows, and which handlers need workers.
+	total = 0
+	skipped = 0
+	handler_names = set()
+	for line_number, row in read_rows(args.input):
+		total += 1
+		if row_id(row, line_number) in done:
+			skipped += 1
+		else:
+			handler_names.add(row.get('handler') or args.handler)
+	if None in handler_names:
+		raise SystemExit("Rows without a handler need --handler")
+
+	progress = Progress(total, skipped, args.report_every)
+	logger_config.info(f"[batch] {total} rows, {skipped} already answered")
+	if total == skipped:
+		return 0
+
+	try: workers = int(args.workers or os.getenv("BATCH_WORKERS") or 1)
+	except Exception: workers = 1
+	handlers = {name: get_handler(name) for name in handler_names}
+	max_in_flight = max(1, workers * len(handlers) * 2)
+	pending = {}
+
+	def write(record):
+		out.write(json.dumps(record, ensure_ascii=False) + "\n")
+		out.flush()
+		os.fsync(out.fileno())
+		progress.add(record['ok'])
+
+	def collect(block):
+		finished, _ = wait(pending, timeout=None if block else 0, return_when=FIRST_COMPLETED)
+		for future in finished:
+			rid, name, started = pending.pop(future)
+			try:
+				answer = future.result()
+				error = None if answer is not None else "no answer"
+			except Exception as e:
+				answer, error = None, str(e) or type(e).__name__
+			record = {'id': rid, 'handler': name, 'ok': answer is not None, 'answer': answer,
+				'seconds': round(time.monotonic() - started, 2)}
+			if error:
+				record['error'] = error
+			write(record)
+		if progress.due():
+			logger_config.info(f"[batch] {progress.line()}")
+
+	with ChatScheduler({cls: workers for cls in handlers.values()}, fresh=args.fresh) as scheduler, \
+			open(args.output, 'a', encoding='utf-8') as out:
+		for line_number, row in read_rows(args.input):
+			rid = row_id(row, line_number)
+			if rid in done:
+				continue
+			prompt = row.get('prompt') or row.get('user_prompt')
+			name = row.get('handler') or args.handler
+			if not prompt:
+				write({'id': rid, 'handler': name, 'ok': False, 'answer': None, 'error': "no prompt"})
+				continue
+
+			while len(pending) >= max_in_flight:
+				collect(block=True)
+			future = scheduler.submit(
+				handlers[name], prompt, row.get('system_prompt') or args.system_prompt,
+				row.get('file_path'), deadline=args.timeout,
+			)
+			pending[future] = (rid, name, time.monotonic())
+			collect(block=False)
+
+		while pending:
+			collect(block=True)
+
+	logger_config.info(f"[batch] Finished: {progress.line()}")
+	return 1 if progress.failed else 0
+
+
+def add_arguments(parser):
+	parser.add_argument('input', help="JSONL file of prompts")
+	parser.add_argument('-o', '--output', required=True, help="JSONL file answers are appended to")
+	parser.add_argument('--handler', help="handler for rows that do not name one (see registry.py)")
+	parser.add_argument('--workers', type=int, help="worker browsers per handler (default BATCH_WORKERS or 1)")
+	parser.add_argument('--system-prompt', help="system prompt for rows that do not give one")
+	parser.add_argument('--timeout', type=float, default=None, help="seconds each row may take, queueing included")
+	parser.add_argument('--fresh', action='store_true', help="answer every row on a new page instead of the worker's persistent one")
+	parser.add_argument('--report-every', type=float, default=30.0, help="seconds between progress lines")
+
+
+def main(argv=None):
+	parser = argparse.ArgumentParser(description="Answer a JSONL file of prompts")
+	add_arguments(parser)
+	return run(parser.parse_args(argv))
@@ -1,6 +1,8 @@
 from chat_bot_ui_handler.base_ui_flow import BaseUIChat
 
 class BraveAISearch(BaseUIChat):
+	resource_profile = 'lean'
+
 	def get_docker_name(self):
 		return f"{self.config.docker_name}_brave_ai_search"
 
@@ -13,10 +15,11 @@ class BraveAISearch(BaseUIChat):
 			'input_file': 'input[type="file"]',
 			'send_button': 'button[aria-label="Ask"]',
 			'wait_selector': '.answering-label',
-			'result': ".llm-output"
+			'result': ".llm-output",
+			'ready': True
 		}
 
-	def wait_for_selector(self, page):
+	def wait_for_selector(self, page, i=0):
 		page.wait_for_function("""
 			() => {
 				const el = document.querySelectorAll('.answering-label')[0];
@@ -0,0 +1,209 @@
+"""Decide in the page when a chatbot has finished answering.
+
+wait_for_generation used to poll from Python: up to WAIT_FOR_GENERATION_RETRY
+rounds of screenshot + 10s wait_for_selector, and AIStudio then slept a flat
+250s on top. The checks now run inside the page, in a single
+``wait_for_function``, and the answer counts as complete when all of these
+hold at once:
+
+    - nothing matching ``stop_button`` is on screen (when one is declared)
+    - ``wait_selector`` is present (when one is declared)
+    - the response is new since the prompt was sent: there are more
+      ``result`` elements than before, or the last one's text changed
+    - the response text has not changed length for ``stable_ms``
+    - the result elements have not mutated for ``quiet_ms``
+
+This generalises Gemini's stop-button-and-stable-length check to every
+handler. How long each provider took is recorded, and the timeout for the
+next answer adapts to it: a few times the slow end of recent answers and
+never less than twice the slowest, within bounds, instead of the same half
+hour for everyone. Waits that time out are recorded too, so a run of short
+answers cannot shrink the timeout under a long one.
+
+The quiet period only watches the result elements (their children and
+text, not attributes), so spinners, blinking cursors, clocks and rotating
+ads elsewhere on the page do not hold it open.
+
+Environment variables:
+    GENERATION_TIMEOUT    - upper bound on the wait in seconds (default 600)
+    GENERATION_MIN_TIMEOUT - lower bound once latencies are known (default 60)
+    GENERATION_STABLE_MS  - how long the text must hold still (default 2000)
+    GENERATION_QUIET_MS   - how long the result elements must hold still
+                            (default 1000; 0 leaves the check out)
+
+A handler can set its own ``stable_ms`` and ``quiet_ms`` in its selectors,
+and its own upper bound through ``generation_timeout()`` (Gemini reads
+GEMINI_GENERATION_TIMEOUT there).
+"""
+
+import os
+import threading
+import time
+from collections import deque
+
+from chat_bot_ui_handler.page_scripts import with_query_all
+
+# Longest single wait_for_function; between slices the caller can cancel.
+_SLICE_S = 5
+
+# Also counts the result elements, for the stream observer (see streaming.py).
+_BASELINE_JS = with_query_all("""([container, result]) => {
+	const els = queryAll(container);
+	return {
+		count: els.length,
+		last: els.length ? (els[els.length - 1].innerText || '') : '',
+		results: queryAll(result).length,
+	};
+}""")
+
+# Keeps its own state on window between polls, so one wait_for_function
+# carries the stability and quiet-period clocks. Result elements are observed
+# as they appear. Returns a summary once done.
+_DONE_JS = with_query_all("""(o) => {
+	let s = window.__cbuiCompletion;
+	if (!s || s.token !== o.token) {
+		if (s && s.observer) s.observer.disconnect();
+		s = window.__cbuiCompletion = {
+			token: o.token, len: -1, changed: Date.now(), mutated: Date.now(), polls: 0, watched: new Set(),
+		};
+		s.observer = new MutationObserver(() => { s.mutated = Date.now(); });
+	}
+	s.polls++;
+	const now = Date.now();
+	const els = queryAll(o.result);
+	for (const el of els) {
+		if (!s.watched.has(el)) {
+			s.watched.add(el);
+			s.mutated = now;
+			s.observer.observe(el, {childList: true, subtree: true, characterData: true});
+		}
+	}
+	const len = els.reduce((n, el) => n + (el.innerText || '').length, 0);
+	if (len !== s.len) {
+		s.len = len;
+		s.changed = now;
+	}
+	const last = els.length ? (els[els.length - 1].innerText || '') : '';
+	const fresh = !o.baseline || els.length > o.baseline.count || last !== o.baseline.last;
+	const generating = !!o.stop && queryAll(o.stop).length > 0;
+	const marked = !o.done || queryAll(o.done).length > 0;
+	if (fresh && len > 0 && !generating && marked
+			&& now - s.changed >= o.stableMs && (o.quietMs <= 0 || now - s.mutated >= o.quietMs)) {
+		s.observer.disconnect();
+		return {polls: s.polls, length: len};
+	}
+	return false;
+}""")
+
+
+def _env_ms(name, default):
+	try: return int(os.getenv(name) or default)
+	except Exception: return default
+
+
+class LatencyTracker:
+	"""Recent completion times per provider, and the timeout they suggest"""
+
+	def __init__(self, samples=50):
+		self.samples = samples
+		self._history = {}
+		self._lock = threading.Lock()
+
+	def record(self, provider, seconds):
+		"""Record how long an answer took, or how long a wait ran before it timed out"""
+		with self._lock:
+			self._history.setdefault(provider, deque(maxlen=self.samples)).append(seconds)
+
+	def timeout_for(self, provider, ceiling=None):
+		"""Seconds to wait for the next answer from provider, at most ceiling (default GENERATION_TIMEOUT)"""
+		if ceiling is None:
+			try: ceiling = float(os.getenv("GENERATION_TIMEOUT") or 600)
+			except Exception: ceiling = 600.0
+		try: floor = float(os.getenv("GENERATION_MIN_TIMEOUT") or 60)
+		except Exception: floor = 60.0
+
+		with self._lock:
+			history = sorted(self._history.get(provider, ()))
+		if len(history) < 3:
+			return ceiling
+		p95 = history[min(len(history) - 1, int(len(history) * 0.95))]
+		return max(floor, min(ceiling, max(p95 * 3, history[-1] * 2)))
+
+
+_tracker = LatencyTracker()
+
+
+def get_latency_tracker():
+	return _tracker
+
+
+class CompletionDetector:
+	def __init__(self, selectors, baseline=None):
+		self.options = {
+			'result': selectors.get('generation_container', selectors['result']),
+			'stop': selectors.get('stop_button'),
+			'done': selectors.get('wait_selector'),
+			'baseline': baseline,
+			'stableMs': selectors.get('stable_ms') or _env_ms("GENERATION_STABLE_MS", 2000),
+			'quietMs': selectors['quiet_ms'] if selectors.get('quiet_ms') is not None else _env_ms("GENERATION_QUIET_MS", 1000),
+			'token': f"{time.monotonic()}",
+		}
+
+	@staticmethod
+	def baseline(page, selectors):
+		"""What the result container held before the prompt was sent, or None"""
+		try:
+			return page.evaluate(_BASELINE_JS, [selectors.get('generation_container', selectors['result']), selectors['result']])
+		except Exception:
+			return None
+
+	@staticmethod
+	async def abaseline(page, selectors):
+		try:
+			return await page.evaluate(_BASELINE_JS, [selectors.get('generation_container', selectors['result']), selectors['result']])
+		except Exception:
+			return None
+
+	def wait(self, page, timeout_s, between=None):
+		"""Block until the answer is complete. Returns the page's summary, or None on timeout.
+
+		The wait is cut into short slices with ``between()`` called after each,
+		so a cancellation check can interrupt it; the in-page clocks carry over.
+		"""
+		deadline = time.monotonic() + timeout_s
+		while True:
+			remaining = deadline - time.monotonic()
+			if remaining <= 0:
+				return None
+			try:
+				handle = page.wait_for_function(
+					_DONE_JS, arg=self.options, polling=250, timeout=min(remaining, _SLICE_S) * 1000
+				)
+				return handle.json_value()
+			except Exception as e:
+				if not _is_timeout(e):
+					raise
+			if between:
+				between()
+
+	async def await_done(self, page, timeout_s, between=None):
+		"""``wait`` for an async page"""
+		deadline = time.monotonic() + timeout_s
+		while True:
+			remaining = deadline - time.monotonic()
+			if remaining <= 0:
+				return None
+			try:
+				handle = await page.wait_for_function(
+					_DONE_JS, arg=self.options, polling=250, timeout=min(remaining, _SLICE_S) * 1000
+				)
+				return await handle.json_value()
+			except Exception as e:
+				if not _is_timeout(e):
+					raise
+			if between:
+				between()
+
+
+def _is_timeout(error):
+	return 'Timeout' in type(error).__name__ or 'timeout' in str(error).lower()
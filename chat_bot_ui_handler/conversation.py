@@ -0,0 +1,84 @@
+"""Several prompts in one chat, on a page that is set up once.
+
+chat() runs google_login, load_url and login before every prompt, so each
+follow-up lands in a new chat after a full navigation. A Conversation
+prepares its page on the first turn and then only types, sends and waits:
+
+    with GeminiUIChat().conversation() as talk:
+        talk.ask("Describe this picture", file_path="cat.png")
+        talk.ask("Now as a haiku")
+        print(talk.turns[-1].answer)
+
+Each turn notes how many answers were on the page before it was sent and
+reads only what came after them, so an earlier answer is never returned as a
+later one. Answers are counted by the handler's ``turn`` selector, one
+element per answer, when it has one; otherwise the answer is every ``result``
+element that appeared since, joined, less a leading echo of the prompt
+(see BaseUIChat.turn_text). Answers are not taken from, or put
+in, the response cache: they depend on the turns before them.
+
+If a turn fails the page may be anywhere, so the next turn prepares it again,
+which starts a new chat on the provider's side; ``restarts`` counts these.
+Like the handler, a Conversation drives sync Playwright objects and belongs
+to the thread that created it.
+"""
+
+
+class Turn:
+	def __init__(self, index, user_prompt, answer, seconds):
+		self.index = index
+		self.user_prompt = user_prompt
+		self.answer = answer
+		self.seconds = seconds
+
+
+class Conversation:
+	def __init__(self, handler, page=None, fresh=False):
+		"""page defaults to the handler's persistent page, or a new page when fresh=True"""
+		self.handler = handler
+		self.fresh = fresh
+		self.page = page
+		self.turns = []
+		self.restarts = 0
+		self._prepared = False
+
+	def _page(self):
+		if self.page is None:
+			manager = self.handler.get_browser_manager()
+			self.page = manager.get_fresh_page() if self.fresh else manager.start()
+		return self.page
+
+	def ask(self, user_prompt, system_prompt=None, file_path=None, return_result=False):
+		"""Send a prompt in this conversation and return the answer (None on failure)"""
+		handler = self.handler
+		page = self._page()
+		if not self._prepared and self.turns:
+			self.restarts += 1
+			handler.logger.info("Previous turn failed; starting the conversation over")
+
+		handler.read_turn = True
+		try:
+			answer = handler.process(page, user_prompt, system_prompt, file_path, prepared=self._prepared)
+		finally:
+			handler.read_turn = False
+			handler._turn_start = None
+
+		self._prepared = answer is not None
+		self.turns.append(Turn(len(self.turns), user_prompt, answer, handler.attempt_seconds))
+		return handler._result(answer, return_result)
+
+	def close(self):
+		"""Close the page if this conversation opened a fresh one"""
+		if self.fresh and self.page is not None:
+			try:
+				self.page.close()
+			except Exception:
+				pass
+		self.page = None
+		self._prepared = False
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *exc):
+		self.close()
@@ -13,7 +13,8 @@ class CopilotUIChat(BaseUIChat):
             'input': 'textarea[id="userInput"]',
             'send_button': 'button[aria-label="Submit message"]',
             'wait_selector': 'button[aria-label="Talk to Copilot"]',
-            'result': 'div[data-content="ai-message"] p'
+            'result': 'div[data-content="ai-message"] p',
+            'turn': 'div[data-content="ai-message"]'
         }
 
     def login(self, page):
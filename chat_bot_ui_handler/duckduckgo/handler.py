@@ -1,6 +1,8 @@
 from chat_bot_ui_handler.base_ui_flow import BaseUIChat
 
 class DuckDuckGoAISearch(BaseUIChat):
+	resource_profile = 'lean'
+
 	def get_docker_name(self):
 		return f"{self.config.docker_name}_duck_duck_go_ai_search"
 
@@ -19,17 +21,18 @@ class DuckDuckGoAISearch(BaseUIChat):
 				}
 			}
 		""", timeout=10000)
-		page.wait_for_timeout(2000)
+		self.settle(page, 'dismiss', 2000)
 
 	def get_selectors(self):
 		return {
 			'input': 'textarea[name="user-prompt"]',
 			'input_file': 'input[type="file"]',
 			'send_button': 'main button[type="submit"]',
-			'result': 'main div[data-activeresponse="true"] p'
+			'result': 'main div[data-activeresponse="true"] p',
+			'ready': True
 		}
 
-	def wait_for_selector(self, page):
+	def wait_for_selector(self, page, i=0):
 		page.wait_for_function("""
 			() => {
 				const el = document.querySelectorAll('main div[data-activeresponse="false"] span')[0];
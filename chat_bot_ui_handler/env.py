@@ -0,0 +1,22 @@
+"""Load the .env file when it is needed instead of on ``import chat_bot_ui_handler``.
+
+Handlers call ``load_env()`` when they are built, so scripts that construct
+one keep seeing their .env settings. Call it yourself first if something
+else reads the environment before a handler exists.
+"""
+
+import threading
+
+_loaded = False
+_lock = threading.Lock()
+
+
+def load_env(force=False):
+	"""Load .env through jebin_lib once per process; force=True loads it again"""
+	global _loaded
+	with _lock:
+		if _loaded and not force:
+			return
+		from jebin_lib import load_env as _load_env
+		_load_env()
+		_loaded = True
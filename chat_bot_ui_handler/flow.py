@@ -0,0 +1,165 @@
+"""The steps of a chat as a dependency graph.
+
+BaseUIChat.process used to run google_login, load_url, login, upload_file,
+fill_prompt and send strictly one after another. Some of that work does not
+touch the page at all, such as hashing and shrinking the file to upload.
+Declared as steps with dependencies, that work runs while the page loads,
+and a chat with a file costs its critical path rather than the sum of its
+steps:
+
+    steps = [
+        Step('stage_upload', lambda done: prepare(file_path), page=False),
+        Step('load_url', lambda done: handler.load_url(page)),
+        Step('upload_file', lambda done: handler.upload_file(page, done['stage_upload']),
+             after=['load_url', 'stage_upload']),
+    ]
+    run_steps(steps, handler.timed_step)
+
+Page steps run on the calling thread, one at a time, in the order given
+once their dependencies are done: a sync Playwright page belongs to the
+thread that made it. Steps with ``page=False`` run on a thread pool as soon
+as their dependencies are done, alongside the page steps. Each step gets the
+results of the steps before it as a dict and its own result is stored under
+its name.
+
+The first step to fail stops the run: steps not yet started are dropped,
+and the error is raised once running off-page steps have finished.
+
+Step timings overlap, so their sum overstates how long a run took. Pass a
+``spans`` dict to run_steps to get each step's start and end, and
+critical_path() for the chain of steps that made up the wall-clock time.
+
+The Google session check is a page step (it shares the page's cookies), so it
+does not overlap anything. BaseUIChat.google_login_steps only moves it after
+load_url, so a good session costs no wait before the page starts loading.
+"""
+
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import nullcontext
+
+
+class Step:
+	def __init__(self, name, run, after=(), page=True):
+		self.name = name
+		self.run = run
+		self.after = tuple(after)
+		self.page = page
+
+	def __repr__(self):
+		return f"Step({self.name!r}, after={list(self.after)}, page={self.page})"
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _default_executor():
+	global _executor
+	with _executor_lock:
+		if _executor is None:
+			_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="flow")
+		return _executor
+
+
+def check_steps(steps):
+	"""Raise ValueError for duplicate names, unknown dependencies or cycles"""
+	names = [step.name for step in steps]
+	if len(set(names)) != len(names):
+		raise ValueError(f"Duplicate step names in {names}")
+	for step in steps:
+		missing = set(step.after) - set(names)
+		if missing:
+			raise ValueError(f"Step {step.name} waits for unknown steps {sorted(missing)}")
+
+	done = set()
+	remaining = list(steps)
+	while remaining:
+		ready = [step for step in remaining if set(step.after) <= done]
+		if not ready:
+			raise ValueError(f"Steps {[step.name for step in remaining]} wait for each other")
+		done.update(step.name for step in ready)
+		remaining = [step for step in remaining if step.name not in done]
+
+
+def critical_path(steps, spans):
+	"""The chain of steps that decided how long a run took, from spans {name: (started, finished)}.
+
+	Each step waited on whichever finished last of its dependencies and, for
+	a page step, the page step run before it: page steps share one thread.
+	Steps without a span (never run) are left out.
+	"""
+	by_name = {step.name: step for step in steps if step.name in spans}
+	page_order = sorted((name for name, step in by_name.items() if step.page), key=lambda name: spans[name][0])
+	path = []
+	name = max(by_name, key=lambda name: spans[name][1], default=None)
+	while name:
+		path.append(name)
+		step = by_name[name]
+		before = [dep for dep in step.after if dep in by_name]
+		if step.page and page_order.index(name):
+			before.append(page_order[page_order.index(name) - 1])
+		name = max(before, key=lambda dep: spans[dep][1], default=None)
+	return path[::-1]
+
+
+def run_steps(steps, timed=None, executor=None, spans=None):
+	"""Run steps in dependency order, off-page steps alongside page steps. Returns {name: result}
+
+	timed(name) is a context manager wrapped around each step, such as
+	BaseUIChat.timed_step. spans, a dict, is filled with
+	{name: (started, finished)} in time.monotonic() seconds.
+	"""
+	check_steps(steps)
+	timed = timed or (lambda name: nullcontext())
+	executor = executor or _default_executor()
+	results = {}
+	running = {}
+	waiting = list(steps)
+	error = None
+
+	def run(step):
+		started = time.monotonic()
+		try:
+			with timed(step.name):
+				return step.run(dict(results))
+		finally:
+			if spans is not None:
+				spans[step.name] = (started, time.monotonic())
+
+	def collect(block):
+		nonlocal error
+		finished, _ = wait(running, timeout=None if block else 0, return_when=FIRST_COMPLETED)
+		for future in finished:
+			step = running.pop(future)
+			try:
+				results[step.name] = future.result()
+			except BaseException as e:
+				error = error or e
+
+	while waiting and error is None:
+		for step in [step for step in waiting if not step.page and set(step.after) <= set(results)]:
+			waiting.remove(step)
+			running[executor.submit(run, step)] = step
+
+		step = next((step for step in waiting if step.page and set(step.after) <= set(results)), None)
+		if step is not None:
+			waiting.remove(step)
+			try:
+				results[step.name] = run(step)
+			except BaseException as e:
+				error = e
+			if running:
+				collect(block=False)
+		elif running:
+			collect(block=True)
+		elif waiting:
+			# check_steps rules this out; guard against a step list changed mid-run.
+			raise ValueError(f"Steps {[step.name for step in waiting]} can never run")
+
+	while running:
+		collect(block=True)
+	if error is not None:
+		raise error
+	return results
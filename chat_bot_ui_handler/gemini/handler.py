@@ -1,7 +1,7 @@
+import os
+
 from chat_bot_ui_handler.base_ui_flow import BaseUIChat
 from custom_logger import logger_config
-import os
-import time
 
 class GeminiUIChat(BaseUIChat):
 	def get_docker_name(self):
@@ -18,9 +18,19 @@ class GeminiUIChat(BaseUIChat):
 			'input': 'rich-textarea div.ql-editor[contenteditable="true"]',
 			'send_button': 'button[aria-label="Send message"]',
 			'wait_selector': 'message-content',
-			'result': 'message-content'
+			'result': 'message-content',
+			'stop_button': 'button[aria-label="Stop response"]',
+			'generation_container': 'model-response',
+			# One preview per attached file
+			'upload_done': 'uploader-file-preview',
+			'ready': True
 		}
 
+	def generation_timeout(self):
+		# Still honoured from before the adaptive timeout: caps Gemini on its own.
+		try: return float(os.getenv("GEMINI_GENERATION_TIMEOUT") or 0) or None
+		except Exception: return None
+
 	def login(self, page):
 		"""No model to pick — the default one is used, so just wait for the input."""
 		page.keyboard.press("Escape")
@@ -39,41 +49,11 @@ class GeminiUIChat(BaseUIChat):
 		page.wait_for_timeout(1000)
 		self.save_screenshot(page)
 
+		before = self.attachment_count(page)
 		with page.expect_file_chooser() as fc_info:
 			page.locator('button[data-test-id="local-images-files-uploader-button"]').click(force=True)
 		fc_info.value.set_files(file_path)
 
-		page.wait_for_timeout(5000)
+		self.wait_for_upload(page, before)
 		self.logger.info("File uploaded successfully")
 		self.save_screenshot(page)
-
-	def wait_for_generation(self, page):
-		"""Gemini shows a stop button while streaming; it disappears when done.
-		Wait for that, then for the text to stop growing."""
-		try: timeout = int(os.getenv("GEMINI_GENERATION_TIMEOUT") or 300)
-		except Exception: timeout = 300
-
-		deadline = time.monotonic() + timeout
-		last_len = -1
-		stable_checks = 0
-		while time.monotonic() < deadline:
-			state = page.evaluate("""() => ({
-				generating: !!document.querySelector('button[aria-label="Stop response"]'),
-				length: (document.querySelector('model-response') || {innerText: ''}).innerText.length,
-			})""")
-
-			if not state['generating'] and state['length'] > 0 and state['length'] == last_len:
-				stable_checks += 1
-				if stable_checks >= 2:
-					self.logger.info("Response generation complete")
-					self.save_screenshot(page)
-					return
-			else:
-				stable_checks = 0
-
-			last_len = state['length']
-			self.logger.info(f"Waiting for response... {last_len} chars", overwrite=True)
-			page.wait_for_timeout(2000)
-
-		self.logger.error(f"Response did not settle within {timeout}s; using what is on screen")
-		self.save_screenshot(page)
\ No newline at end of file
@@ -26,6 +26,7 @@ from custom_logger import logger_config
 
 from chat_bot_ui_handler import notifier as notifier_mod
 from chat_bot_ui_handler.notifier import Notifier
+from chat_bot_ui_handler.probe import first_visible, probe, visible_keys
 
 SIGNED_IN_URL_MARKERS = ("myaccount.google.com", "accounts.google.com/b/0", "/ManageAccount")
 
@@ -114,19 +115,22 @@ class GoogleLoginInjector:
 		# Signed in but parked on some other Google property.
 		return "accounts.google.com" not in state['url'] and "gemini.google.com" in state['url']
 
-	def _click_if_present(self, page, selector, description):
-		try:
-			locator = page.locator(selector).first
-			if not locator.is_visible(timeout=2000):
-				return False
-			locator.click()
-			logger_config.info(f"[GoogleLogin] Clicked {description}")
-			page.wait_for_timeout(2000)
-			return True
-		except Exception as e:
-			# Not finding it is normal; failing to click one that is there is not.
-			logger_config.info(f"[GoogleLogin] Could not click {description}: {e}")
-			return False
+	def _click_first_present(self, page, targets):
+		"""Click the first visible of targets, a {selector: description} dict.
+
+		All of them are looked for in one probe, so the ones that are not on
+		screen cost nothing.
+		"""
+		for selector in visible_keys(probe(page, list(targets), text_limit=0), list(targets)):
+			try:
+				page.locator(selector).first.click(timeout=5000)
+				logger_config.info(f"[GoogleLogin] Clicked {targets[selector]}")
+				page.wait_for_timeout(2000)
+				return True
+			except Exception as e:
+				# Not finding it is normal; failing to click one that is there is not.
+				logger_config.info(f"[GoogleLogin] Could not click {targets[selector]}: {e}")
+		return False
 
 	# ------------------------------------------------------------------ #
 	# CAPTCHA
@@ -137,18 +141,13 @@ class GoogleLoginInjector:
 		return page.locator(selector).first if selector else None
 
 	def _find_first_selector(self, page, selectors):
-		for selector in selectors:
-			try:
-				if page.locator(selector).first.is_visible(timeout=1000):
-					return selector
-			except Exception:
-				continue
-		return None
+		return first_visible(page, selectors)
 
 	def _is_captcha(self, page):
+		state = probe(page, CAPTCHA_IMAGE_SELECTORS + CAPTCHA_INPUT_SELECTORS, text_limit=0)
 		return (
-			self._find_first_selector(page, CAPTCHA_IMAGE_SELECTORS) is not None
-			and self._find_first_selector(page, CAPTCHA_INPUT_SELECTORS) is not None
+			bool(visible_keys(state, CAPTCHA_IMAGE_SELECTORS))
+			and bool(visible_keys(state, CAPTCHA_INPUT_SELECTORS))
 		)
 
 	def _capture_captcha_image(self, page, image_selector, shot_path):
@@ -254,14 +253,11 @@ class GoogleLoginInjector:
 		Google renders it in a <samp> on the number-match screen, but the markup
 		shifts between variants, so fall back to reading the prompt text.
 		"""
-		try:
-			samp = page.locator("samp").first
-			if samp.is_visible(timeout=2000):
-				digits = re.sub(r"\D", "", samp.inner_text())
-				if digits:
-					return digits
-		except Exception:
-			pass
+		samp = probe(page, {'samp': 'samp'})['samp']
+		if samp['visible']:
+			digits = re.sub(r"\D", "", samp['text'])
+			if digits:
+				return digits
 
 		patterns = (
 			r"[Tt]ap\s+(\d{1,3})\b",
@@ -449,20 +445,15 @@ class GoogleLoginInjector:
 				continue
 
 			# Account chooser: pick the saved account, else add a new one.
-			if self._click_if_present(page, f'[data-identifier="{self.email}"]', "saved account"):
-				continue
-			if self._click_if_present(page, f'[data-email="{self.email}"]', "saved account (alt)"):
-				continue
-			if self._click_if_present(page, 'text="Use another account"', "'Use another account'"):
-				continue
-
-			# Post-login interstitials.
-			dismissed = False
+			# Then post-login interstitials.
+			targets = {
+				f'[data-identifier="{self.email}"]': "saved account",
+				f'[data-email="{self.email}"]': "saved account (alt)",
+				'text="Use another account"': "'Use another account'",
+			}
 			for label in _SKIP_BUTTON_TEXTS:
-				if self._click_if_present(page, f'button:has-text("{label}")', f"'{label}'"):
-					dismissed = True
-					break
-			if dismissed:
+				targets[f'button:has-text("{label}")'] = f"'{label}'"
+			if self._click_first_present(page, targets):
 				continue
 
 			logger_config.info(
@@ -1,17 +1,4 @@
-from chat_bot_ui_handler.base_ui_flow import BaseUIChat
-import os
+from chat_bot_ui_handler.specs import spec_handler
 
-class GrokUIChat(BaseUIChat):
-    def get_docker_name(self):
-        return f"{self.config.docker_name}_grok_ui_chat"
-
-    def get_url(self):
-        return "https://grok.com/"
-
-    def get_selectors(self):
-        return {
-            'input': 'div[contenteditable="true"]',
-            'send_button': 'button[type="submit"]',
-            'wait_selector': 'button[aria-label="Enter voice mode"]',
-            'result': '#last-reply-container .message-bubble'
-        }
\ No newline at end of file
+# Declared in handler_specs/grok.json
+GrokUIChat = spec_handler('grok')
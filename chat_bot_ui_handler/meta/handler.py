@@ -3,6 +3,8 @@ from chat_bot_ui_handler.base_ui_flow import BaseUIChat
 from custom_logger import logger_config
 
 class MetaUIChat(BaseUIChat):
+	upload_via_attach_folder = True
+
 	def __init__(self, config=None):
 		super().__init__(config)
 
@@ -41,13 +43,14 @@ class MetaUIChat(BaseUIChat):
 				self.get_browser_manager().launcher.choose_file_via_xdotool,
 				config=self.config
 			)
+			before = self.attachment_count(page)
 			choose_file_via_xdotool(file_path=file_path)
+			self.wait_for_upload(page, before)
 
 			self.logger.info("File uploaded successfully")
-			page.wait_for_timeout(5000)
 			self.save_screenshot(page)
 
-	def wait_for_selector(self, page):
+	def wait_for_selector(self, page, i=0):
 		page.wait_for_function('''
 			() => {
 				const element = document.querySelector("div[aria-label='Add media and more']");
@@ -56,5 +59,6 @@ class MetaUIChat(BaseUIChat):
 		''', timeout=10000)
 
 	def get_response_text(self, page):
-		selectors = self.get_selectors()
-		return page.locator(selectors['result']).first.inner_text()
\ No newline at end of file
+		if self._turn_start is not None:
+			return super().get_response_text(page)
+		return self.response_locator(page, fallback='first').inner_text()
\ No newline at end of file
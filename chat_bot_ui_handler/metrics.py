@@ -0,0 +1,193 @@
+"""Step latency metrics for every handler.
+
+Every ``timed_step`` of a chat is recorded as a span tagged with the handler,
+the step and the attempt (one call to ``process``). The registry keeps:
+
+    chat_bot_step_seconds       - histogram of step durations per handler/step
+    chat_bot_loop_iterations    - histogram of poll/retry loop iterations, e.g.
+                                  how many rounds wait_for_generation took
+    chat_bot_chats_total        - finished chats per handler and outcome
+
+Exports:
+    prometheus_text()           - Prometheus text exposition format
+    serve_metrics(port)         - serve it on http://0.0.0.0:<port>/metrics
+    METRICS_JSONL               - when set, every attempt is appended to this
+                                  file as one JSON line with its spans
+
+Environment variables:
+    METRICS_JSONL - path of the per-attempt JSONL log (default: off)
+"""
+
+import json
+import os
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from custom_logger import logger_config
+
+DURATION_BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+ITERATION_BUCKETS = (1, 2, 3, 5, 10, 20, 50, 100)
+
+
+def new_attempt_id():
+	return uuid.uuid4().hex[:12]
+
+
+class Histogram:
+	def __init__(self, buckets):
+		self.buckets = buckets
+		self.counts = [0] * len(buckets)
+		self.count = 0
+		self.sum = 0.0
+
+	def observe(self, value):
+		self.count += 1
+		self.sum += value
+		for i, bound in enumerate(self.buckets):
+			if value <= bound:
+				self.counts[i] += 1
+
+
+def _labels(**labels):
+	return ",".join(f'{key}="{value}"' for key, value in labels.items())
+
+
+class MetricsRegistry:
+	def __init__(self, jsonl_path=None):
+		self.jsonl_path = jsonl_path
+		self._lock = threading.Lock()
+		self._durations = {}
+		self._iterations = {}
+		self._chats = {}
+		self._spans = {}
+
+	def record_span(self, handler, step, attempt, seconds, ok=True):
+		with self._lock:
+			histogram = self._durations.get((handler, step))
+			if histogram is None:
+				histogram = self._durations[(handler, step)] = Histogram(DURATION_BUCKETS)
+			histogram.observe(seconds)
+			if attempt:
+				self._spans.setdefault(attempt, []).append(
+					{'step': step, 'seconds': round(seconds, 4), 'ok': ok}
+				)
+
+	def record_iterations(self, handler, loop, count):
+		with self._lock:
+			histogram = self._iterations.get((handler, loop))
+			if histogram is None:
+				histogram = self._iterations[(handler, loop)] = Histogram(ITERATION_BUCKETS)
+			histogram.observe(count)
+
+	def finish_attempt(self, handler, attempt, ok, seconds=None):
+		"""Count the chat and write its spans to the JSONL log. seconds is its wall-clock time"""
+		outcome = 'ok' if ok else 'error'
+		with self._lock:
+			self._chats[(handler, outcome)] = self._chats.get((handler, outcome), 0) + 1
+			spans = self._spans.pop(attempt, [])
+
+		if not self.jsonl_path:
+			return
+		record = {
+			'ts': time.time(),
+			'handler': handler,
+			'attempt': attempt,
+			'ok': ok,
+			# Spans of steps that ran alongside each other overlap; prefer the wall clock.
+			'total_seconds': round(seconds if seconds is not None else sum(span['seconds'] for span in spans), 4),
+			'spans': spans,
+		}
+		try:
+			with self._lock, open(self.jsonl_path, 'a') as f:
+				f.write(json.dumps(record) + "\n")
+		except Exception as e:
+			logger_config.debug(f"Could not write metrics to {self.jsonl_path}: {e}")
+
+	def _histogram_lines(self, name, histograms, label_names):
+		lines = [f"# TYPE {name} histogram"]
+		for key, histogram in sorted(histograms.items()):
+			labels = _labels(**dict(zip(label_names, key)))
+			for bound, count in zip(histogram.buckets, histogram.counts):
+				lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {count}')
+			lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {histogram.count}')
+			lines.append(f'{name}_sum{{{labels}}} {histogram.sum}')
+			lines.append(f'{name}_count{{{labels}}} {histogram.count}')
+		return lines
+
+	def prometheus_text(self):
+		with self._lock:
+			lines = self._histogram_lines('chat_bot_step_seconds', self._durations, ('handler', 'step'))
+			lines += self._histogram_lines('chat_bot_loop_iterations', self._iterations, ('handler', 'loop'))
+			lines.append("# TYPE chat_bot_chats_total counter")
+			for (handler, outcome), count in sorted(self._chats.items()):
+				lines.append(f'chat_bot_chats_total{{{_labels(handler=handler, outcome=outcome)}}} {count}')
+		return "\n".join(lines) + "\n"
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_registry():
+	"""The process-wide registry, configured from the environment on first use"""
+	global _registry
+	if _registry is None:
+		with _registry_lock:
+			if _registry is None:
+				_registry = MetricsRegistry(os.getenv("METRICS_JSONL") or None)
+	return _registry
+
+
+def prometheus_text():
+	return get_registry().prometheus_text()
+
+
+def serve_metrics(port=9464, host="0.0.0.0"):
+	"""Serve /metrics on a daemon thread. Returns the server; call shutdown() to stop it"""
+	class _MetricsHandler(BaseHTTPRequestHandler):
+		def do_GET(self):
+			if self.path.split("?")[0] != "/metrics":
+				self.send_error(404)
+				return
+			body = prometheus_text().encode("utf-8")
+			self.send_response(200)
+			self.send_header("Content-Type", "text/plain; version=0.0.4")
+			self.send_header("Content-Length", str(len(body)))
+			self.end_headers()
+			self.wfile.write(body)
+
+		def log_message(self, format, *args):
+			pass
+
+	server = ThreadingHTTPServer((host, port), _MetricsHandler)
+	threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+	logger_config.info(f"Serving metrics on http://{host}:{port}/metrics")
+	return server
+
+
+class ChatResult:
+	"""An answer together with how long each step took to get it"""
+
+	def __init__(self, text, handler, attempt, timings, seconds=None):
+		self.text = text
+		self.handler = handler
+		self.attempt = attempt
+		self.timings = timings
+		# Wall-clock time; steps may overlap, so it can be less than their sum.
+		self.seconds = seconds
+
+	@property
+	def ok(self):
+		return self.text is not None
+
+	@property
+	def total_seconds(self):
+		return self.seconds if self.seconds is not None else sum(self.timings.values())
+
+	def __str__(self):
+		return self.text or ""
+
+	def __repr__(self):
+		return f"ChatResult(handler={self.handler!r}, ok={self.ok}, total_seconds={self.total_seconds:.2f})"
@@ -0,0 +1,139 @@
+"""Send one prompt to several chatbots at once.
+
+Asking providers one after another makes the slowest of them set the latency.
+MultiChat runs every handler in parallel and returns as soon as the mode is
+satisfied:
+
+    'first_completed' - the first usable answer
+    'all'             - every answer that arrives before its timeout
+    'quorum'          - the first ``quorum`` answers
+
+    multi = MultiChat([GeminiUIChat, PerplexityUIChat, BraveAISearch], mode='first_completed')
+    answers = multi.chat("What is the capital of Peru?")   # {'BraveAISearch': '...'}
+    multi.close()
+
+Each handler is driven on its own thread, kept for the life of the MultiChat,
+so it has its own BrowserManager and its sync Playwright objects always stay on
+the thread that created them. A handler that returns None counts as failed.
+
+Providers that are no longer needed (the losers, or one past its timeout) get
+their ``cancel_event`` set and stop at their next step. A thread cannot be
+interrupted in the middle of a Playwright call, so cancellation is cooperative:
+the answer is returned right away, and the loser winds down in the background.
+
+Environment variables:
+    MULTI_CHAT_TIMEOUT - seconds each provider gets by default (default 300)
+"""
+
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from browser_manager.browser_config import BrowserConfig
+from custom_logger import logger_config
+
+MODES = ('first_completed', 'all', 'quorum')
+
+
+class MultiChat:
+	def __init__(self, handlers, mode='first_completed', quorum=2, timeout=None, timeouts=None, config_factory=None):
+		"""handlers is a list of BaseUIChat subclasses or instances.
+
+		timeouts maps a handler class name to its own timeout in seconds and
+		overrides timeout for that provider.
+		"""
+		if mode not in MODES:
+			raise ValueError(f"Unknown mode {mode!r}, expected one of {', '.join(MODES)}")
+		self.mode = mode
+		self.quorum = quorum
+		try: self.timeout = float(timeout if timeout is not None else os.getenv("MULTI_CHAT_TIMEOUT") or 300)
+		except Exception: self.timeout = 300.0
+		self.timeouts = timeouts or {}
+
+		config_factory = config_factory or (lambda handler_cls: BrowserConfig())
+		self.handlers = {}
+		for handler in handlers:
+			if isinstance(handler, type):
+				handler = handler(config_factory(handler))
+			self.handlers[type(handler).__name__] = handler
+
+		self.executors = {name: ThreadPoolExecutor(max_workers=1) for name in self.handlers}
+
+	def _needed(self):
+		if self.mode == 'first_completed':
+			return 1
+		if self.mode == 'quorum':
+			return min(self.quorum, len(self.handlers))
+		return len(self.handlers)
+
+	def _run(self, name, user_prompt, system_prompt, file_path):
+		handler = self.handlers[name]
+		# Cleared here rather than on submit: a loser from the previous call may
+		# still be winding down on this thread, and must stay cancelled.
+		handler.cancel_event.clear()
+		started = time.monotonic()
+		result = handler.chat(user_prompt, system_prompt, file_path)
+		logger_config.info(f"[MultiChat] {name} finished in {time.monotonic() - started:.2f}s")
+		return result
+
+	def chat(self, user_prompt, system_prompt=None, file_path=None):
+		"""Ask every provider. Returns {handler class name: answer} in the order answers arrived"""
+		started = time.monotonic()
+		futures = {}
+		deadlines = {}
+		for name in self.handlers:
+			future = self.executors[name].submit(self._run, name, user_prompt, system_prompt, file_path)
+			futures[future] = name
+			deadlines[future] = started + float(self.timeouts.get(name, self.timeout))
+
+		needed = self._needed()
+		answers = {}
+		pending = set(futures)
+		while pending and len(answers) < needed:
+			now = time.monotonic()
+			for future in [f for f in pending if deadlines[f] <= now]:
+				logger_config.info(f"[MultiChat] {futures[future]} timed out")
+				self._cancel(future, futures)
+				pending.discard(future)
+			if not pending:
+				break
+
+			done, pending = wait(
+				pending,
+				timeout=max(0.0, min(deadlines[f] for f in pending) - now),
+				return_when=FIRST_COMPLETED,
+			)
+			for future in done:
+				name = futures[future]
+				try:
+					result = future.result()
+				except Exception as e:
+					logger_config.error(f"[MultiChat] {name} failed: {e}")
+					continue
+				if result is not None and len(answers) < needed:
+					answers[name] = result
+
+		for future in pending:
+			self._cancel(future, futures)
+
+		logger_config.info(
+			f"[MultiChat] {len(answers)}/{len(self.handlers)} answers in {time.monotonic() - started:.2f}s"
+			f" ({self.mode}): {', '.join(answers) or 'none'}"
+		)
+		return answers
+
+	def _cancel(self, future, futures):
+		if not future.cancel():
+			self.handlers[futures[future]].cancel_event.set()
+
+	def close(self):
+		for name, handler in self.handlers.items():
+			handler.cancel_event.set()
+			self.executors[name].submit(handler.cleanup)
+			self.executors[name].shutdown(wait=False)
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *exc):
+		self.close()
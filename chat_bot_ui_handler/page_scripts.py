@@ -0,0 +1,67 @@
+"""JavaScript shared by the code that inspects pages in a single evaluate.
+
+Handlers write their selectors for Playwright, so they use things plain
+``querySelectorAll`` does not understand: ``:has-text("...")``, ``>>`` chains,
+``xpath=`` and ``text=`` segments. ``QUERY_ALL_JS`` resolves that subset in
+the page so in-page scripts can take the same selector strings as the Python
+side.
+
+Embed it with ``with_query_all``, which makes it available as ``queryAll``:
+
+    with_query_all("(sel) => queryAll(sel).length")
+"""
+
+QUERY_ALL_JS = r"""(selector, root) => {
+	let roots = [root || document];
+	for (const segment of selector.split(/\s+>>\s+/)) {
+		const found = [];
+		for (const r of roots) {
+			if (segment.startsWith('xpath=')) {
+				const snap = document.evaluate(
+					segment.slice(6), r, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null
+				);
+				for (let i = 0; i < snap.snapshotLength; i++) found.push(snap.snapshotItem(i));
+				continue;
+			}
+			if (segment.startsWith('text=')) {
+				// text="..." matches the whole text exactly, text=... any part of
+				// it ignoring case; like Playwright, keep the innermost matches.
+				const quoted = segment.slice(5).match(/^(["'])(.*)\1$/);
+				const wanted = quoted ? quoted[2] : segment.slice(5).toLowerCase();
+				const hits = Array.from(r.querySelectorAll('*')).filter(el => {
+					const text = (el.innerText || el.textContent || '').trim();
+					return quoted ? text === wanted : text.toLowerCase().includes(wanted);
+				});
+				for (const el of hits) {
+					if (!hits.some(other => other !== el && el.contains(other))) found.push(el);
+				}
+				continue;
+			}
+			const texts = [];
+			const css = segment.replace(/:has-text\((["'])(.*?)\1\)/g, (_, q, text) => {
+				texts.push(text.toLowerCase());
+				return '';
+			}) || '*';
+			let matches;
+			try {
+				matches = Array.from(r.querySelectorAll(css));
+			} catch (e) {
+				matches = [];
+			}
+			for (const el of matches) {
+				const text = (el.innerText || el.textContent || '').toLowerCase();
+				if (texts.every(t => text.includes(t))) found.push(el);
+			}
+		}
+		roots = Array.from(new Set(found));
+	}
+	return roots;
+}"""
+
+
+def with_query_all(script):
+	"""Wrap a ``(arg) => ...`` script so its body can call ``queryAll(selector)``."""
+	return f"""(arg) => {{
+	const queryAll = {QUERY_ALL_JS};
+	return ({script})(arg);
+}}"""
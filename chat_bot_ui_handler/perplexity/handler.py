@@ -14,11 +14,15 @@ class PerplexityUIChat(BaseUIChat):
             'input': '#ask-input',
             'send_button': 'button[aria-label="Submit"]',
             'wait_selector': 'button[aria-label="Submit"][disabled]',
-            'result': 'div[id*="markdown-content"]'
+            'result': 'div[id*="markdown-content"]',
+            'ready': True
         }
 
     def upload_file(self, page, file_path):
         """Custom file upload for Perplexity which requires clicking an upload button first"""
+        if not file_path:
+            return
+
         upload_button_selector = "button[aria-label='Attach files']"
         self.logger.info("Waiting for upload button to appear...")
         page.wait_for_selector(upload_button_selector, state='visible', timeout=10000)
@@ -34,5 +38,5 @@ class PerplexityUIChat(BaseUIChat):
         page.wait_for_selector("button[aria-label='Cancel upload'], img", timeout=20000)
 
         self.logger.info("File uploaded successfully")
-        page.wait_for_timeout(5000)
+        self.settle(page, 'upload_file', 5000)
         self.save_screenshot(page)
\ No newline at end of file
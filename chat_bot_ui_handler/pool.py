@@ -0,0 +1,240 @@
+"""Warm pages per handler, so a chat starts at the prompt box.
+
+chat_fresh() pays for get_fresh_page(), google_login, load_url and login on
+every call, and for most providers that setup takes longer than the answer.
+A HandlerPool does the setup ahead of time and hands out pages that are ready
+for a prompt:
+
+    pool = HandlerPool([GeminiUIChat, QwenUIChat], size=2)
+    pool.warm()
+    answer = pool.chat(GeminiUIChat, "Hello")
+    pool.warm()            # between requests, not on the way to an answer
+    pool.close()
+
+Each handler class gets one handler instance, so all of its pages share one
+BrowserManager and one signed-in browser profile. A page is recycled (closed
+and replaced) once it is older than ``max_age`` seconds, has served
+``max_uses`` chats, or fails its health check.
+
+Checkin does no page work, so chat() returns as soon as the answer is read.
+Used pages that may serve again wait to be sent back to the provider's start
+page, so the next chat does not land in the previous conversation, and closed
+pages wait to be replaced: both happen in warm(), which the caller runs when
+it has nothing else to do. A checkout that finds no idle page resets a used
+one, or opens a new one, on the spot.
+
+The pool drives sync Playwright objects, so it must be used from the thread
+that created it.
+
+Environment variables:
+    POOL_SIZE      - warm pages kept per handler (default 2)
+    POOL_MAX_AGE   - seconds a page may live (default 1800)
+    POOL_MAX_USES  - chats served by one page before it is recycled (default 1)
+"""
+
+import os
+import time
+import traceback
+from contextlib import contextmanager
+
+from browser_manager.browser_config import BrowserConfig
+from custom_logger import logger_config
+
+
+class PooledPage:
+	"""A prepared page together with the handler that prepared it."""
+
+	def __init__(self, handler, page):
+		self.handler = handler
+		self.page = page
+		self.created = time.monotonic()
+		self.uses = 0
+
+	@property
+	def age(self):
+		return time.monotonic() - self.created
+
+
+class HandlerPool:
+	def __init__(self, handlers, size=None, max_age=None, max_uses=None, config_factory=None):
+		"""handlers is a list of BaseUIChat subclasses or instances.
+
+		config_factory builds the BrowserConfig for a handler class that is
+		given as a class; it defaults to a plain BrowserConfig().
+		"""
+		try: self.size = int(size if size is not None else os.getenv("POOL_SIZE") or 2)
+		except Exception: self.size = 2
+		try: self.max_age = float(max_age if max_age is not None else os.getenv("POOL_MAX_AGE") or 1800)
+		except Exception: self.max_age = 1800.0
+		try: self.max_uses = int(max_uses if max_uses is not None else os.getenv("POOL_MAX_USES") or 1)
+		except Exception: self.max_uses = 1
+
+		config_factory = config_factory or (lambda handler_cls: BrowserConfig())
+		self.handlers = {}
+		for handler in handlers:
+			if isinstance(handler, type):
+				handler = handler(config_factory(handler))
+			self.handlers[type(handler)] = handler
+
+		self.idle = {handler_cls: [] for handler_cls in self.handlers}
+		# Used pages that may serve again once reset to the start page.
+		self.used = {handler_cls: [] for handler_cls in self.handlers}
+		self.busy = {handler_cls: 0 for handler_cls in self.handlers}
+
+	def _handler(self, handler_cls):
+		try:
+			return self.handlers[handler_cls]
+		except KeyError:
+			raise KeyError(f"{handler_cls.__name__} is not in this pool") from None
+
+	def _open(self, handler_cls):
+		"""Open a new page and take it through prepare(). Returns None if that fails."""
+		handler = self._handler(handler_cls)
+		page = None
+		try:
+			started = time.monotonic()
+			page = handler.get_browser_manager().get_fresh_page()
+			# Setup spans feed the step histograms but belong to no chat attempt.
+			handler.step_timings = {}
+			handler.attempt_id = None
+			handler.prepare(page)
+			handler.logger.info(f"Warm page ready in {time.monotonic() - started:.2f}s")
+			return PooledPage(handler, page)
+		except Exception as e:
+			handler.logger.error(f"Could not warm a page: {e} {traceback.format_exc()}")
+			self._close_page(page)
+			return None
+
+	def _close_page(self, page):
+		if page is None:
+			return
+		try:
+			if not page.is_closed():
+				page.close()
+		except Exception as e:
+			logger_config.debug(f"Error while closing pooled page: {e}")
+
+	def is_healthy(self, pooled):
+		"""The page is open, young enough, has uses left and still shows the prompt box"""
+		if pooled.uses >= self.max_uses or pooled.age >= self.max_age:
+			return False
+		try:
+			if pooled.page.is_closed():
+				return False
+			selectors = pooled.handler.get_selectors()
+			return pooled.page.locator(selectors['input']).first.is_visible()
+		except Exception:
+			return False
+
+	def _reset(self, pooled):
+		"""Send a used page back to the start page. Returns False, closing it, if that fails"""
+		try:
+			pooled.handler.load_url(pooled.page)
+			pooled.handler.login(pooled.page)
+			return True
+		except Exception as e:
+			pooled.handler.logger.error(f"Could not reset pooled page: {e}")
+			self._close_page(pooled.page)
+			return False
+
+	def warm(self, handler_cls=None):
+		"""Reset used pages and fill the pool up to size, for one handler class or all of them"""
+		for cls in ([handler_cls] if handler_cls else list(self.handlers)):
+			idle, used = self.idle[cls], self.used[cls]
+			while used:
+				pooled = used.pop(0)
+				if self._reset(pooled):
+					idle.append(pooled)
+			while len(idle) + self.busy[cls] < self.size:
+				pooled = self._open(cls)
+				if pooled is None:
+					break
+				idle.append(pooled)
+
+	def checkout(self, handler_cls):
+		"""Take a ready page for handler_cls, opening one if none is idle"""
+		self._handler(handler_cls)
+		idle = self.idle[handler_cls]
+		while idle:
+			pooled = idle.pop(0)
+			if self.is_healthy(pooled):
+				break
+			pooled.handler.logger.info(
+				f"Recycling pooled page (uses={pooled.uses}, age={pooled.age:.0f}s)"
+			)
+			self._close_page(pooled.page)
+		else:
+			pooled = None
+			used = self.used[handler_cls]
+			while used and pooled is None:
+				candidate = used.pop(0)
+				if self._reset(candidate):
+					pooled = candidate
+			if pooled is None:
+				pooled = self._open(handler_cls)
+			if pooled is None:
+				raise RuntimeError(f"No page available for {handler_cls.__name__}")
+
+		pooled.uses += 1
+		self.busy[handler_cls] += 1
+		return pooled
+
+	def checkin(self, pooled, healthy=True):
+		"""Return a page after use. It waits for warm() to reset it, or is closed"""
+		handler_cls = type(pooled.handler)
+		self.busy[handler_cls] -= 1
+
+		if healthy and pooled.uses < self.max_uses and pooled.age < self.max_age:
+			self.used[handler_cls].append(pooled)
+		else:
+			self._close_page(pooled.page)
+
+	@contextmanager
+	def page(self, handler_cls):
+		"""checkout() as a context manager. The page is recycled if the block raises"""
+		pooled = self.checkout(handler_cls)
+		healthy = False
+		try:
+			yield pooled
+			healthy = True
+		finally:
+			self.checkin(pooled, healthy=healthy)
+
+	def chat(self, handler_cls, user_prompt, system_prompt=None, file_path=None):
+		"""Like chat_fresh(), on a warm page. Returns None on failure. Call warm() to refill"""
+		try:
+			with self.page(handler_cls) as pooled:
+				result = pooled.handler.process(
+					pooled.page, user_prompt, system_prompt, file_path, prepared=True
+				)
+				if result is None:
+					raise RuntimeError("chat produced no response")
+				return result
+		except Exception as e:
+			logger_config.error(f"Pooled chat on {handler_cls.__name__} failed: {e}")
+
+		return None
+
+	def stats(self):
+		return {
+			handler_cls.__name__: {
+				'idle': len(self.idle[handler_cls]),
+				'used': len(self.used[handler_cls]),
+				'busy': self.busy[handler_cls],
+			}
+			for handler_cls in self.handlers
+		}
+
+	def close(self):
+		for handler_cls, handler in self.handlers.items():
+			for pooled in self.idle[handler_cls] + self.used[handler_cls]:
+				self._close_page(pooled.page)
+			self.idle[handler_cls] = []
+			self.used[handler_cls] = []
+			handler.cleanup()
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *exc):
+		self.close()
@@ -0,0 +1,115 @@
+"""Look at many selectors in one round trip.
+
+Checking selectors one by one costs a CDP round trip each, and
+``is_visible(timeout=...)`` or ``click(timeout=...)`` on something that is
+not there costs its whole timeout. A probe evaluates a set of selectors in
+the page at once and reports, for each, how many elements match, whether one
+of them is visible, and the text of the first visible one (or of the first
+match):
+
+    state = probe(page, {'close': 'button[aria-label="close"]', 'got_it': 'button:has-text("Got it")'})
+    if state['close']['visible']:
+        page.locator('button[aria-label="close"]').first.click()
+
+    selector = first_visible(page, CAPTCHA_IMAGE_SELECTORS)   # in the order given
+
+A probe is a snapshot. For something that may show up a little later, such
+as a dialog, ``wait_for_visible`` polls the probe in the page and returns as
+soon as one of the selectors is visible, or the last state at its deadline.
+
+Selectors use the Playwright subset page_scripts.py understands. A probe
+taken while the page is navigating reports every selector as absent.
+"""
+
+from chat_bot_ui_handler.page_scripts import with_query_all
+
+_PROBE_JS = with_query_all("""({selectors, textLimit}) => {
+	const visible = el => {
+		if (!(el.offsetWidth || el.offsetHeight || el.getClientRects().length)) return false;
+		const style = getComputedStyle(el);
+		return style.visibility !== 'hidden' && style.display !== 'none';
+	};
+	const out = {};
+	for (const [key, selector] of Object.entries(selectors)) {
+		let els = [];
+		try { els = queryAll(selector); } catch (e) {}
+		const shown = els.find(visible);
+		const el = shown || els[0];
+		out[key] = {
+			count: els.length,
+			visible: !!shown,
+			text: el ? (el.innerText || el.textContent || '').trim().slice(0, textLimit) : '',
+		};
+	}
+	return out;
+}""")
+
+# Truthy, and so the end of a wait_for_function, once anything is visible.
+_WAIT_VISIBLE_JS = f"""(arg) => {{
+	const out = ({_PROBE_JS})(arg);
+	return Object.values(out).some(state => state.visible) ? out : false;
+}}"""
+
+_ABSENT = {'count': 0, 'visible': False, 'text': ''}
+
+
+def _as_dict(selectors):
+	if isinstance(selectors, dict):
+		return dict(selectors)
+	return {selector: selector for selector in selectors}
+
+
+def probe(page, selectors, text_limit=500):
+	"""{key: {'count', 'visible', 'text'}} for a dict of selectors, or keyed by selector for a list"""
+	selectors = _as_dict(selectors)
+	try:
+		return page.evaluate(_PROBE_JS, {'selectors': selectors, 'textLimit': text_limit})
+	except Exception:
+		# Execution context destroyed mid-navigation.
+		return {key: dict(_ABSENT) for key in selectors}
+
+
+async def aprobe(page, selectors, text_limit=500):
+	selectors = _as_dict(selectors)
+	try:
+		return await page.evaluate(_PROBE_JS, {'selectors': selectors, 'textLimit': text_limit})
+	except Exception:
+		return {key: dict(_ABSENT) for key in selectors}
+
+
+def wait_for_visible(page, selectors, timeout_ms, text_limit=500, polling=200):
+	"""probe() as soon as one of selectors is visible, or when timeout_ms has passed"""
+	selectors = _as_dict(selectors)
+	try:
+		handle = page.wait_for_function(
+			_WAIT_VISIBLE_JS, arg={'selectors': selectors, 'textLimit': text_limit},
+			polling=polling, timeout=timeout_ms,
+		)
+		return handle.json_value()
+	except Exception:
+		# Nothing showed up in time, or the page navigated: look once more.
+		return probe(page, selectors, text_limit)
+
+
+async def await_visible(page, selectors, timeout_ms, text_limit=500, polling=200):
+	selectors = _as_dict(selectors)
+	try:
+		handle = await page.wait_for_function(
+			_WAIT_VISIBLE_JS, arg={'selectors': selectors, 'textLimit': text_limit},
+			polling=polling, timeout=timeout_ms,
+		)
+		return await handle.json_value()
+	except Exception:
+		return await aprobe(page, selectors, text_limit)
+
+
+def visible_keys(state, order=None):
+	"""Keys of a probe result that are visible, in order (default: the probe's own)"""
+	return [key for key in (order or state) if state.get(key, _ABSENT)['visible']]
+
+
+def first_visible(page, selectors):
+	"""The first of selectors (keys, for a dict) with a visible match, or None"""
+	selectors = _as_dict(selectors)
+	found = visible_keys(probe(page, selectors, text_limit=0), list(selectors))
+	return found[0] if found else None
@@ -0,0 +1,133 @@
+"""Run one provider on many processes, each with its own browser.
+
+Two instances of a handler share ``~/.<classname>`` and a docker name, so
+they fight over one profile and one container. ProcessChatPool starts worker
+processes, and gives each one:
+
+    - a profile folder of its own, cloned from a snapshot of the template
+      profile (the handler's usual one by default, so the sign-in carries
+      over); see profiles.py. The snapshot is taken once, by the parent,
+      before any worker starts
+    - a docker name of its own, suffixed ``_p<N>``
+    - port settings of the BrowserConfig, if it has any, moved up by
+      ``index * PROCESS_POOL_PORT_STRIDE``
+
+Jobs go to whichever worker is free:
+
+    with ProcessChatPool('gemini', workers=4) as pool:
+        futures = [pool.submit(prompt) for prompt in prompts]
+        answers = [future.result() for future in futures]
+
+The handler is named by its registry name (see registry.py) or a
+"module:Class" path, because a class cannot be handed to another process
+reliably. Workers are spawned, not forked: Playwright does not survive a
+fork. Each worker keeps one handler, and its browser, for its whole life.
+
+Environment variables:
+    PROCESS_POOL_WORKERS      - worker processes (default: CPU count)
+    PROCESS_POOL_PORT_STRIDE  - port offset between workers (default 10)
+"""
+
+import importlib
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import util
+
+# The handler of this worker process
+_handler = None
+
+
+def resolve_handler(name):
+	if ':' in name:
+		module_name, class_name = name.split(':')
+		return getattr(importlib.import_module(module_name), class_name)
+	from chat_bot_ui_handler.registry import get_handler
+	return get_handler(name)
+
+
+def _offset_ports(config, offset):
+	for field, value in vars(config).items():
+		if field.endswith('port') and isinstance(value, int) and not isinstance(value, bool) and value:
+			setattr(config, field, value + offset)
+
+
+def default_process_config(handler_cls, index, snapshot=None):
+	"""BrowserConfig for worker index: own profile (cloned from snapshot), docker name and ports"""
+	from browser_manager.browser_config import BrowserConfig
+	from chat_bot_ui_handler.profiles import worker_profile
+
+	try: stride = int(os.getenv("PROCESS_POOL_PORT_STRIDE") or 10)
+	except Exception: stride = 10
+
+	config = BrowserConfig()
+	config.docker_name = f"{config.docker_name}_p{index}"
+	config.user_data_dir = worker_profile(handler_cls, f"p{index}", snapshot)
+	_offset_ports(config, index * stride)
+	return config
+
+
+def _init_worker(handler_name, indices, config_factory, template):
+	global _handler
+	from chat_bot_ui_handler.env import load_env
+	load_env()
+
+	index = indices.get()
+	handler_cls = resolve_handler(handler_name)
+	factory = config_factory or default_process_config
+	_handler = handler_cls(factory(handler_cls, index, template))
+	_handler.logger.info(f"Process worker {index} ready (pid {os.getpid()})")
+	# Runs when the pool shuts this worker down, so its container is stopped too.
+	util.Finalize(None, _handler.cleanup, exitpriority=10)
+
+
+def _chat(user_prompt, system_prompt, file_path, return_result):
+	return _handler.chat(user_prompt, system_prompt, file_path, return_result=return_result)
+
+
+class ProcessChatPool:
+	def __init__(self, handler, workers=None, template=None, config_factory=None):
+		"""handler is a registry name or "module:Class".
+
+		template is the profile folder workers are cloned from.
+		config_factory(handler_cls, index, template) builds each worker's
+		BrowserConfig; it must be a module-level function. Without one, the
+		workers get default_process_config and the snapshot of template.
+		"""
+		try: self.workers = int(workers if workers is not None else os.getenv("PROCESS_POOL_WORKERS") or os.cpu_count() or 1)
+		except Exception: self.workers = os.cpu_count() or 1
+		self.handler = handler
+		if config_factory is None:
+			from chat_bot_ui_handler.profiles import ProfileTemplates, ensure_template
+			ProfileTemplates().gc()
+			# Here, not in each worker: they would all copy the profile at once.
+			template = ensure_template(resolve_handler(handler), template)
+
+		context = multiprocessing.get_context('spawn')
+		indices = context.Queue()
+		for index in range(self.workers):
+			indices.put(index)
+		self.executor = ProcessPoolExecutor(
+			max_workers=self.workers,
+			mp_context=context,
+			initializer=_init_worker,
+			initargs=(handler, indices, config_factory, template),
+		)
+
+	def submit(self, user_prompt, system_prompt=None, file_path=None, return_result=False):
+		"""Queue a chat on the next free worker. Returns a Future for chat()'s answer"""
+		return self.executor.submit(_chat, user_prompt, system_prompt, file_path, return_result)
+
+	def map(self, prompts, system_prompt=None, file_path=None):
+		"""Answers to prompts, in order"""
+		futures = [self.submit(prompt, system_prompt, file_path) for prompt in prompts]
+		return [future.result() for future in futures]
+
+	def shutdown(self, wait=True):
+		self.executor.shutdown(wait=wait)
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *exc):
+		self.shutdown()
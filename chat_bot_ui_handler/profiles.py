@@ -0,0 +1,275 @@
+"""Browser profile folders for handlers that run side by side.
+
+A handler's profile is ``~/.<classname>``, and Chrome locks a profile to one
+browser (the ``SingletonLock`` the launcher cleans up). Parallel workers of
+one provider each need their own folder. Signing each one in through
+GoogleLoginInjector is slow, and copying a full profile for every worker is
+slow too, so ProfileTemplates does it once:
+
+    templates = ProfileTemplates()
+    templates.snapshot('geminiuichat', default_profile_dir(GeminiUIChat))  # once, after signing in
+    user_data_dir = templates.clone('geminiuichat', 'p3')                   # per worker, fast
+
+ensure_template() and worker_profile() do the same for a handler class: the
+first once, in the process that starts the workers, the second in each one.
+
+``snapshot`` copies a signed-in profile into the template store, leaving out
+locks and caches. Take it while no browser is using the profile, or the
+databases in it may be caught mid-write. ``clone`` makes a worker's profile
+from the newest snapshot, as cheaply as the filesystem allows:
+
+    reflink   - ``cp --reflink``: copy-on-write, near instant on btrfs/xfs
+    hardlink  - otherwise, Chrome's versioned component and extension folders
+                (replaced, never edited in place) are hard links into the
+                snapshot and only the rest is copied
+    copy      - anything the two above could not do
+
+Overlay mounts would need root, so they are not used.
+
+A clone is reused while it is based on the newest snapshot, and replaced
+when a newer one exists. ``gc`` removes clones that no live process owns and
+that are unused for PROFILE_CLONE_MAX_AGE, and snapshots beyond the newest
+PROFILE_TEMPLATE_KEEP that no clone is based on.
+
+Environment variables:
+    PROFILE_TEMPLATE_DIR   - where snapshots and clones live
+                             (default ~/.chat_bot_ui_handler/profiles)
+    PROFILE_TEMPLATE_KEEP  - snapshots kept per template (default 2, at least 1)
+    PROFILE_CLONE_MAX_AGE  - seconds an unowned clone may sit unused (default 7 days)
+"""
+
+import json
+import os
+import shutil
+import subprocess
+import time
+
+# Per-browser state that must not be copied: the lock of the browser that
+# owns the template, and caches that are rebuilt on demand.
+_SKIP = (
+	'SingletonLock', 'SingletonCookie', 'SingletonSocket', 'lockfile',
+	'Cache', 'Code Cache', 'GPUCache', 'ShaderCache', 'GrShaderCache', 'GraphiteDawnCache', 'DawnCache',
+	'CacheStorage', 'Crashpad', 'BrowserMetrics', 'Crash Reports',
+)
+
+# Folders Chrome replaces as a whole when it updates them, so a clone can
+# share their files with the snapshot.
+_SHAREABLE = (
+	'Extensions', 'component_crx_cache', 'extensions_crx_cache', 'WidevineCdm',
+	'optimization_guide_model_store', 'OnDeviceHeadSuggestModel', 'Safe Browsing',
+	'ZxcvbnData', 'hyphen-data', 'FileTypePolicies', 'MEIPreload', 'SSLErrorAssistant',
+	'CertificateRevocation', 'OriginTrials', 'FirstPartySetsPreloaded', 'Subresource Filter',
+	'TrustTokenKeyCommitments', 'pnacl',
+)
+
+_META = '.profile.json'
+
+
+def default_profile_dir(handler_cls):
+	return os.path.expanduser(f'~/.{handler_cls.__name__.lower()}')
+
+
+def _pid_alive(pid):
+	try:
+		os.kill(pid, 0)
+	except ProcessLookupError:
+		return False
+	except PermissionError:
+		return True
+	except Exception:
+		return False
+	return True
+
+
+def _read_meta(folder):
+	try:
+		with open(os.path.join(folder, _META)) as f:
+			return json.load(f)
+	except (OSError, ValueError):
+		return {}
+
+
+def _write_meta(folder, meta):
+	with open(os.path.join(folder, _META), 'w') as f:
+		json.dump(meta, f)
+
+
+def _remove_skipped(root):
+	for folder, dirs, files in os.walk(root, topdown=True):
+		for name in list(dirs):
+			if name in _SKIP:
+				shutil.rmtree(os.path.join(folder, name), ignore_errors=True)
+				dirs.remove(name)
+		for name in files:
+			if name in _SKIP:
+				try:
+					os.remove(os.path.join(folder, name))
+				except OSError:
+					pass
+
+
+def _reflink_tree(src, dest):
+	"""Copy-on-write copy of src to dest. False when the filesystem cannot do it"""
+	try:
+		done = subprocess.run(
+			['cp', '-a', '--reflink=always', src, dest],
+			stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+		).returncode == 0
+	except OSError:
+		done = False
+	if not done:
+		shutil.rmtree(dest, ignore_errors=True)
+		return False
+	_remove_skipped(dest)
+	return True
+
+
+def _link_or_copy(src, dest):
+	if any(part in _SHAREABLE for part in src.split(os.sep)):
+		try:
+			os.link(src, dest)
+			return dest
+		except OSError:
+			pass
+	return shutil.copy2(src, dest)
+
+
+def copy_profile(src, dest, link=True):
+	"""Copy a profile without its locks and caches. Returns the method used"""
+	if link and _reflink_tree(src, dest):
+		return 'reflink'
+	shutil.copytree(
+		src, dest, symlinks=True, ignore=shutil.ignore_patterns(*_SKIP),
+		copy_function=_link_or_copy if link else shutil.copy2,
+	)
+	return 'hardlink' if link else 'copy'
+
+
+class ProfileTemplates:
+	def __init__(self, root=None):
+		self.root = root or os.getenv("PROFILE_TEMPLATE_DIR") or os.path.expanduser('~/.chat_bot_ui_handler/profiles')
+		try: self.keep = int(os.getenv("PROFILE_TEMPLATE_KEEP") or 2)
+		except Exception: self.keep = 2
+		# The newest snapshot is always kept: clones are made from it.
+		self.keep = max(1, self.keep)
+		try: self.clone_max_age = float(os.getenv("PROFILE_CLONE_MAX_AGE") or 7 * 24 * 3600)
+		except Exception: self.clone_max_age = 7 * 24 * 3600.0
+
+	def _snapshots_dir(self, name):
+		return os.path.join(self.root, 'templates', name)
+
+	def _clones_dir(self, name):
+		return os.path.join(self.root, 'clones', name)
+
+	def snapshots(self, name):
+		"""Snapshot folders of a template, oldest first"""
+		folder = self._snapshots_dir(name)
+		if not os.path.isdir(folder):
+			return []
+		return sorted(
+			os.path.join(folder, entry) for entry in os.listdir(folder)
+			if not entry.endswith('.partial') and os.path.isfile(os.path.join(folder, entry, _META))
+		)
+
+	def latest(self, name):
+		snapshots = self.snapshots(name)
+		return snapshots[-1] if snapshots else None
+
+	def snapshot(self, name, source):
+		"""Store a copy of the profile at source as the newest snapshot of name"""
+		if not os.path.isdir(source):
+			raise FileNotFoundError(f"No profile at {source}")
+		stamp = time.strftime('%Y%m%d-%H%M%S') + f"-{os.getpid()}"
+		dest = os.path.join(self._snapshots_dir(name), stamp)
+		partial = f"{dest}.partial"
+		os.makedirs(self._snapshots_dir(name), exist_ok=True)
+		started = time.monotonic()
+		# A snapshot must not share blocks with a profile that is still in use.
+		copy_profile(source, partial, link=False)
+		_write_meta(partial, {'source': source, 'created': time.time()})
+		os.rename(partial, dest)
+		self._log(f"Snapshot of {name} taken from {source} in {time.monotonic() - started:.1f}s")
+		return dest
+
+	def ensure(self, name, source):
+		"""The newest snapshot of name, taking one from source if there is none"""
+		return self.latest(name) or self.snapshot(name, source)
+
+	def clone(self, name, tag, snapshot=None):
+		"""A profile folder for worker tag, based on snapshot (by default the newest one of name)"""
+		snapshot = snapshot or self.latest(name)
+		if snapshot is None:
+			raise FileNotFoundError(f"No snapshot of {name}; take one with snapshot()")
+
+		dest = os.path.join(self._clones_dir(name), tag)
+		meta = _read_meta(dest) if os.path.isdir(dest) else None
+		if meta is not None:
+			# Two browsers on one profile corrupt it, whichever snapshot it is from.
+			owner = meta.get('pid')
+			if owner and owner != os.getpid() and _pid_alive(owner):
+				raise RuntimeError(f"Profile clone {dest} is in use by process {owner}")
+			if meta.get('snapshot') != snapshot:
+				shutil.rmtree(dest, ignore_errors=True)
+				meta = None
+
+		if meta is None:
+			started = time.monotonic()
+			partial = f"{dest}.partial-{os.getpid()}"
+			shutil.rmtree(partial, ignore_errors=True)
+			os.makedirs(self._clones_dir(name), exist_ok=True)
+			method = copy_profile(snapshot, partial)
+			os.rename(partial, dest)
+			self._log(f"Cloned {name} for {tag} by {method} in {time.monotonic() - started:.2f}s")
+
+		_write_meta(dest, {'snapshot': snapshot, 'pid': os.getpid(), 'used': time.time()})
+		return dest
+
+	def gc(self):
+		"""Remove stale clones and unused old snapshots. Returns the removed folders"""
+		removed = []
+		now = time.time()
+		in_use = set()
+		clones_root = os.path.join(self.root, 'clones')
+		for name in (os.listdir(clones_root) if os.path.isdir(clones_root) else []):
+			for tag in os.listdir(self._clones_dir(name)):
+				folder = os.path.join(self._clones_dir(name), tag)
+				meta = _read_meta(folder)
+				owned = meta.get('pid') and _pid_alive(meta['pid'])
+				partial = '.partial-' in tag
+				if owned and not partial:
+					in_use.add(meta.get('snapshot'))
+					continue
+				if partial or now - meta.get('used', 0) > self.clone_max_age or meta.get('snapshot') != self.latest(name):
+					shutil.rmtree(folder, ignore_errors=True)
+					removed.append(folder)
+				else:
+					in_use.add(meta.get('snapshot'))
+
+		templates_root = os.path.join(self.root, 'templates')
+		for name in (os.listdir(templates_root) if os.path.isdir(templates_root) else []):
+			for snapshot in self.snapshots(name)[:-self.keep]:
+				if snapshot not in in_use:
+					shutil.rmtree(snapshot, ignore_errors=True)
+					removed.append(snapshot)
+		return removed
+
+	def _log(self, message):
+		from custom_logger import logger_config
+		logger_config.info(f"[ProfileTemplates] {message}")
+
+
+def ensure_template(handler_cls, source=None):
+	"""The snapshot workers of handler_cls are cloned from.
+
+	It is taken from source, by default the handler's usual profile, if there
+	is none yet. Call it once before starting the workers, while no browser
+	uses source.
+	"""
+	source = source or default_profile_dir(handler_cls)
+	os.makedirs(source, exist_ok=True)
+	return ProfileTemplates().ensure(handler_cls.__name__.lower(), source)
+
+
+def worker_profile(handler_cls, tag, snapshot=None):
+	"""A cloned profile for one worker of handler_cls, from snapshot or the newest one (see ensure_template)"""
+	return ProfileTemplates().clone(handler_cls.__name__.lower(), tag, snapshot)
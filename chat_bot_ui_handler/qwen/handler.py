@@ -3,6 +3,8 @@ from custom_logger import logger_config
 from functools import partial
 
 class QwenUIChat(BaseUIChat):
+	upload_via_attach_folder = True
+
 	def get_docker_name(self):
 		return f"{self.config.docker_name}_qwen_ui_chat"
 
@@ -36,10 +38,11 @@ class QwenUIChat(BaseUIChat):
 				self.get_browser_manager().launcher.choose_file_via_xdotool,
 				config=self.config
 			)
+			before = self.attachment_count(page)
 			choose_file_via_xdotool(file_path=file_path)
+			self.wait_for_upload(page, before)
 
 			self.logger.info("File uploaded successfully")
-			page.wait_for_timeout(5000)
 			self.save_screenshot(page)
 
 	# def login(self, page):
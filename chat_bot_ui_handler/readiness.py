@@ -0,0 +1,137 @@
+"""Readiness conditions for the steps of BaseUIChat.process.
+
+Each step of the flow used to sleep a fixed amount of time so the page could
+catch up. A handler can instead declare what the step is actually waiting for
+through the ``'ready'`` key of ``get_selectors()``, and the fixed sleep becomes
+the cap on that wait rather than its length:
+
+    'ready': True
+        Use the defaults derived from the handler's other selectors
+        (see ``default_conditions``).
+
+    'ready': {'load_url': [('visible', 'textarea')], 'send': []}
+        Spell the conditions out per step. Steps that are not listed keep
+        their fixed sleep; an empty list means "ready immediately".
+
+Conditions are checked in order, each within what is left of the cap:
+
+    ('visible', selector)  - selector is on screen
+    ('hidden', selector)   - selector is gone or hidden
+    ('enabled', selector)  - selector is on screen and not (aria-)disabled
+    ('network_idle',)      - no requests in flight for 500ms
+    ('dom_quiet', ms)      - no DOM mutation for ``ms`` milliseconds
+
+A bare string is accepted for conditions without an argument.
+
+``async_wait_until_ready`` is the same wait for ``playwright.async_api`` pages.
+"""
+
+import time
+
+# Installs one observer per document and reports how long the DOM has been
+# still. Re-evaluating it is cheap, so wait_for_function can poll it.
+_DOM_QUIET_JS = """(ms) => {
+	if (!window.__cbuiLastMutation) {
+		window.__cbuiLastMutation = Date.now();
+		new MutationObserver(() => { window.__cbuiLastMutation = Date.now(); })
+			.observe(document, {childList: true, subtree: true, characterData: true, attributes: true});
+	}
+	return Date.now() - window.__cbuiLastMutation >= ms;
+}"""
+
+
+def default_conditions(selectors):
+	"""Conditions used when a handler opts in with ``'ready': True``."""
+	conditions = {
+		'google_login': [('network_idle',)],
+		'dismiss': [('dom_quiet', 300)],
+		'upload_file': [('network_idle',)],
+		'send': [],
+	}
+	if selectors.get('input'):
+		conditions['load_url'] = [('visible', selectors['input'])]
+	if selectors.get('send_button'):
+		conditions['fill_prompt'] = [('enabled', selectors['send_button'])]
+	return conditions
+
+
+def _normalize(condition):
+	if isinstance(condition, str):
+		return condition, None
+	condition = tuple(condition)
+	return condition[0], (condition[1] if len(condition) > 1 else None)
+
+
+def _wait_args(kind, arg):
+	"""The page method and arguments that wait for one condition"""
+	if kind == 'visible':
+		return 'wait_for_selector', (arg,), {'state': 'visible'}
+	if kind == 'hidden':
+		return 'wait_for_selector', (arg,), {'state': 'hidden'}
+	if kind == 'enabled':
+		return 'wait_for_selector', (f'{arg}:not([disabled]):not([aria-disabled="true"])',), {'state': 'visible'}
+	if kind == 'network_idle':
+		return 'wait_for_load_state', ('networkidle',), {}
+	if kind == 'dom_quiet':
+		return 'wait_for_function', (_DOM_QUIET_JS,), {'arg': int(arg or 500), 'polling': 100}
+	raise ValueError(f"Unknown readiness condition: {kind}")
+
+
+def _wait_for(page, kind, arg, timeout):
+	method, args, kwargs = _wait_args(kind, arg)
+	getattr(page, method)(*args, timeout=timeout, **kwargs)
+
+
+async def _async_wait_for(page, kind, arg, timeout):
+	method, args, kwargs = _wait_args(kind, arg)
+	await getattr(page, method)(*args, timeout=timeout, **kwargs)
+
+
+def wait_until_ready(page, conditions, cap_ms, logger=None):
+	"""Wait for every condition, spending at most ``cap_ms`` in total.
+
+	Returns True when all conditions held before the cap. A condition that
+	cannot be met is not an error: the cap is exactly the old fixed sleep, so
+	running out of it just means the step behaved as it always did.
+	"""
+	deadline = time.monotonic() + cap_ms / 1000
+	for condition in conditions:
+		kind, arg = _normalize(condition)
+		remaining = int((deadline - time.monotonic()) * 1000)
+		if remaining <= 0:
+			return False
+		try:
+			_wait_for(page, kind, arg, remaining)
+		except ValueError:
+			raise
+		except Exception:
+			if logger:
+				logger.debug(f"Readiness condition {kind} {arg or ''} not met within {cap_ms}ms")
+			# Sit out the rest of the cap so the step is never faster-but-broken.
+			remaining = int((deadline - time.monotonic()) * 1000)
+			if remaining > 0:
+				page.wait_for_timeout(remaining)
+			return False
+	return True
+
+
+async def async_wait_until_ready(page, conditions, cap_ms, logger=None):
+	"""``wait_until_ready`` for an async page."""
+	deadline = time.monotonic() + cap_ms / 1000
+	for condition in conditions:
+		kind, arg = _normalize(condition)
+		remaining = int((deadline - time.monotonic()) * 1000)
+		if remaining <= 0:
+			return False
+		try:
+			await _async_wait_for(page, kind, arg, remaining)
+		except ValueError:
+			raise
+		except Exception:
+			if logger:
+				logger.debug(f"Readiness condition {kind} {arg or ''} not met within {cap_ms}ms")
+			remaining = int((deadline - time.monotonic()) * 1000)
+			if remaining > 0:
+				await page.wait_for_timeout(remaining)
+			return False
+	return True
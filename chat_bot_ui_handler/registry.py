@@ -0,0 +1,67 @@
+"""Every handler by short name, without importing any of them.
+
+    from chat_bot_ui_handler.registry import get_handler
+    GeminiUIChat = get_handler('gemini')      # imports only the Gemini module
+
+A handler module is imported the first time its class is asked for, so a
+tool that needs one handler does not pay for the other thirteen.
+
+Handlers can also come from spec files (see specs.py). A spec wins over the
+Python handler of the same name, which is how a selector fix ships without a
+code change.
+"""
+
+import importlib
+
+# name -> "module:Class"
+HANDLERS = {
+	'aistudio': 'chat_bot_ui_handler.aistudio.handler:AIStudioUIChat',
+	'search_google': 'chat_bot_ui_handler.search_google.ai_mode:GoogleAISearchChat',
+	'pally': 'chat_bot_ui_handler.pally.handler:PallyUIChat',
+	'qwen': 'chat_bot_ui_handler.qwen.handler:QwenUIChat',
+	'perplexity': 'chat_bot_ui_handler.perplexity.handler:PerplexityUIChat',
+	'gemini': 'chat_bot_ui_handler.gemini.handler:GeminiUIChat',
+	'meta': 'chat_bot_ui_handler.meta.handler:MetaUIChat',
+	'grok': 'chat_bot_ui_handler.grok.handler:GrokUIChat',
+	'copilot': 'chat_bot_ui_handler.copilot.handler:CopilotUIChat',
+	'bing': 'chat_bot_ui_handler.bing.handler:BingUIChat',
+	'mistral': 'chat_bot_ui_handler.mistral.handler:MistralUIChat',
+	'moondream': 'chat_bot_ui_handler.moondream.handler:MoonDream',
+	'brave': 'chat_bot_ui_handler.brave.handler:BraveAISearch',
+	'duckduckgo': 'chat_bot_ui_handler.duckduckgo.handler:DuckDuckGoAISearch',
+}
+
+
+def handler_names():
+	from chat_bot_ui_handler.specs import get_spec_registry
+
+	names = list(HANDLERS)
+	return names + [name for name in get_spec_registry().names() if name not in HANDLERS]
+
+
+def class_names():
+	"""Handler class name -> registry name"""
+	return {target.rsplit(':', 1)[1]: name for name, target in HANDLERS.items()}
+
+
+def builtin_handler(name):
+	"""The Python handler class for a registry name, ignoring specs"""
+	target = HANDLERS.get(name) or HANDLERS.get(class_names().get(name, ''))
+	if target is None:
+		raise KeyError(f"Unknown handler {name!r}; choose one of {', '.join(HANDLERS)}")
+	module_name, class_name = target.split(':')
+	return getattr(importlib.import_module(module_name), class_name)
+
+
+def get_handler(name):
+	"""The handler class for a registry name ('gemini') or class name ('GeminiUIChat')"""
+	from chat_bot_ui_handler.specs import get_spec_registry
+
+	specs = get_spec_registry()
+	name = class_names().get(name, name)
+	if name in specs:
+		return specs.handler_class(name)
+	try:
+		return builtin_handler(name)
+	except KeyError:
+		raise KeyError(f"Unknown handler {name!r}; choose one of {', '.join(handler_names())}")
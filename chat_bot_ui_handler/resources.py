@@ -0,0 +1,175 @@
+"""What a page is allowed to download.
+
+A chat only ever reads the text of ``selectors['result']``, yet every page
+load fetches the provider's analytics, fonts, images, video previews and
+marketing frames. A ResourcePolicy aborts those requests through Playwright
+routing, and ResourceStats counts what each page load did fetch:
+
+    policy = resource_policy('lean')
+    stats = policy.apply(page)
+    page.goto(url)
+    stats.summary()   # "84 requests, 1.9 MB, 37 blocked (image 21, tracker 12, font 4)"
+
+Profiles:
+    off       - block nothing, only count
+    trackers  - analytics, ads and session recorders (the default)
+    lean      - trackers, images, media and fonts; for text-only providers
+    text      - lean plus stylesheets
+
+Handlers pick a profile with their ``resource_profile`` attribute (Brave and
+DuckDuckGo use ``lean``). Requests made by Google's sign-in pages are never
+blocked: the sign-in CAPTCHA is an image.
+
+Routing every request has a cost of its own: each one waits for Python to
+let it through, and Playwright turns the browser's HTTP cache off for a page
+that has routes. ``trackers`` therefore routes only the tracker URLs; the
+other profiles route everything.
+
+Bytes are counted from Content-Length, so chunked responses are left out and
+the figure is a lower bound.
+
+Environment variables:
+    RESOURCE_PROFILE       - profile for every handler, overriding their own
+    RESOURCE_STRIP_STYLES  - 1 to use ``text`` where a handler asks for ``lean``
+"""
+
+import os
+import re
+
+TRACKER_HOSTS = (
+	'google-analytics.com', 'googletagmanager.com', 'doubleclick.net', 'googlesyndication.com',
+	'googleadservices.com', 'connect.facebook.net', 'hotjar.com', 'segment.io', 'segment.com',
+	'mixpanel.com', 'amplitude.com', 'fullstory.com', 'clarity.ms', 'bat.bing.com', 'scorecardresearch.com',
+	'nr-data.net', 'js-agent.newrelic.com', 'browser-intake-datadoghq.com', 'sentry.io',
+	'ads.linkedin.com', 'analytics.tiktok.com', 'plausible.io', 'quantserve.com', 'taboola.com', 'outbrain.com',
+)
+TRACKER_PATHS = ('facebook.com/tr', 'play.google.com/log', 'google.com/pagead', 'youtube.com/api/stats')
+
+TRACKER_URL = re.compile(
+	r'^https?://([^/?#]*\.)?(' + '|'.join(re.escape(host) for host in TRACKER_HOSTS) + r')([:/?#]|$)'
+	r'|^https?://([^/?#]*\.)?(' + '|'.join(re.escape(path) for path in TRACKER_PATHS) + r')'
+)
+
+PROFILES = {
+	'off': (),
+	'trackers': (),
+	'lean': ('image', 'media', 'font'),
+	'text': ('image', 'media', 'font', 'stylesheet'),
+}
+
+# Pages whose requests are never blocked.
+_NEVER_BLOCK = ('https://accounts.google.com/',)
+
+
+def _frame_url(request):
+	try:
+		return request.frame.url
+	except Exception:
+		# Requests of service workers have no frame.
+		return ''
+
+
+class ResourceStats:
+	"""Requests and bytes of one page load; reset() starts the next"""
+
+	def __init__(self):
+		self.reset()
+
+	def reset(self):
+		self.requests = 0
+		self.bytes = 0
+		self.blocked = 0
+		self.blocked_by = {}
+
+	def on_request(self, request):
+		self.requests += 1
+
+	def on_response(self, response):
+		try:
+			self.bytes += int(response.headers.get('content-length') or 0)
+		except Exception:
+			pass
+
+	def block(self, reason):
+		self.blocked += 1
+		self.blocked_by[reason] = self.blocked_by.get(reason, 0) + 1
+
+	def as_dict(self):
+		return {'requests': self.requests, 'bytes': self.bytes, 'blocked': self.blocked, 'blocked_by': dict(self.blocked_by)}
+
+	def summary(self):
+		line = f"{self.requests} requests, {self.bytes / 1e6:.1f} MB, {self.blocked} blocked"
+		if self.blocked_by:
+			line += " (" + ", ".join(f"{reason} {count}" for reason, count in sorted(self.blocked_by.items(), key=lambda item: -item[1])) + ")"
+		return line
+
+
+class ResourcePolicy:
+	def __init__(self, name='trackers', block_types=None, block_trackers=None):
+		self.name = name
+		self.block_types = frozenset(PROFILES.get(name, ()) if block_types is None else block_types)
+		self.block_trackers = name != 'off' if block_trackers is None else block_trackers
+
+	def blocks(self, url, resource_type, frame_url=''):
+		"""Why a request should be aborted ('tracker' or its resource type), or None"""
+		if url.startswith(_NEVER_BLOCK) or frame_url.startswith(_NEVER_BLOCK):
+			return None
+		if resource_type in self.block_types:
+			return resource_type
+		if self.block_trackers and TRACKER_URL.match(url):
+			return 'tracker'
+		return None
+
+	def _route_pattern(self):
+		"""What to route: everything, only trackers, or nothing"""
+		if self.block_types:
+			return '**/*'
+		return TRACKER_URL if self.block_trackers else None
+
+	def _decide(self, route, stats):
+		request = route.request
+		reason = self.blocks(request.url, request.resource_type, _frame_url(request))
+		if reason:
+			stats.block(reason)
+		return reason
+
+	def apply(self, page, stats=None):
+		"""Route page through this policy and count its requests. Returns the ResourceStats"""
+		stats = stats or ResourceStats()
+		page.on('request', stats.on_request)
+		page.on('response', stats.on_response)
+		pattern = self._route_pattern()
+		if pattern is not None:
+			def handle(route):
+				if self._decide(route, stats):
+					route.abort('blockedbyclient')
+				else:
+					# Leave it to any other route on the page.
+					route.fallback()
+			page.route(pattern, handle)
+		return stats
+
+	async def aapply(self, page, stats=None):
+		"""apply() for a playwright.async_api page"""
+		stats = stats or ResourceStats()
+		page.on('request', stats.on_request)
+		page.on('response', stats.on_response)
+		pattern = self._route_pattern()
+		if pattern is not None:
+			async def handle(route):
+				if self._decide(route, stats):
+					await route.abort('blockedbyclient')
+				else:
+					await route.fallback()
+			await page.route(pattern, handle)
+		return stats
+
+
+def resource_policy(profile=None):
+	"""The policy for a handler's profile, after the RESOURCE_* overrides"""
+	profile = os.getenv("RESOURCE_PROFILE") or profile or 'trackers'
+	if profile == 'lean' and os.getenv("RESOURCE_STRIP_STYLES", "0") == "1":
+		profile = 'text'
+	if profile not in PROFILES:
+		raise ValueError(f"Unknown resource profile {profile!r}; use one of {', '.join(PROFILES)}")
+	return ResourcePolicy(profile)
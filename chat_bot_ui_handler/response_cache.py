@@ -0,0 +1,193 @@
+"""Reuse answers to questions that were already asked.
+
+Pipelines ask the same caption or search question about the same image over
+and over, and every ask is a browser round trip of 30-120s. With a cache
+attached, chat(), quick_chat() and chat_fresh() first look up
+(provider, prompt, system prompt, file content hash) and only drive the
+browser on a miss:
+
+    handler.response_cache = ResponseCache(SQLiteBackend("answers.db"))
+
+Files are keyed by content, not path, so a re-rendered frame with the same
+bytes hits and an overwritten file misses. Only successful answers are stored.
+
+Backends:
+    MemoryBackend - in-process LRU dict
+    SQLiteBackend - on disk, shared between processes and runs
+
+Both expire entries after ``ttl`` seconds and evict the least recently used
+beyond ``max_entries``.
+
+Environment variables (used by default_cache()):
+    RESPONSE_CACHE             - memory | sqlite; unset means no cache
+    RESPONSE_CACHE_PATH        - SQLite file (default ~/.chat_bot_ui_handler_cache.db)
+    RESPONSE_CACHE_TTL         - seconds an answer stays valid (default 86400)
+    RESPONSE_CACHE_MAX_ENTRIES - entries kept before LRU eviction (default 1000)
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from custom_logger import logger_config
+
+
+class MemoryBackend:
+	def __init__(self, ttl=86400, max_entries=1000):
+		self.ttl = ttl
+		self.max_entries = max_entries
+		self._entries = OrderedDict()
+		self._lock = threading.Lock()
+
+	def get(self, key):
+		with self._lock:
+			entry = self._entries.get(key)
+			if entry is None:
+				return None
+			stored_at, value = entry
+			if time.time() - stored_at > self.ttl:
+				del self._entries[key]
+				return None
+			self._entries.move_to_end(key)
+			return value
+
+	def put(self, key, value):
+		with self._lock:
+			self._entries[key] = (time.time(), value)
+			self._entries.move_to_end(key)
+			while len(self._entries) > self.max_entries:
+				self._entries.popitem(last=False)
+
+	def clear(self):
+		with self._lock:
+			self._entries.clear()
+
+	def __len__(self):
+		return len(self._entries)
+
+
+class SQLiteBackend:
+	def __init__(self, path=None, ttl=86400, max_entries=1000):
+		self.path = path or os.path.expanduser("~/.chat_bot_ui_handler_cache.db")
+		self.ttl = ttl
+		self.max_entries = max_entries
+		self._lock = threading.Lock()
+		self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+		self._conn.execute("PRAGMA journal_mode=WAL")
+		self._conn.execute(
+			"CREATE TABLE IF NOT EXISTS responses ("
+			"key TEXT PRIMARY KEY, value TEXT NOT NULL, stored_at REAL NOT NULL, used_at REAL NOT NULL)"
+		)
+		self._conn.execute("CREATE INDEX IF NOT EXISTS responses_used_at ON responses (used_at)")
+
+	def get(self, key):
+		now = time.time()
+		with self._lock:
+			row = self._conn.execute("SELECT value, stored_at FROM responses WHERE key = ?", (key,)).fetchone()
+			if row is None:
+				return None
+			value, stored_at = row
+			if now - stored_at > self.ttl:
+				self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+				return None
+			self._conn.execute("UPDATE responses SET used_at = ? WHERE key = ?", (now, key))
+			return value
+
+	def put(self, key, value):
+		now = time.time()
+		with self._lock:
+			self._conn.execute(
+				"INSERT OR REPLACE INTO responses (key, value, stored_at, used_at) VALUES (?, ?, ?, ?)",
+				(key, value, now, now)
+			)
+			self._conn.execute("DELETE FROM responses WHERE stored_at < ?", (now - self.ttl,))
+			self._conn.execute(
+				"DELETE FROM responses WHERE key NOT IN "
+				"(SELECT key FROM responses ORDER BY used_at DESC LIMIT ?)",
+				(self.max_entries,)
+			)
+
+	def clear(self):
+		with self._lock:
+			self._conn.execute("DELETE FROM responses")
+
+	def __len__(self):
+		with self._lock:
+			return self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+
+class ResponseCache:
+	def __init__(self, backend=None):
+		self.backend = backend if backend is not None else MemoryBackend()
+		self.hits = 0
+		self.misses = 0
+		# (path, size, mtime) -> content hash, so an unchanged file is read once.
+		self._file_hashes = {}
+
+	def file_hash(self, file_path):
+		if not file_path:
+			return None
+		stat = os.stat(file_path)
+		marker = (os.path.abspath(file_path), stat.st_size, stat.st_mtime_ns)
+		digest = self._file_hashes.get(marker)
+		if digest is None:
+			sha = hashlib.sha256()
+			with open(file_path, 'rb') as f:
+				for chunk in iter(lambda: f.read(1 << 20), b''):
+					sha.update(chunk)
+			digest = self._file_hashes[marker] = sha.hexdigest()
+		return digest
+
+	def key(self, provider, user_prompt, system_prompt=None, file_path=None):
+		parts = [provider, user_prompt, system_prompt, self.file_hash(file_path)]
+		return hashlib.sha256(json.dumps(parts).encode('utf-8')).hexdigest()
+
+	def get(self, key):
+		value = self.backend.get(key)
+		if value is None:
+			self.misses += 1
+		else:
+			self.hits += 1
+		return value
+
+	def put(self, key, value):
+		if value is not None:
+			self.backend.put(key, value)
+
+	def stats(self):
+		return {'hits': self.hits, 'misses': self.misses, 'entries': len(self.backend)}
+
+
+def default_cache():
+	"""The cache RESPONSE_CACHE asks for, or None"""
+	kind = (os.getenv("RESPONSE_CACHE") or "").lower()
+	if not kind:
+		return None
+	try: ttl = float(os.getenv("RESPONSE_CACHE_TTL") or 86400)
+	except Exception: ttl = 86400.0
+	try: max_entries = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES") or 1000)
+	except Exception: max_entries = 1000
+
+	if kind == 'sqlite':
+		return ResponseCache(SQLiteBackend(os.getenv("RESPONSE_CACHE_PATH"), ttl, max_entries))
+	if kind != 'memory':
+		logger_config.info(f"Unknown RESPONSE_CACHE {kind!r}, using memory")
+	return ResponseCache(MemoryBackend(ttl, max_entries))
+
+
+_shared = None
+_shared_lock = threading.Lock()
+
+
+def shared_cache():
+	"""One default_cache() per process, so every handler shares its entries"""
+	global _shared
+	if _shared is None:
+		with _shared_lock:
+			if _shared is None:
+				_shared = default_cache() or False
+	return _shared or None
@@ -0,0 +1,244 @@
+"""A job queue that runs chats on a fixed set of worker browsers.
+
+Calling ``chat()`` directly gives no protection against two threads sharing
+one page and nothing smooths a burst into a provider's throttle. A
+ChatScheduler owns the browsers instead: each provider gets a fixed number of
+workers, each worker is a thread with its own handler (and so its own
+BrowserManager), and callers submit jobs and get futures back:
+
+    scheduler = ChatScheduler({GeminiUIChat: 2, BraveAISearch: 4}, rate_limits={BraveAISearch: 10})
+    future = scheduler.submit(BraveAISearch, "What is a quasar?", priority=1, deadline=120)
+    answer = future.result()
+    scheduler.shutdown()
+
+    workers      - per-provider concurrency: one chat at a time per worker
+    rate_limits  - per-provider cap on chats started per minute
+    priority     - lower runs first; equal priorities run in submission order
+    deadline     - seconds from submission; a job still queued at its deadline
+                   fails with TimeoutError, and a running one is cancelled and
+                   fails with TimeoutError unless it had its answer already
+    on_delta     - called on the worker thread with each piece of the answer
+                   as it is generated (the job runs through chat_stream())
+    fresh        - run each chat on a new page (chat_fresh()) instead of the
+                   worker's persistent one; an idle worker readies the next
+                   pages ahead of time (see BaseUIChat.prefetch, PREFETCH_PAGES)
+
+A future resolves to the chat's answer, or None when the chat failed, as
+chat() returns. For on_delta jobs that is the settled answer, which may differ
+from the joined deltas when the page rewrote the text as it finished.
+
+Workers of one provider must not share a browser profile, so by default the
+first worker uses the handler's usual profile and docker name and the others
+get their own, suffixed ``_w<N>``, with a profile cloned from a snapshot of the
+usual one (see profiles.py) so they start signed in. The snapshot is taken
+when the scheduler is built, before the first worker's browser starts.
+"""
+
+import itertools
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from browser_manager.browser_config import BrowserConfig
+from custom_logger import logger_config
+
+from chat_bot_ui_handler.profiles import ensure_template, worker_profile
+
+
+def default_worker_config(handler_cls, index):
+	config = BrowserConfig()
+	if index:
+		config.docker_name = f"{config.docker_name}_w{index}"
+		config.user_data_dir = worker_profile(handler_cls, f"w{index}")
+	return config
+
+
+class RateLimiter:
+	"""Spaces chat starts so no more than per_minute begin in any minute"""
+
+	def __init__(self, per_minute):
+		self.interval = 60.0 / per_minute if per_minute else 0.0
+		self._next = 0.0
+		self._lock = threading.Lock()
+
+	def reserve(self):
+		"""Claim the next start slot and return how long to wait for it"""
+		with self._lock:
+			now = time.monotonic()
+			start = max(now, self._next)
+			self._next = start + self.interval
+			return start - now
+
+
+class ChatJob:
+	def __init__(self, handler_cls, user_prompt, system_prompt, file_path, priority, deadline, on_delta=None):
+		self.handler_cls = handler_cls
+		self.user_prompt = user_prompt
+		self.system_prompt = system_prompt
+		self.file_path = file_path
+		self.priority = priority
+		self.deadline = deadline
+		self.on_delta = on_delta
+		self.submitted = time.monotonic()
+		self.future = Future()
+
+	def expired(self):
+		return self.deadline is not None and time.monotonic() >= self.deadline
+
+
+_STOP = object()
+
+
+class ChatScheduler:
+	def __init__(self, workers, rate_limits=None, config_factory=None, fresh=False):
+		"""workers maps a BaseUIChat subclass to how many browsers it gets.
+
+		rate_limits maps a subclass to chats started per minute.
+		config_factory(handler_cls, index) builds each worker's BrowserConfig.
+		fresh=True runs every chat on a new page.
+		"""
+		if config_factory is None:
+			config_factory = default_worker_config
+			for handler_cls, count in workers.items():
+				if count > 1:
+					try:
+						# Before any worker runs, so the profile is not in use.
+						ensure_template(handler_cls)
+					except Exception as e:
+						logger_config.error(f"[ChatScheduler] No profile snapshot for {handler_cls.__name__}: {e}")
+		rate_limits = rate_limits or {}
+		self.fresh = fresh
+		self._seq = itertools.count()
+		self._queues = {}
+		self._limiters = {}
+		self._threads = []
+		self._workers = dict(workers)
+		self._closed = False
+
+		for handler_cls, count in workers.items():
+			self._queues[handler_cls] = queue.PriorityQueue()
+			self._limiters[handler_cls] = RateLimiter(rate_limits.get(handler_cls))
+			for index in range(count):
+				thread = threading.Thread(
+					target=self._work,
+					args=(handler_cls, config_factory, index),
+					name=f"{handler_cls.__name__}-worker-{index}",
+					daemon=True,
+				)
+				thread.start()
+				self._threads.append(thread)
+
+	def submit(self, handler_cls, user_prompt, system_prompt=None, file_path=None, priority=0, deadline=None, on_delta=None):
+		"""Queue a chat and return a Future for its answer"""
+		if self._closed:
+			raise RuntimeError("ChatScheduler is shut down")
+		if handler_cls not in self._queues:
+			raise KeyError(f"{handler_cls.__name__} has no workers in this scheduler")
+
+		job = ChatJob(
+			handler_cls, user_prompt, system_prompt, file_path, priority,
+			time.monotonic() + deadline if deadline is not None else None,
+			on_delta
+		)
+		self._queues[handler_cls].put((priority, next(self._seq), job))
+		return job.future
+
+	def pending(self):
+		return {handler_cls.__name__: q.qsize() for handler_cls, q in self._queues.items()}
+
+	def _work(self, handler_cls, config_factory, index):
+		jobs = self._queues[handler_cls]
+		# Built on this thread: sync Playwright objects stay on the thread that made them.
+		try:
+			handler = handler_cls(config_factory(handler_cls, index))
+		except Exception as e:
+			logger_config.error(f"[ChatScheduler] {handler_cls.__name__} worker {index} could not start: {e}")
+			handler = None
+
+		try:
+			while True:
+				if self.fresh and handler is not None and jobs.empty():
+					# Nothing queued: ready pages for the next jobs until one arrives.
+					handler.prefetch(idle=jobs.empty)
+				_, _, job = jobs.get()
+				if job is _STOP:
+					return
+				if not job.future.set_running_or_notify_cancel():
+					continue
+				if handler is None:
+					job.future.set_exception(RuntimeError(f"{handler_cls.__name__} worker {index} could not start"))
+					continue
+				if job.expired():
+					job.future.set_exception(TimeoutError("deadline passed while queued"))
+					continue
+
+				wait = self._limiters[handler_cls].reserve()
+				if wait:
+					time.sleep(wait)
+				if job.expired():
+					job.future.set_exception(TimeoutError("deadline passed while rate limited"))
+					continue
+
+				self._run(handler, job)
+		finally:
+			if handler is not None:
+				handler.cleanup()
+
+	def _run(self, handler, job):
+		handler.cancel_event.clear()
+		timed_out = threading.Event()
+		timer = None
+		if job.deadline is not None:
+			def expire():
+				timed_out.set()
+				handler.cancel_event.set()
+
+			timer = threading.Timer(max(0.0, job.deadline - time.monotonic()), expire)
+			timer.daemon = True
+			timer.start()
+		try:
+			queued = time.monotonic() - job.submitted
+			if job.on_delta is None:
+				chat = handler.chat_fresh if self.fresh else handler.chat
+				result = chat(job.user_prompt, job.system_prompt, job.file_path)
+			else:
+				# The settled answer is the stream's return value, not the joined deltas.
+				stream = handler.chat_stream(job.user_prompt, job.system_prompt, job.file_path, fresh=self.fresh)
+				while True:
+					try:
+						delta = next(stream)
+					except StopIteration as stop:
+						result = stop.value
+						break
+					job.on_delta(delta)
+			logger_config.debug(f"[ChatScheduler] {type(handler).__name__} job done after {queued:.2f}s queued")
+			if result is None and timed_out.is_set():
+				# The chat swallows its ChatCancelled; tell a timeout from an empty answer.
+				job.future.set_exception(TimeoutError("deadline passed while running"))
+			else:
+				job.future.set_result(result)
+		except Exception as e:
+			job.future.set_exception(e)
+		finally:
+			if timer is not None:
+				timer.cancel()
+				# A deadline that fired must not cancel the prefetch that follows.
+				handler.cancel_event.clear()
+
+	def shutdown(self, wait=True):
+		"""Stop the workers once the queued jobs are done, and close their browsers"""
+		self._closed = True
+		for handler_cls, jobs in self._queues.items():
+			for _ in range(self._workers[handler_cls]):
+				# Sorts after every real job, whatever its priority.
+				jobs.put((float('inf'), next(self._seq), _STOP))
+		if wait:
+			for thread in self._threads:
+				thread.join()
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *exc):
+		self.shutdown()
@@ -0,0 +1,160 @@
+"""Debug screenshots, kept off the chat's hot path.
+
+Handlers call save_screenshot 5-15 times per chat, often with nothing changed
+in between. The page capture itself has to happen on the thread that owns the
+page, but everything after it does not: the bytes go to a background worker
+that drops frames identical to the last one written under the same name and
+writes the rest to ``TEMP_OUTPUT``. Captures are also rate limited per name,
+and can be limited to error paths or a sample.
+
+Frames are compared with an 8x8 average hash when Pillow is installed, so
+a blinking cursor does not count as a change, and by exact bytes otherwise.
+
+Environment variables:
+    SCREENSHOT_MODE         - all | sample | errors | off (default all)
+    SCREENSHOT_SAMPLE_EVERY - in sample mode, keep one capture in N (default 5)
+    SCREENSHOT_MIN_INTERVAL - seconds between captures of one name (default 1)
+    SCREENSHOT_FORMAT       - png | jpeg (default png)
+    SCREENSHOT_QUALITY      - JPEG quality (default 60)
+    SCREENSHOT_SCALE        - device | css; css skips the hi-dpi render (default device)
+    TEMP_OUTPUT             - folder screenshots are written to
+"""
+
+import hashlib
+import io
+import os
+import queue
+import threading
+import time
+
+from custom_logger import logger_config
+
+MODES = ('all', 'sample', 'errors', 'off')
+
+
+def _frame_hash(data):
+	try:
+		from PIL import Image
+	except ImportError:
+		return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+	try:
+		image = Image.open(io.BytesIO(data)).convert('L').resize((8, 8))
+		pixels = list(image.getdata())
+		mean = sum(pixels) / len(pixels)
+		return ''.join('1' if p > mean else '0' for p in pixels)
+	except Exception:
+		return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+class ScreenshotWriter:
+	def __init__(self):
+		self.mode = os.getenv("SCREENSHOT_MODE", "all").lower()
+		if self.mode not in MODES:
+			logger_config.info(f"Unknown SCREENSHOT_MODE {self.mode!r}, using 'all'")
+			self.mode = 'all'
+		try: self.sample_every = max(1, int(os.getenv("SCREENSHOT_SAMPLE_EVERY") or 5))
+		except Exception: self.sample_every = 5
+		try: self.min_interval = float(os.getenv("SCREENSHOT_MIN_INTERVAL") or 1)
+		except Exception: self.min_interval = 1.0
+		self.format = 'jpeg' if os.getenv("SCREENSHOT_FORMAT", "png").lower() in ('jpeg', 'jpg') else 'png'
+		try: self.quality = int(os.getenv("SCREENSHOT_QUALITY") or 60)
+		except Exception: self.quality = 60
+		self.scale = 'css' if os.getenv("SCREENSHOT_SCALE", "device").lower() == 'css' else 'device'
+		self.folder = os.getenv("TEMP_OUTPUT", "chat_bot_ui_handler_logs")
+
+		self._lock = threading.Lock()
+		self._last_capture = {}
+		self._counts = {}
+		self._last_hash = {}
+		self._queue = queue.Queue()
+		self._worker = None
+		self.written = 0
+		self.skipped = 0
+
+	def should_capture(self, name, error=False):
+		"""Whether a capture under name is wanted right now. Claims the rate-limit slot when it is"""
+		if self.mode == 'off':
+			return False
+		if error:
+			return True
+		if self.mode == 'errors':
+			return False
+
+		with self._lock:
+			self._counts[name] = self._counts.get(name, 0) + 1
+			if self.mode == 'sample' and (self._counts[name] - 1) % self.sample_every:
+				return False
+			now = time.monotonic()
+			if now - self._last_capture.get(name, float('-inf')) < self.min_interval:
+				return False
+			self._last_capture[name] = now
+			return True
+
+	def screenshot_options(self):
+		"""Keyword arguments for page.screenshot()"""
+		options = {'type': self.format, 'scale': self.scale}
+		if self.format == 'jpeg':
+			options['quality'] = self.quality
+		return options
+
+	def path_for(self, name):
+		return os.path.join(self.folder, f"{name}.{'jpg' if self.format == 'jpeg' else 'png'}")
+
+	def submit(self, name, data, error=False):
+		"""Hand captured bytes to the background worker. Error frames are never deduplicated"""
+		if self._worker is None or not self._worker.is_alive():
+			with self._lock:
+				if self._worker is None or not self._worker.is_alive():
+					os.makedirs(self.folder, exist_ok=True)
+					self._worker = threading.Thread(target=self._run, name="screenshot-writer", daemon=True)
+					self._worker.start()
+		self._queue.put((name, data, error))
+
+	def capture(self, page, name, error=False):
+		"""Capture a sync page, if wanted, and queue it for writing"""
+		if not self.should_capture(name, error):
+			return
+		self.submit(name, page.screenshot(**self.screenshot_options()), error)
+
+	def flush(self):
+		"""Block until every queued frame is written"""
+		if self._worker is not None:
+			self._queue.join()
+
+	def _run(self):
+		while True:
+			name, data, error = self._queue.get()
+			try:
+				self._write(name, data, error)
+			except Exception as e:
+				logger_config.debug(f"Could not write screenshot {name}: {e}")
+			finally:
+				self._queue.task_done()
+
+	def _write(self, name, data, error=False):
+		frame_hash = _frame_hash(data)
+		if not error and self._last_hash.get(name) == frame_hash:
+			self.skipped += 1
+			return
+		self._last_hash[name] = frame_hash
+		path = self.path_for(name)
+		tmp_path = f"{path}.tmp"
+		with open(tmp_path, 'wb') as f:
+			f.write(data)
+		os.replace(tmp_path, path)
+		self.written += 1
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_writer():
+	"""The process-wide writer, configured from the environment on first use"""
+	global _writer
+	if _writer is None:
+		with _writer_lock:
+			if _writer is None:
+				_writer = ScreenshotWriter()
+	return _writer
@@ -0,0 +1,294 @@
+"""HTTP service behind the ``static/`` caption generator.
+
+    python -m chat_bot_ui_handler.server --port 8000
+
+Endpoints:
+    GET  /                         the page in STATIC_DIR (index.html), plus /static/*
+    POST /generate-caption         multipart upload -> {"caption": "..."}
+                                   or an error {"detail": "..."}
+    POST /generate-caption/stream  same form, answered as server-sent events:
+                                   ``delta`` events while the answer is written,
+                                   then ``done`` with the settled caption, which
+                                   replaces the deltas (or ``error``)
+    GET  /health                   queue depth per provider
+
+Form fields: the image (any file field), and optionally ``prompt`` and
+``provider`` (one of the names in PROVIDERS; default pally).
+
+Uploads are streamed to disk in chunks and hashed on the way, so memory use
+does not grow with file size. Chats run on the warm worker browsers of a
+ChatScheduler. Requests for the same provider, prompt and file content that
+arrive while one is already running join it instead of starting another
+browser run; streaming followers get the text so far and then the rest live.
+
+Needs aiohttp (``pip install chat-bot-ui-handler[server]``).
+
+Environment variables:
+    STATIC_DIR            - folder with the page (default: static/ next to the package)
+    UPLOAD_DIR            - where uploads are spooled (default: system temp dir)
+    SERVER_WORKERS        - worker browsers per provider (default 1)
+    SERVER_MAX_UPLOAD_MB  - largest accepted upload (default 10)
+    SERVER_JOB_TIMEOUT    - seconds a caption may take (default 600)
+    SERVER_FRESH          - 1 to answer every request on a new page, readied
+                            while the worker is idle (see PREFETCH_PAGES)
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import tempfile
+
+from custom_logger import logger_config
+
+DEFAULT_PROMPT = (
+	"Describe this image in one or two sentences, as a caption. "
+	"Give the caption only."
+)
+_CHUNK = 64 * 1024
+
+
+def default_providers():
+	from chat_bot_ui_handler.registry import get_handler
+
+	return {name: get_handler(name) for name in ('pally', 'moondream', 'gemini')}
+
+
+class _InFlight:
+	"""One browser run and everyone waiting on it"""
+
+	def __init__(self):
+		self.deltas = []
+		self.listeners = []
+		self.done = asyncio.get_running_loop().create_future()
+
+	def publish(self, delta):
+		self.deltas.append(delta)
+		for listener in self.listeners:
+			listener.put_nowait(delta)
+
+
+class CaptionService:
+	def __init__(self, providers=None, workers=None, upload_dir=None, config_factory=None):
+		from chat_bot_ui_handler.scheduler import ChatScheduler
+
+		self.providers = providers or default_providers()
+		try: workers = int(workers if workers is not None else os.getenv("SERVER_WORKERS") or 1)
+		except Exception: workers = 1
+		try: self.max_upload = int(float(os.getenv("SERVER_MAX_UPLOAD_MB") or 10) * 1024 * 1024)
+		except Exception: self.max_upload = 10 * 1024 * 1024
+		try: self.job_timeout = float(os.getenv("SERVER_JOB_TIMEOUT") or 600)
+		except Exception: self.job_timeout = 600.0
+		self.upload_dir = upload_dir or os.getenv("UPLOAD_DIR") or tempfile.gettempdir()
+		os.makedirs(self.upload_dir, exist_ok=True)
+
+		kwargs = {'config_factory': config_factory} if config_factory else {}
+		kwargs['fresh'] = os.getenv("SERVER_FRESH", "0") == "1"
+		self.scheduler = ChatScheduler({cls: workers for cls in self.providers.values()}, **kwargs)
+		self.in_flight = {}
+		self.coalesced = 0
+
+	async def read_form(self, request):
+		"""Spool the upload to disk. Returns (provider, prompt, file path, content hash)"""
+		reader = await request.multipart()
+		fields = {}
+		file_path = None
+		sha = hashlib.sha256()
+		try:
+			while True:
+				part = await reader.next()
+				if part is None:
+					break
+				if part.filename:
+					if file_path:
+						continue
+					suffix = os.path.splitext(part.filename)[1][:10]
+					fd, file_path = tempfile.mkstemp(suffix=suffix, dir=self.upload_dir)
+					size = 0
+					with os.fdopen(fd, 'wb') as f:
+						while True:
+							chunk = await part.read_chunk(_CHUNK)
+							if not chunk:
+								break
+							size += len(chunk)
+							if size > self.max_upload:
+								raise ValueError(f"Upload exceeds {self.max_upload // (1024 * 1024)}MB")
+							sha.update(chunk)
+							f.write(chunk)
+				else:
+					fields[part.name] = (await part.text())[:10000]
+		except Exception:
+			self._discard(file_path)
+			raise
+
+		if not file_path:
+			raise ValueError("No image was uploaded")
+		provider = (fields.get('provider') or 'pally').lower()
+		if provider not in self.providers:
+			self._discard(file_path)
+			raise ValueError(f"Unknown provider {provider!r}; choose one of {', '.join(self.providers)}")
+		prompt = fields.get('prompt') or DEFAULT_PROMPT
+		return provider, prompt, file_path, sha.hexdigest()
+
+	def _discard(self, file_path):
+		if file_path:
+			try:
+				os.remove(file_path)
+			except OSError:
+				pass
+
+	def run(self, provider, prompt, file_path, digest):
+		"""Join the run for this question, or start one. Returns its _InFlight"""
+		key = (provider, prompt, digest)
+		flight = self.in_flight.get(key)
+		if flight is not None:
+			self.coalesced += 1
+			self._discard(file_path)
+			return flight
+
+		loop = asyncio.get_running_loop()
+		flight = self.in_flight[key] = _InFlight()
+		future = self.scheduler.submit(
+			self.providers[provider], prompt, file_path=file_path, deadline=self.job_timeout,
+			on_delta=lambda delta: loop.call_soon_threadsafe(flight.publish, delta),
+		)
+
+		def finished(_):
+			self.in_flight.pop(key, None)
+			self._discard(file_path)
+			if future.cancelled():
+				flight.done.set_exception(RuntimeError("caption job was cancelled"))
+			elif future.exception() is not None:
+				flight.done.set_exception(future.exception())
+			else:
+				flight.done.set_result(future.result())
+
+		# Deltas are delivered with call_soon_threadsafe too, so resolving the
+		# same way keeps them ordered before the result.
+		future.add_done_callback(lambda f: loop.call_soon_threadsafe(finished, f))
+		return flight
+
+	async def generate_caption(self, request):
+		from aiohttp import web
+
+		try:
+			flight = self.run(*await self.read_form(request))
+		except ValueError as e:
+			return web.json_response({'detail': str(e)}, status=400)
+
+		try:
+			caption = await asyncio.shield(flight.done)
+		except TimeoutError as e:
+			logger_config.error(f"[CaptionService] Caption timed out: {e}")
+			return web.json_response({'detail': f"Caption timed out: {e}"}, status=504)
+		except Exception as e:
+			logger_config.error(f"[CaptionService] Caption failed: {e}")
+			return web.json_response({'detail': f"Caption failed: {e}"}, status=500)
+		if not caption:
+			return web.json_response({'detail': "The chatbot returned no caption"}, status=502)
+		return web.json_response({'caption': caption.strip()})
+
+	async def generate_caption_stream(self, request):
+		from aiohttp import web
+
+		try:
+			flight = self.run(*await self.read_form(request))
+		except ValueError as e:
+			return web.json_response({'detail': str(e)}, status=400)
+
+		response = web.StreamResponse(headers={
+			'Content-Type': 'text/event-stream',
+			'Cache-Control': 'no-cache',
+			'X-Accel-Buffering': 'no',
+		})
+		await response.prepare(request)
+
+		async def send(event, data):
+			await response.write(f"event: {event}\ndata: {json.dumps(data)}\n\n".encode('utf-8'))
+
+		listener = asyncio.Queue()
+		backlog = list(flight.deltas)
+		flight.listeners.append(listener)
+		try:
+			if backlog:
+				await send('delta', {'text': "".join(backlog)})
+			while True:
+				getter = asyncio.ensure_future(listener.get())
+				await asyncio.wait({getter, flight.done}, return_when=asyncio.FIRST_COMPLETED)
+				if getter.done():
+					await send('delta', {'text': getter.result()})
+					continue
+				getter.cancel()
+				while not listener.empty():
+					await send('delta', {'text': listener.get_nowait()})
+				break
+
+			if flight.done.exception() is not None:
+				await send('error', {'detail': str(flight.done.exception())})
+			elif not flight.done.result():
+				await send('error', {'detail': "The chatbot returned no caption"})
+			else:
+				await send('done', {'caption': flight.done.result().strip()})
+		except ConnectionResetError:
+			pass
+		finally:
+			flight.listeners.remove(listener)
+		return response
+
+	async def health(self, request):
+		from aiohttp import web
+
+		return web.json_response({
+			'pending': self.scheduler.pending(),
+			'in_flight': len(self.in_flight),
+			'coalesced': self.coalesced,
+		})
+
+	def close(self):
+		self.scheduler.shutdown(wait=False)
+
+
+def create_app(service=None, static_dir=None):
+	from aiohttp import web
+
+	service = service or CaptionService()
+	static_dir = static_dir or os.getenv("STATIC_DIR") or os.path.join(
+		os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'static'
+	)
+
+	app = web.Application(client_max_size=service.max_upload + 1024 * 1024)
+	app['service'] = service
+	app.router.add_post('/generate-caption', service.generate_caption)
+	app.router.add_post('/generate-caption/stream', service.generate_caption_stream)
+	app.router.add_get('/health', service.health)
+
+	index = os.path.join(static_dir, 'index.html')
+	if os.path.exists(index):
+		app.router.add_get('/', lambda request: web.FileResponse(index))
+	if os.path.isdir(static_dir):
+		app.router.add_static('/static', static_dir)
+
+	async def on_cleanup(app):
+		app['service'].close()
+
+	app.on_cleanup.append(on_cleanup)
+	return app
+
+
+def main(argv=None):
+	from aiohttp import web
+
+	parser = argparse.ArgumentParser(description="Serve the caption generator")
+	parser.add_argument('--host', default='0.0.0.0')
+	parser.add_argument('--port', type=int, default=8000)
+	parser.add_argument('--workers', type=int, default=None, help="worker browsers per provider")
+	args = parser.parse_args(argv)
+
+	from chat_bot_ui_handler.env import load_env
+	load_env()
+	web.run_app(create_app(CaptionService(workers=args.workers)), host=args.host, port=args.port)
+
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,205 @@
+"""Snapshots of a signed-in Google session, so setup rarely has to log in.
+
+GoogleLoginInjector walks the whole sign-in flow, which takes seconds at
+best and minutes when Google asks for 2FA or a CAPTCHA. After a successful
+sign-in the context's ``storage_state`` (cookies and localStorage) is saved
+per account. The next page setup restores that snapshot and checks it with a
+single request to myaccount.google.com; the injector only runs when that
+check says the session is gone.
+
+A context that already holds the session (a persistent profile, or one
+restored earlier) keeps its own cookies, which are newer than the snapshot;
+the snapshot only replaces them once the check has found them signed out.
+
+The snapshots hold live session cookies, so they are written readable by the
+owner only.
+
+Environment variables:
+    SESSION_CACHE_DIR - where snapshots are kept (default ~/.chat_bot_ui_handler_sessions)
+    SESSION_CACHE     - set to 0 to always run the injector
+"""
+
+import json
+import os
+import re
+from urllib.parse import urlparse
+
+from custom_logger import logger_config
+
+from chat_bot_ui_handler.google_login_injector import SIGNED_IN_URL_MARKERS
+
+# Signed in, this lands on myaccount.google.com; signed out, it redirects to
+# an accounts.google.com sign-in page.
+CHECK_URL = "https://myaccount.google.com/"
+CHECK_HOST = "myaccount.google.com"
+# The account home, also per signed-in account index (/u/1/).
+_ACCOUNT_HOME = re.compile(r'^(/u/\d+)?/?$')
+
+# Playwright can add cookies to an existing context but has no call for
+# localStorage, so each origin's items are written by an init script the first
+# time a page of that origin loads.
+_LOCAL_STORAGE_JS = """(origins => {
+	const items = origins[location.origin];
+	if (!items || sessionStorage.getItem('__cbuiSessionRestored')) return;
+	for (const {name, value} of items) {
+		try { localStorage.setItem(name, value); } catch (e) {}
+	}
+	sessionStorage.setItem('__cbuiSessionRestored', '1');
+})(%s)"""
+
+
+def is_enabled():
+	return os.getenv("SESSION_CACHE", "1") != "0"
+
+
+def _init_script(state):
+	origins = {
+		origin['origin']: origin.get('localStorage', [])
+		for origin in state.get('origins', [])
+		if origin.get('localStorage')
+	}
+	return _LOCAL_STORAGE_JS % json.dumps(origins) if origins else None
+
+
+def _cookie_key(cookie):
+	return (cookie.get('name'), cookie.get('domain'), cookie.get('path', '/'))
+
+
+def _cookies_to_add(state, live, replace):
+	"""The snapshot cookies to put into a context holding the live cookies, or None to leave it be"""
+	cookies = state.get('cookies') or []
+	if not replace:
+		live_keys = {_cookie_key(cookie) for cookie in live}
+		# Signed in already, or out: either way the check decides, not the snapshot.
+		if any(_cookie_key(cookie) in live_keys for cookie in cookies):
+			return None
+		return cookies
+	live_values = {_cookie_key(cookie): cookie.get('value') for cookie in live}
+	if all(live_values.get(_cookie_key(cookie)) == cookie.get('value') for cookie in cookies):
+		return None
+	return cookies
+
+
+def _signed_in_url(url):
+	"""Whether the check request ended on the account page rather than a sign-in page.
+
+	Only the host and path count: the sign-in redirect carries the account
+	page's URL in its ``continue`` parameter.
+	"""
+	parsed = urlparse(url)
+	if parsed.hostname != CHECK_HOST:
+		return False
+	path_markers = [marker for marker in SIGNED_IN_URL_MARKERS if marker.startswith('/')]
+	return bool(_ACCOUNT_HOME.match(parsed.path)) or any(parsed.path.startswith(marker) for marker in path_markers)
+
+
+class SessionCache:
+	def __init__(self, folder=None):
+		self.folder = folder or os.getenv("SESSION_CACHE_DIR") or os.path.expanduser("~/.chat_bot_ui_handler_sessions")
+
+	def path_for(self, account):
+		safe = re.sub(r'[^A-Za-z0-9_.@-]', '_', account or 'default')
+		return os.path.join(self.folder, f"{safe}.json")
+
+	def load(self, account):
+		try:
+			with open(self.path_for(account)) as f:
+				return json.load(f)
+		except FileNotFoundError:
+			return None
+		except Exception as e:
+			logger_config.info(f"[SessionCache] Ignoring unreadable snapshot for {account}: {e}")
+			return None
+
+	def store(self, account, state):
+		os.makedirs(self.folder, mode=0o700, exist_ok=True)
+		path = self.path_for(account)
+		tmp_path = f"{path}.tmp"
+		fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+		with os.fdopen(fd, 'w') as f:
+			json.dump(state, f)
+		os.replace(tmp_path, path)
+
+	def forget(self, account):
+		try:
+			os.remove(self.path_for(account))
+		except FileNotFoundError:
+			pass
+
+	# sync pages
+
+	def restore(self, page, account, replace=False):
+		"""Put the account's snapshot into the page's context. Returns whether it did.
+
+		A context that holds the session's cookies already keeps them, unless
+		replace=True (after a failed check) and they differ from the snapshot.
+		The localStorage script is added once per context.
+		"""
+		state = self.load(account)
+		if not state:
+			return False
+		context = page.context
+		cookies = _cookies_to_add(state, context.cookies(), replace)
+		if cookies is None:
+			return False
+		if cookies:
+			context.add_cookies(cookies)
+		script = _init_script(state)
+		if script and not getattr(context, '_cbui_session_script', False):
+			context.add_init_script(script)
+			context._cbui_session_script = True
+		return True
+
+	def is_signed_in(self, page):
+		"""One request, sharing the page's cookies, to see whether Google still knows the session"""
+		try:
+			response = page.request.get(CHECK_URL, timeout=15000)
+			return response.ok and _signed_in_url(response.url)
+		except Exception as e:
+			logger_config.debug(f"[SessionCache] Session check failed: {e}")
+			return False
+
+	def save(self, page, account):
+		try:
+			self.store(account, page.context.storage_state())
+			logger_config.info(f"[SessionCache] Saved session for {account}")
+		except Exception as e:
+			logger_config.info(f"[SessionCache] Could not save session for {account}: {e}")
+
+	# async pages
+
+	async def arestore(self, page, account, replace=False):
+		state = self.load(account)
+		if not state:
+			return False
+		context = page.context
+		cookies = _cookies_to_add(state, await context.cookies(), replace)
+		if cookies is None:
+			return False
+		if cookies:
+			await context.add_cookies(cookies)
+		script = _init_script(state)
+		if script and not getattr(context, '_cbui_session_script', False):
+			await context.add_init_script(script)
+			context._cbui_session_script = True
+		return True
+
+	async def ais_signed_in(self, page):
+		try:
+			response = await page.request.get(CHECK_URL, timeout=15000)
+			return response.ok and _signed_in_url(response.url)
+		except Exception as e:
+			logger_config.debug(f"[SessionCache] Session check failed: {e}")
+			return False
+
+	async def asave(self, page, account):
+		try:
+			self.store(account, await page.context.storage_state())
+			logger_config.info(f"[SessionCache] Saved session for {account}")
+		except Exception as e:
+			logger_config.info(f"[SessionCache] Could not save session for {account}: {e}")
+
+
+def google_account():
+	"""The account GoogleLoginInjector signs in as"""
+	return os.getenv('GOOGLE_EMAIL') or os.getenv('OAUTH_EMAIL')
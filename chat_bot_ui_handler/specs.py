@@ -0,0 +1,385 @@
+"""Handlers described by data files instead of Python subclasses.
+
+Most handlers are a URL, a selector dict and one or two small overrides.
+A spec file says the same thing as data, and SpecRegistry turns it into a
+BaseUIChat subclass:
+
+    {
+        "name": "bing",
+        "class_name": "BingUIChat",
+        "url": "https://www.bing.com/images",
+        "docker_suffix": "bing_ui_chat",
+        "selectors": {"input": "#sb_form_q", "send_button": "#sb_form_go",
+                      "wait_selector": ".answer_container", "result": ".answer_container"},
+        "completion": {"stop_button": "...", "stable_ms": 1500},
+        "upload": {"strategy": "xdotool", "open": ["button[aria-label=Attach]"]},
+        "post_process": [{"cut_at": ["AI can make mistakes"]}, {"strip": true}]
+    }
+
+Fields:
+    name          - registry name (required)
+    class_name    - name of the generated class; also names its default
+                    profile folder (default: name in CamelCase + "UIChat")
+    extends       - registry name of a Python handler to start from; the
+                    spec then only lists what it changes, and its
+                    selectors are merged over the handler's
+    url, docker_suffix, google_login
+    selectors     - as returned by get_selectors()
+    completion    - stop_button, done (the wait_selector), container (the
+                    generation_container), stable_ms, quiet_ms; see completion.py
+    upload        - strategy: "input" (set the file on input_file), "xdotool"
+                    (native dialog) or "chooser" (Playwright file chooser);
+                    open: selectors clicked first, in order; wait_ms after
+                    each click; settle_ms, the longest wait for the upload to
+                    show (see BaseUIChat.wait_for_upload); limits, merged over
+                    uploads.default_limits()
+    post_process  - steps applied to the answer in order: {"strip": true},
+                    {"replace": [old, new]}, {"sub": [regex, repl]},
+                    {"cut_at": [marker, ...]} (drop from the first marker on),
+                    {"after": marker} (keep what follows its last occurrence)
+
+Specs are read from the ``handler_specs/`` folder of the package and then
+from every folder in HANDLER_SPEC_DIRS (os.pathsep separated); a later spec
+with the same name replaces an earlier one. ``.json`` always works,
+``.yaml``/``.yml`` when PyYAML is installed.
+
+Each file is compiled once and kept until its mtime changes. Generated
+handlers look their spec up when a chat starts and keep it until the chat
+ends, so after a reload the running instances, and the browsers they hold,
+use the new selectors from their next chat, never a mix of two versions in
+one. A handler whose spec file is deleted or renamed keeps the last spec it
+had. The registry rescans its folders at most every SPEC_RELOAD_INTERVAL seconds
+(default 5; 0 turns it off, call ``reload()`` instead).
+"""
+
+import json
+import os
+import re
+import threading
+import time
+
+BUILTIN_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'handler_specs')
+_EXTENSIONS = ('.json', '.yaml', '.yml')
+_COMPLETION_KEYS = {
+	'stop_button': 'stop_button',
+	'done': 'wait_selector',
+	'container': 'generation_container',
+	'stable_ms': 'stable_ms',
+	'quiet_ms': 'quiet_ms',
+}
+_UPLOAD_STRATEGIES = ('input', 'xdotool', 'chooser')
+
+
+class SpecError(ValueError):
+	"""A spec file that cannot be turned into a handler"""
+
+
+def read_spec(path):
+	with open(path, encoding='utf-8') as f:
+		if path.endswith('.json'):
+			return json.load(f)
+		try:
+			import yaml
+		except ImportError:
+			raise SpecError(f"{path}: PyYAML is needed for YAML specs")
+		return yaml.safe_load(f)
+
+
+def _post_processor(steps):
+	"""Compile the post_process steps into one function"""
+	compiled = []
+	for step in steps:
+		if not isinstance(step, dict) or len(step) != 1:
+			raise SpecError(f"post_process step must be a single-key object: {step!r}")
+		(op, arg), = step.items()
+		if op == 'strip':
+			compiled.append(lambda text: text.strip())
+		elif op == 'replace':
+			old, new = arg
+			compiled.append(lambda text, old=old, new=new: text.replace(old, new))
+		elif op == 'sub':
+			pattern, repl = re.compile(arg[0], re.S), arg[1]
+			compiled.append(lambda text, pattern=pattern, repl=repl: pattern.sub(repl, text))
+		elif op == 'cut_at':
+			markers = [arg] if isinstance(arg, str) else list(arg)
+
+			def cut(text, markers=markers):
+				for marker in markers:
+					if marker in text:
+						text = text[:text.index(marker)]
+				return text
+			compiled.append(cut)
+		elif op == 'after':
+			compiled.append(lambda text, marker=arg: text.rsplit(marker, 1)[-1])
+		else:
+			raise SpecError(f"unknown post_process step {op!r}")
+
+	def post_process(text):
+		for fn in compiled:
+			text = fn(text)
+		return text
+	return post_process
+
+
+class CompiledSpec:
+	"""A validated spec, with its selectors merged and its post-processing compiled"""
+
+	def __init__(self, spec, source=None):
+		if not isinstance(spec, dict) or not spec.get('name'):
+			raise SpecError(f"{source}: a spec needs a name")
+		self.source = source
+		self.name = spec['name']
+		self.extends = spec.get('extends')
+		self.class_name = spec.get('class_name') or (
+			''.join(part.capitalize() for part in re.split(r'[^0-9a-zA-Z]+', self.name)) + 'UIChat'
+		)
+		self.url = spec.get('url')
+		self.docker_suffix = spec.get('docker_suffix')
+		self.google_login = spec.get('google_login')
+
+		self.selectors = dict(spec.get('selectors') or {})
+		for key, value in (spec.get('completion') or {}).items():
+			if key not in _COMPLETION_KEYS:
+				raise SpecError(f"{self.name}: unknown completion key {key!r}")
+			self.selectors[_COMPLETION_KEYS[key]] = value
+
+		self.upload = spec.get('upload')
+		if self.upload is not None:
+			strategy = self.upload.get('strategy', 'input')
+			if strategy not in _UPLOAD_STRATEGIES:
+				raise SpecError(f"{self.name}: upload strategy must be one of {', '.join(_UPLOAD_STRATEGIES)}")
+			if strategy == 'chooser' and not self.upload.get('open'):
+				raise SpecError(f"{self.name}: the chooser strategy needs the selector that opens it in 'open'")
+		self.post_process = _post_processor(spec.get('post_process') or [])
+
+		if not self.extends:
+			missing = [field for field in ('url', 'docker_suffix') if not getattr(self, field)]
+			missing += [key for key in ('input', 'send_button', 'result') if key not in self.selectors]
+			if missing:
+				raise SpecError(f"{self.name}: missing {', '.join(missing)}")
+
+
+class SpecHandler:
+	"""Mixed in front of the base class of every generated handler"""
+
+	spec_name = None
+	spec_registry = None
+	# The spec of the running chat, and the last one seen, per instance.
+	_chat_spec = None
+	_last_spec = None
+
+	@property
+	def spec(self):
+		if self._chat_spec is not None:
+			return self._chat_spec
+		return self._current_spec()
+
+	def _current_spec(self):
+		"""The registry's spec, or the last one seen once the spec is gone"""
+		try:
+			self._last_spec = self.spec_registry.spec(self.spec_name)
+		except KeyError:
+			if self._last_spec is None:
+				raise
+		return self._last_spec
+
+	def start_attempt(self):
+		# One spec for the whole chat, however the files change meanwhile.
+		self._chat_spec = self._current_spec()
+		super().start_attempt()
+
+	def finish_attempt(self, ok):
+		try:
+			super().finish_attempt(ok)
+		finally:
+			self._chat_spec = None
+
+	def get_docker_name(self):
+		if self.spec.docker_suffix:
+			return f"{self.config.docker_name}_{self.spec.docker_suffix}"
+		return super().get_docker_name()
+
+	def get_url(self):
+		return self.spec.url or super().get_url()
+
+	def need_google_login(self):
+		if self.spec.google_login is None:
+			return super().need_google_login()
+		return bool(self.spec.google_login)
+
+	def get_selectors(self):
+		spec = self.spec
+		selectors = dict(super().get_selectors()) if spec.extends else {}
+		selectors.update(spec.selectors)
+		return selectors
+
+	@property
+	def upload_via_attach_folder(self):
+		upload = self.spec.upload
+		if not upload:
+			return super().upload_via_attach_folder
+		return upload.get('strategy') == 'xdotool'
+
+	def get_upload_limits(self):
+		limits = dict(super().get_upload_limits())
+		limits.update((self.spec.upload or {}).get('limits') or {})
+		return limits
+
+	def show_input_file_tag(self, page):
+		upload = self.spec.upload
+		if not upload:
+			return super().show_input_file_tag(page)
+		for selector in upload.get('open', []):
+			page.locator(selector).first.click()
+			page.wait_for_timeout(upload.get('wait_ms', 1000))
+
+	def upload_file(self, page, file_path):
+		upload = self.spec.upload
+		strategy = (upload or {}).get('strategy', 'input')
+		if not file_path or not upload or strategy == 'input':
+			return super().upload_file(page, file_path)
+
+		self.logger.info(f"Uploading file: {file_path}")
+		opens = list(upload.get('open', []))
+		before = self.attachment_count(page)
+		if strategy == 'chooser':
+			trigger = opens.pop()
+			for selector in opens:
+				page.locator(selector).first.click()
+				page.wait_for_timeout(upload.get('wait_ms', 1000))
+			with page.expect_file_chooser() as fc_info:
+				page.locator(trigger).first.click(force=True)
+			fc_info.value.set_files(file_path)
+		else:
+			self.show_input_file_tag(page)
+			self.get_browser_manager().launcher.choose_file_via_xdotool(config=self.config, file_path=file_path)
+
+		self.wait_for_upload(page, before, upload.get('settle_ms', 5000))
+		self.logger.info("File uploaded successfully")
+		self.save_screenshot(page)
+
+	def post_process_response(self, result):
+		return self.spec.post_process(super().post_process_response(result))
+
+
+def default_dirs():
+	extra = [folder for folder in (os.getenv("HANDLER_SPEC_DIRS") or "").split(os.pathsep) if folder]
+	return [BUILTIN_DIR] + extra
+
+
+class SpecRegistry:
+	def __init__(self, dirs=None, reload_interval=None):
+		self.dirs = list(dirs) if dirs is not None else default_dirs()
+		if reload_interval is None:
+			try: reload_interval = float(os.getenv("SPEC_RELOAD_INTERVAL") or 5)
+			except Exception: reload_interval = 5.0
+		self.reload_interval = reload_interval
+		self._files = {}
+		self._specs = {}
+		self._classes = {}
+		self._checked = 0.0
+		self._lock = threading.RLock()
+		self.reload()
+
+	def _paths(self):
+		for folder in self.dirs:
+			if not os.path.isdir(folder):
+				continue
+			for filename in sorted(os.listdir(folder)):
+				if filename.endswith(_EXTENSIONS):
+					yield os.path.join(folder, filename)
+
+	def reload(self):
+		"""Recompile the spec files that changed. Returns the names whose spec changed"""
+		with self._lock:
+			self._checked = time.monotonic()
+			seen = {}
+			for path in self._paths():
+				try:
+					stat = os.stat(path)
+				except OSError:
+					continue
+				stamp = (stat.st_mtime_ns, stat.st_size)
+				cached = self._files.get(path)
+				if cached and cached[0] == stamp:
+					seen[path] = cached
+					continue
+				try:
+					seen[path] = (stamp, CompiledSpec(read_spec(path), source=path))
+				except Exception as e:
+					from custom_logger import logger_config
+					logger_config.error(f"[SpecRegistry] Skipping {path}: {e}")
+					# A broken edit keeps the last good version running.
+					if cached:
+						seen[path] = cached
+
+			specs = {}
+			for path in self._paths():
+				if path in seen:
+					spec = seen[path][1]
+					specs[spec.name] = spec
+			changed = [
+				name for name in set(specs) | set(self._specs)
+				if specs.get(name) is not self._specs.get(name)
+			]
+			self._files = seen
+			self._specs = specs
+			return sorted(changed)
+
+	def maybe_reload(self):
+		if self.reload_interval and time.monotonic() - self._checked >= self.reload_interval:
+			self.reload()
+
+	def names(self):
+		self.maybe_reload()
+		return list(self._specs)
+
+	def __contains__(self, name):
+		self.maybe_reload()
+		return name in self._specs
+
+	def spec(self, name):
+		self.maybe_reload()
+		try:
+			return self._specs[name]
+		except KeyError:
+			raise KeyError(f"No handler spec named {name!r}")
+
+	def handler_class(self, name):
+		"""The generated class for a spec. Built once per base class and reused across reloads"""
+		spec = self.spec(name)
+		with self._lock:
+			cached = self._classes.get(name)
+			if cached is not None and cached[0] == spec.extends:
+				return cached[1]
+
+			if spec.extends:
+				from chat_bot_ui_handler.registry import builtin_handler
+				base = builtin_handler(spec.extends)
+			else:
+				from chat_bot_ui_handler.base_ui_flow import BaseUIChat
+				base = BaseUIChat
+			handler_cls = type(spec.class_name, (SpecHandler, base), {
+				'spec_name': name,
+				'spec_registry': self,
+				'__module__': __name__,
+			})
+			self._classes[name] = (spec.extends, handler_cls)
+			return handler_cls
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_spec_registry():
+	global _registry
+	with _registry_lock:
+		if _registry is None:
+			_registry = SpecRegistry()
+		return _registry
+
+
+def spec_handler(name):
+	"""The handler class built from the spec called name"""
+	return get_spec_registry().handler_class(name)
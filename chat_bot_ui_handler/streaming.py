@@ -0,0 +1,168 @@
+"""Stream a response out of the page while the chatbot is still writing it.
+
+A MutationObserver on the page reads the result text whenever the DOM changes
+and hands it to Python through ``page.expose_binding``. The sync Playwright
+API only delivers binding calls while Python is inside a Playwright call, so
+the generator pumps with short ``wait_for_timeout`` calls and yields whatever
+text arrived since the last one.
+
+Environment variables:
+    STREAM_POLL_MS  - how often new text is collected (default 100)
+    STREAM_TIMEOUT  - seconds before the stream gives up (default 300)
+"""
+
+import asyncio
+import os
+import threading
+import time
+
+from chat_bot_ui_handler.page_scripts import with_query_all
+
+_BINDING = "__cbuiStreamPush"
+
+# Reads every result element past the first ``start`` (by default, those that
+# appear after the observer is attached), so answers split over several
+# elements (one per paragraph) stream as a whole and the previous turn's answer
+# is never re-read as this one.
+_OBSERVER_JS = with_query_all("""([selector, binding, start]) => {
+	if (window.__cbuiStreamObserver) window.__cbuiStreamObserver.disconnect();
+	const baseline = start == null ? queryAll(selector).length : start;
+	let last = null;
+	let scheduled = false;
+	const read = () => {
+		scheduled = false;
+		const text = queryAll(selector).slice(baseline)
+			.map(el => el.innerText || '').join('\\n');
+		if (text !== last) {
+			last = text;
+			window[binding](text);
+		}
+	};
+	const observer = new MutationObserver(() => {
+		if (!scheduled) {
+			scheduled = true;
+			setTimeout(read, 50);
+		}
+	});
+	observer.observe(document.body, {childList: true, subtree: true, characterData: true});
+	window.__cbuiStreamObserver = observer;
+	// Text written before the observer was attached.
+	read();
+}""")
+
+_STOP_OBSERVER_JS = """() => {
+	if (window.__cbuiStreamObserver) window.__cbuiStreamObserver.disconnect();
+	window.__cbuiStreamObserver = null;
+}"""
+
+
+class GenerationSettle:
+	"""Decides when generation is over from successive generation states.
+
+	Done once nothing reports as generating and the response length has held
+	steady, non-empty, for ``required`` checks in a row.
+	"""
+
+	def __init__(self, required=2):
+		self.required = required
+		self.last_len = -1
+		self.stable_checks = 0
+
+	def update(self, state):
+		if not state['generating'] and state['length'] > 0 and state['length'] == self.last_len:
+			self.stable_checks += 1
+		else:
+			self.stable_checks = 0
+		self.last_len = state['length']
+		return self.stable_checks >= self.required
+
+
+def _sink_for(page):
+	"""The list binding calls land in. Bound once per page: re-exposing a name raises."""
+	sink = getattr(page, '_cbui_stream_sink', None)
+	if sink is None:
+		sink = []
+		page.expose_binding(_BINDING, lambda source, text: sink.append(text))
+		page._cbui_stream_sink = sink
+	return sink
+
+
+def stream_response(handler, page, settle_interval_ms=2000, baseline=None):
+	"""Yield text deltas from the handler's result container until generation settles.
+
+	Call this right after ``send``. baseline is how many result elements the
+	page held before the prompt was sent; only the ones after it are read.
+	Without it, that is the ones that appear after the observer is attached,
+	which misses an answer that started while ``send`` was still settling. Text that is rewritten rather than extended
+	(some sites re-render markdown when done) cannot be retracted, so it is
+	left to the caller's final read. Returns the text streamed so far.
+	"""
+	try: poll_ms = int(os.getenv("STREAM_POLL_MS") or 100)
+	except Exception: poll_ms = 100
+	try: timeout = int(os.getenv("STREAM_TIMEOUT") or 300)
+	except Exception: timeout = 300
+
+	sink = _sink_for(page)
+	sink.clear()
+	page.evaluate(_OBSERVER_JS, [handler.get_selectors()['result'], _BINDING, baseline])
+
+	settle = GenerationSettle()
+	emitted = ""
+	next_check = time.monotonic() + settle_interval_ms / 1000
+	deadline = time.monotonic() + timeout
+	try:
+		while time.monotonic() < deadline:
+			handler.check_cancelled()
+			page.wait_for_timeout(poll_ms)
+			if sink:
+				text = sink[-1]
+				sink.clear()
+				if text.startswith(emitted) and len(text) > len(emitted):
+					delta = text[len(emitted):]
+					emitted = text
+					yield delta
+
+			if time.monotonic() >= next_check:
+				next_check = time.monotonic() + settle_interval_ms / 1000
+				if settle.update(handler.generation_state(page)):
+					return emitted
+		handler.logger.error(f"Stream did not settle within {timeout}s; ending it with what is on screen")
+		return emitted
+	finally:
+		try:
+			page.evaluate(_STOP_OBSERVER_JS)
+		except Exception:
+			pass
+
+
+async def iterate_in_thread(make_iterator, executor=None):
+	"""Drive a blocking iterator off the event loop and yield its items to asyncio.
+
+	Pass a single-worker executor to keep every run on the same thread: the
+	sync Playwright objects a handler holds only work on the thread that
+	created them.
+	"""
+	loop = asyncio.get_running_loop()
+	queue = asyncio.Queue()
+	done = object()
+
+	def pump():
+		try:
+			for item in make_iterator():
+				loop.call_soon_threadsafe(queue.put_nowait, item)
+		except Exception as e:
+			loop.call_soon_threadsafe(queue.put_nowait, e)
+		finally:
+			loop.call_soon_threadsafe(queue.put_nowait, done)
+
+	if executor is None:
+		threading.Thread(target=pump, daemon=True).start()
+	else:
+		executor.submit(pump)
+	while True:
+		item = await queue.get()
+		if item is done:
+			return
+		if isinstance(item, Exception):
+			raise item
+		yield item
@@ -0,0 +1,240 @@
+"""Get files ready for upload before the page asks for them.
+
+Handlers used to push the original file at the provider, however big, and
+then sleep. The pipeline here runs on a background thread as soon as a chat
+starts, while the page is still loading:
+
+    1. hash the file (once per path, size and mtime)
+    2. shrink it to the handler's limits (``get_upload_limits()``):
+       images larger than ``image_side`` pixels or ``image_bytes`` are scaled
+       down and re-encoded as JPEG (PNG with transparency stays PNG), videos
+       longer than ``video_seconds`` or larger than ``video_side`` are cut and
+       re-encoded to H.264 MP4
+    3. keep the result in UPLOAD_CACHE_DIR under the content hash and the
+       limits, so the same file is never processed twice
+    4. for handlers that pick the file in the browser's own file dialog
+       (xdotool), place it in UPLOAD_STAGE_DIR, the folder mounted into the
+       browser container at ``config.neko_attach_folder``
+
+Files within the limits are uploaded as they are. Image work needs Pillow
+(``pip install chat-bot-ui-handler[uploads]``) and video work needs ffmpeg
+and ffprobe on the PATH; without them, or if processing fails, the original
+file is used.
+
+Environment variables:
+    UPLOAD_PREPROCESS        - 0 to upload files untouched (default 1)
+    UPLOAD_CACHE_DIR         - processed files (default ~/.chat_bot_ui_handler/uploads)
+    UPLOAD_STAGE_DIR         - host side of the attach folder mount (default: the
+                               working directory, as the test scripts mount it)
+    UPLOAD_MAX_IMAGE_SIDE    - default 2048
+    UPLOAD_MAX_IMAGE_BYTES   - default 4 MB
+    UPLOAD_MAX_VIDEO_SECONDS - default 0, no cut
+    UPLOAD_MAX_VIDEO_SIDE    - default 1280
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from custom_logger import logger_config
+
+_IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.webp', '.bmp', '.gif', '.tif', '.tiff')
+_VIDEO_EXTENSIONS = ('.mp4', '.mov', '.mkv', '.webm', '.avi', '.m4v')
+# Optional modules already reported missing
+_missing = set()
+
+
+def _env_number(name, default):
+	try: return float(os.getenv(name) or default)
+	except Exception: return default
+
+
+def default_limits():
+	return {
+		'image_side': int(_env_number("UPLOAD_MAX_IMAGE_SIDE", 2048)),
+		'image_bytes': int(_env_number("UPLOAD_MAX_IMAGE_BYTES", 4 * 1024 * 1024)),
+		'video_seconds': _env_number("UPLOAD_MAX_VIDEO_SECONDS", 0),
+		'video_side': int(_env_number("UPLOAD_MAX_VIDEO_SIDE", 1280)),
+	}
+
+
+def _link_or_copy(src, dest):
+	partial = f"{dest}.partial-{os.getpid()}-{threading.get_ident()}"
+	try:
+		os.link(src, partial)
+	except OSError:
+		shutil.copy2(src, partial)
+	os.replace(partial, dest)
+
+
+def _shrink_image(src, dest_base, limits):
+	"""Path of a smaller copy of src, or None when it is within the limits"""
+	side, max_bytes = limits.get('image_side'), limits.get('image_bytes')
+	from PIL import Image, ImageOps
+
+	with Image.open(src) as original:
+		too_big = side and max(original.size) > side
+		too_heavy = max_bytes and os.path.getsize(src) > max_bytes
+		if not (too_big or too_heavy):
+			return None
+		alpha = original.mode in ('RGBA', 'LA') or 'transparency' in original.info
+		# The copy loses the EXIF orientation tag, so turn the pixels instead:
+		# phone photos would otherwise go up sideways.
+		image = ImageOps.exif_transpose(original)
+		if too_big:
+			image.thumbnail((side, side))
+		if alpha:
+			dest = f"{dest_base}.png"
+			image.save(dest, 'PNG', optimize=True)
+		else:
+			dest = f"{dest_base}.jpg"
+			image.convert('RGB').save(dest, 'JPEG', quality=85, optimize=True)
+	if not too_big and os.path.getsize(dest) >= os.path.getsize(src):
+		# Only over on bytes and no smaller for it, as an alpha PNG can be.
+		os.remove(dest)
+		return None
+	return dest
+
+
+def _shrink_video(src, dest_base, limits):
+	"""Path of a cut and scaled copy of src, or None when it is within the limits"""
+	seconds, side = limits.get('video_seconds'), limits.get('video_side')
+	if not shutil.which('ffmpeg') or not shutil.which('ffprobe'):
+		raise ImportError("ffmpeg and ffprobe are needed", name='ffmpeg')
+	probed = json.loads(subprocess.run(
+		['ffprobe', '-v', 'error', '-select_streams', 'v:0', '-show_entries',
+			'stream=width,height:format=duration', '-of', 'json', src],
+		capture_output=True, text=True, check=True,
+	).stdout)
+	stream = (probed.get('streams') or [{}])[0]
+	duration = float(probed.get('format', {}).get('duration') or 0)
+	too_long = seconds and duration > seconds
+	too_big = side and max(stream.get('width', 0), stream.get('height', 0)) > side
+	if not (too_long or too_big):
+		return None
+
+	dest = f"{dest_base}.mp4"
+	command = ['ffmpeg', '-y', '-v', 'error', '-i', src]
+	if too_long:
+		command += ['-t', str(seconds)]
+	if too_big:
+		# Fit the longer side, keep the aspect ratio and an even size for H.264.
+		command += ['-vf', f"scale='if(gt(iw,ih),min({side},iw),-2)':'if(gt(iw,ih),-2,min({side},ih))'"]
+	command += ['-c:v', 'libx264', '-preset', 'veryfast', '-crf', '26', '-c:a', 'aac', '-movflags', '+faststart', dest]
+	subprocess.run(command, capture_output=True, check=True)
+	return dest
+
+
+class UploadPipeline:
+	def __init__(self, cache_dir=None, stage_dir=None, workers=2):
+		self.cache_dir = cache_dir or os.getenv("UPLOAD_CACHE_DIR") or os.path.expanduser('~/.chat_bot_ui_handler/uploads')
+		self.stage_dir = stage_dir or os.getenv("UPLOAD_STAGE_DIR") or os.getcwd()
+		self.enabled = os.getenv("UPLOAD_PREPROCESS", "1") != "0"
+		self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="upload")
+		# (path, size, mtime) -> content hash, so an unchanged file is read once.
+		self._file_hashes = {}
+		self._locks = {}
+		self._lock = threading.Lock()
+
+	def file_hash(self, file_path):
+		stat = os.stat(file_path)
+		marker = (os.path.abspath(file_path), stat.st_size, stat.st_mtime_ns)
+		digest = self._file_hashes.get(marker)
+		if digest is None:
+			sha = hashlib.sha256()
+			with open(file_path, 'rb') as f:
+				for chunk in iter(lambda: f.read(1 << 20), b''):
+					sha.update(chunk)
+			digest = self._file_hashes[marker] = sha.hexdigest()
+		return digest
+
+	def _key_lock(self, key):
+		with self._lock:
+			return self._locks.setdefault(key, threading.Lock())
+
+	def process(self, file_path, limits=None):
+		"""The file to upload in place of file_path: a cached smaller copy, or file_path itself"""
+		extension = os.path.splitext(file_path)[1].lower()
+		if extension in _IMAGE_EXTENSIONS:
+			shrink = _shrink_image
+		elif extension in _VIDEO_EXTENSIONS:
+			shrink = _shrink_video
+		else:
+			return file_path
+
+		limits = limits or default_limits()
+		limits_key = hashlib.sha256(json.dumps(limits, sort_keys=True).encode('utf-8')).hexdigest()[:8]
+		base = os.path.join(self.cache_dir, f"{self.file_hash(file_path)[:32]}-{limits_key}")
+		with self._key_lock(base):
+			# An '.orig' marker records that the file needed no work.
+			for suffix in ('.jpg', '.png', '.mp4'):
+				if os.path.exists(base + suffix):
+					return base + suffix
+			if os.path.exists(f"{base}.orig"):
+				return file_path
+
+			os.makedirs(self.cache_dir, exist_ok=True)
+			partial = f"{base}.partial-{os.getpid()}"
+			try:
+				made = shrink(file_path, partial, limits)
+			except ImportError as e:
+				if e.name not in _missing:
+					_missing.add(e.name)
+					logger_config.info(f"[UploadPipeline] {e.name} is not available, uploading files it would shrink as they are")
+				return file_path
+			except Exception as e:
+				logger_config.info(f"[UploadPipeline] Uploading {file_path} as is, could not shrink it: {e}")
+				return file_path
+			if made is None:
+				open(f"{base}.orig", 'w').close()
+				return file_path
+			dest = base + os.path.splitext(made)[1]
+			os.replace(made, dest)
+			logger_config.info(
+				f"[UploadPipeline] {file_path}: {os.path.getsize(file_path)} -> {os.path.getsize(dest)} bytes"
+			)
+			return dest
+
+	def stage(self, file_path):
+		"""file_path as a path relative to the attach folder, copying it there if it is outside"""
+		stage_dir = os.path.abspath(self.stage_dir)
+		source = os.path.abspath(file_path)
+		if os.path.commonpath([source, stage_dir]) == stage_dir:
+			return os.path.relpath(source, stage_dir)
+		name = os.path.join('.uploads', f"{self.file_hash(file_path)[:32]}{os.path.splitext(file_path)[1].lower()}")
+		dest = os.path.join(stage_dir, name)
+		if not os.path.exists(dest):
+			os.makedirs(os.path.dirname(dest), exist_ok=True)
+			_link_or_copy(source, dest)
+		return name
+
+	def prepare(self, file_path, limits=None, attach_folder=False):
+		"""The path a handler should upload in place of file_path"""
+		if not file_path:
+			return file_path
+		prepared = self.process(file_path, limits) if self.enabled else file_path
+		if attach_folder and (prepared != file_path or os.path.isabs(file_path)):
+			# A relative path was already given relative to the mount.
+			prepared = self.stage(prepared)
+		return prepared
+
+	def submit(self, file_path, limits=None, attach_folder=False):
+		"""prepare() on a background thread. Returns a Future"""
+		return self.executor.submit(self.prepare, file_path, limits, attach_folder)
+
+
+_pipeline = None
+_pipeline_lock = threading.Lock()
+
+
+def get_pipeline():
+	"""The process-wide UploadPipeline"""
+	global _pipeline
+	with _pipeline_lock:
+		if _pipeline is None:
+			_pipeline = UploadPipeline()
+		return _pipeline
@@ -1,7 +1,4 @@
-import os
+from chat_bot_ui_handler.screenshots import get_writer
 
-def save_screenshot(page, name="page"):
-	folder = os.getenv("TEMP_OUTPUT", "chat_bot_ui_handler_logs")
-	if not os.path.exists(folder):
-		os.mkdir(folder)
-	page.screenshot(path=f"chat_bot_ui_handler_logs/{name}.png")
\ No newline at end of file
+def save_screenshot(page, name="page", error=False):
+	get_writer().capture(page, name, error=error)
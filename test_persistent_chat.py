@@ -1,7 +1,8 @@
-from chat_bot_ui_handler import PerplexityUIChat, GoogleAISearchChat, GeminiUIChat, MetaUIChat, GrokUIChat, CopilotUIChat, QwenUIChat, PallyUIChat, AIStudioUIChat, BingUIChat, MistralUIChat, MoonDream, BraveAISearch, DuckDuckGoAISearch
+from chat_bot_ui_handler import PerplexityUIChat, GoogleAISearchChat, GeminiUIChat, MetaUIChat, GrokUIChat, CopilotUIChat, QwenUIChat, PallyUIChat, AIStudioUIChat, BingUIChat, MistralUIChat, MoonDream, BraveAISearch, DuckDuckGoAISearch, load_env
 from browser_manager.browser_manager import BrowserConfig
 import os
 
+load_env()
 source = QwenUIChat
 config = BrowserConfig()
 # search works without login : GoogleAISearchChat, QwenUIChat
@@ -0,0 +1,162 @@
+import pytest
+
+pytest.importorskip('custom_logger')
+
+from chat_bot_ui_handler import asset_cache
+from chat_bot_ui_handler.asset_cache import AssetCache, freshness, storable
+
+NOW = 1_700_000_000.0
+
+
+@pytest.mark.parametrize('headers, seconds', [
+	({'cache-control': 'public, max-age=3600'}, 3600),
+	({'cache-control': 's-maxage=60, max-age=3600'}, 60),
+	({'cache-control': 'max-age=3600, no-cache'}, 0),
+	({'cache-control': 'max-age=soon'}, 0),
+	({'expires': 'Tue, 14 Nov 2023 22:14:20 GMT', 'date': 'Tue, 14 Nov 2023 22:13:20 GMT'}, 60),
+	({'last-modified': 'Tue, 14 Nov 2023 12:13:20 GMT'}, 3600),
+	({}, 0),
+])
+def test_freshness(headers, seconds):
+	assert freshness(headers, now=NOW) == pytest.approx(seconds)
+
+
+@pytest.mark.parametrize('status, headers, keep', [
+	(200, {'cache-control': 'max-age=60'}, True),
+	(200, {'etag': '"v1"'}, True),
+	(200, {'cache-control': 'no-cache', 'last-modified': 'Tue, 14 Nov 2023 12:13:20 GMT'}, True),
+	(200, {'cache-control': 'max-age=60', 'vary': 'Accept-Encoding'}, True),
+	(200, {'cache-control': 'max-age=60', 'vary': 'Accept-Encoding, Cookie'}, False),
+	(200, {'cache-control': 'no-store', 'etag': '"v1"'}, False),
+	(200, {'cache-control': 'private, max-age=60'}, False),
+	(200, {}, False),
+	(206, {'cache-control': 'max-age=60'}, False),
+	(404, {'cache-control': 'max-age=60'}, False),
+])
+def test_storable(status, headers, keep):
+	assert storable(status, headers) is keep
+
+
+class Request:
+	def __init__(self, url, resource_type='script', method='GET'):
+		self.url = url
+		self.resource_type = resource_type
+		self.method = method
+		self.headers = {}
+
+
+class Response:
+	def __init__(self, status=200, headers=None, body=b''):
+		self.status = status
+		self.headers = headers or {}
+		self._body = body
+
+	def body(self):
+		return self._body
+
+
+class Route:
+	"""Records what the cache did with one request"""
+
+	def __init__(self, request, response=None, error=None):
+		self.request = request
+		self.response = response
+		self.error = error
+		self.fetched = []
+		self.action = None
+
+	def fetch(self, headers=None):
+		self.fetched.append(headers)
+		if self.error:
+			raise self.error
+		return self.response
+
+	def fulfill(self, **kwargs):
+		self.action = ('fulfill', kwargs)
+
+	def fallback(self):
+		self.action = ('fallback', None)
+
+
+URL = 'https://chat.example.com/app.js'
+
+
+@pytest.fixture
+def cache(tmp_path):
+	return AssetCache(folder=str(tmp_path))
+
+
+def served_body(route):
+	kind, kwargs = route.action
+	assert kind == 'fulfill'
+	if 'path' in kwargs:
+		with open(kwargs['path'], 'rb') as f:
+			return f.read()
+	return kwargs['body']
+
+
+def test_miss_stores_then_fresh_hit_skips_the_network(cache):
+	route = Route(Request(URL), Response(headers={'cache-control': 'max-age=3600', 'content-length': '7'}, body=b'app();\n'))
+	cache._handle(route)
+	assert served_body(route) == b'app();\n'
+
+	route = Route(Request(URL))
+	cache._handle(route)
+	assert route.fetched == []
+	assert served_body(route) == b'app();\n'
+	assert 'content-length' not in route.action[1]['headers']
+	assert cache.stats() == {'hits': 1, 'revalidated': 0, 'stale': 0, 'misses': 1}
+
+
+def test_stale_copy_is_revalidated(cache):
+	cache.store(URL, {'etag': '"v1"', 'cache-control': 'no-cache'}, b'v1')
+	route = Route(Request(URL), Response(status=304, headers={'cache-control': 'max-age=60'}))
+	cache._handle(route)
+	assert route.fetched[0]['if-none-match'] == '"v1"'
+	assert served_body(route) == b'v1'
+	assert cache.lookup(URL)[2] is True
+	assert cache.revalidated == 1
+
+
+def test_stale_copy_is_served_when_revalidation_fails(cache):
+	cache.store(URL, {'etag': '"v1"', 'cache-control': 'no-cache'}, b'v1')
+	route = Route(Request(URL), error=ConnectionError("offline"))
+	cache._handle(route)
+	assert served_body(route) == b'v1'
+	assert cache.stale == 1
+
+
+def test_private_answers_are_not_stored(cache):
+	route = Route(Request(URL), Response(headers={'cache-control': 'private, max-age=3600'}, body=b'mine'))
+	cache._handle(route)
+	assert served_body(route) == b'mine'
+	assert cache.lookup(URL) is None
+
+
+@pytest.mark.parametrize('request_', [
+	Request(URL, method='POST'),
+	Request(URL, resource_type='document'),
+	Request('data:text/javascript,1'),
+])
+def test_other_requests_are_passed_on(cache, request_):
+	route = Route(request_)
+	cache._handle(route)
+	assert route.action == ('fallback', None)
+	assert route.fetched == []
+
+
+def test_failed_fetch_is_passed_on(cache):
+	route = Route(Request(URL), error=ConnectionError("offline"))
+	cache._handle(route)
+	assert route.action == ('fallback', None)
+
+
+def test_least_recently_used_assets_are_evicted(cache, monkeypatch):
+	cache.max_bytes = 10
+	monkeypatch.setattr(asset_cache.time, 'time', lambda: NOW)
+	cache.store('https://chat.example.com/a.js', {'etag': '"a"'}, b'a' * 6)
+	monkeypatch.setattr(asset_cache.time, 'time', lambda: NOW + 1)
+	cache.store('https://chat.example.com/b.js', {'etag': '"b"'}, b'b' * 6)
+	cache.evict()
+	assert cache.lookup('https://chat.example.com/a.js') is None
+	assert cache.lookup('https://chat.example.com/b.js') is not None
@@ -0,0 +1,87 @@
+import json
+from concurrent.futures import Future
+
+import pytest
+
+from chat_bot_ui_handler import batch
+
+
+def write_lines(path, lines):
+	path.write_text("".join(line + "\n" for line in lines), encoding='utf-8')
+	return str(path)
+
+
+def test_read_rows_skips_blank_lines_and_names_bad_ones(tmp_path):
+	path = write_lines(tmp_path / 'in.jsonl', ['{"prompt": "a"}', '', '{"id": "x", "prompt": "b"}'])
+	rows = list(batch.read_rows(path))
+	assert rows == [(1, {'prompt': 'a'}), (3, {'id': 'x', 'prompt': 'b'})]
+	assert [batch.row_id(row, line) for line, row in rows] == ['1', 'x']
+
+	bad = write_lines(tmp_path / 'bad.jsonl', ['{"prompt": "a"}', '{"prompt": '])
+	with pytest.raises(ValueError, match=r"bad.jsonl:2"):
+		list(batch.read_rows(bad))
+
+
+def test_finished_ids_takes_the_newest_line_per_id(tmp_path):
+	path = write_lines(tmp_path / 'out.jsonl', [
+		'{"id": "a", "ok": true}',
+		'{"id": "b", "ok": false}',
+		'{"id": 3, "ok": true}',
+		'{"id": "c", "ok": true}',
+		'{"id": "c", "ok": false}',
+		'{"id": "b", "ok": true}',
+		'{"id": "d", "ok": tr',
+	])
+	assert batch.finished_ids(path) == {'a', 'b', '3'}
+	assert batch.finished_ids(str(tmp_path / 'missing.jsonl')) == set()
+
+
+class StubScheduler:
+	asked = []
+
+	def __init__(self, workers, fresh=False):
+		pass
+
+	def submit(self, handler_cls, prompt, system_prompt=None, file_path=None, deadline=None):
+		StubScheduler.asked.append(prompt)
+		future = Future()
+		if prompt == 'fail':
+			future.set_result(None)
+		else:
+			future.set_result(prompt.upper())
+		return future
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *exc):
+		pass
+
+
+def test_resume_only_asks_rows_without_an_answer(tmp_path, monkeypatch):
+	pytest.importorskip('browser_manager')
+	pytest.importorskip('custom_logger')
+	from chat_bot_ui_handler import env, registry, scheduler
+
+	monkeypatch.setattr(env, 'load_env', lambda: None)
+	monkeypatch.setattr(registry, 'get_handler', lambda name: object)
+	monkeypatch.setattr(scheduler, 'ChatScheduler', StubScheduler)
+	StubScheduler.asked = []
+
+	source = write_lines(tmp_path / 'in.jsonl', [
+		'{"id": "a", "prompt": "done already"}',
+		'{"id": "b", "prompt": "fail"}',
+		'{"id": "c", "prompt": "new"}',
+		'{"id": "d"}',
+	])
+	output = write_lines(tmp_path / 'out.jsonl', ['{"id": "a", "ok": true, "answer": "DONE ALREADY"}'])
+	code = batch.main([source, '-o', output, '--handler', 'stub'])
+	assert code == 1
+	assert StubScheduler.asked == ['fail', 'new']
+
+	with open(output, encoding='utf-8') as f:
+		rows = {row['id']: row for row in map(json.loads, f)}
+	assert rows['c']['answer'] == 'NEW' and rows['c']['ok']
+	assert rows['b']['error'] == "no answer"
+	assert rows['d']['error'] == "no prompt"
+	assert batch.finished_ids(output) == {'a', 'c'}
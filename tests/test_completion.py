@@ -0,0 +1,56 @@
+import pytest
+
+from chat_bot_ui_handler.completion import LatencyTracker
+
+
+@pytest.fixture(autouse=True)
+def bounds(monkeypatch):
+	monkeypatch.setenv('GENERATION_TIMEOUT', '600')
+	monkeypatch.setenv('GENERATION_MIN_TIMEOUT', '60')
+
+
+def test_ceiling_until_three_samples():
+	tracker = LatencyTracker()
+	assert tracker.timeout_for('gemini') == 600
+	tracker.record('gemini', 10)
+	tracker.record('gemini', 10)
+	assert tracker.timeout_for('gemini') == 600
+
+
+def test_fast_provider_gets_the_floor():
+	tracker = LatencyTracker()
+	for _ in range(5):
+		tracker.record('qwen', 5)
+	assert tracker.timeout_for('qwen') == 60
+	assert tracker.timeout_for('meta') == 600
+
+
+def test_timeout_grows_after_a_wait_that_timed_out():
+	tracker = LatencyTracker()
+	for _ in range(3):
+		tracker.record('gemini', 20)
+	assert tracker.timeout_for('gemini') == 60
+	# A wait that ran out at 60s must not be given the same 60s again.
+	tracker.record('gemini', 60)
+	assert tracker.timeout_for('gemini') == 180
+	tracker.record('gemini', 180)
+	assert tracker.timeout_for('gemini') == 540
+	tracker.record('gemini', 540)
+	assert tracker.timeout_for('gemini') == 600
+
+
+def test_old_samples_fall_out():
+	tracker = LatencyTracker(samples=3)
+	tracker.record('gemini', 500)
+	for _ in range(3):
+		tracker.record('gemini', 10)
+	assert tracker.timeout_for('gemini') == 60
+
+
+def test_a_handler_ceiling_replaces_the_global_one():
+	tracker = LatencyTracker()
+	assert tracker.timeout_for('gemini', 300) == 300
+	for _ in range(3):
+		tracker.record('gemini', 200)
+	assert tracker.timeout_for('gemini', 300) == 300
+	assert tracker.timeout_for('gemini') == 600
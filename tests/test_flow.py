@@ -0,0 +1,122 @@
+import threading
+import time
+
+import pytest
+
+from chat_bot_ui_handler.flow import Step, check_steps, critical_path, run_steps
+
+
+def test_run_steps_passes_results_in_dependency_order():
+	seen = []
+
+	def step(name, value):
+		def run(done):
+			seen.append((name, dict(done)))
+			return value
+		return run
+
+	steps = [
+		Step('send', step('send', 3), after=['fill']),
+		Step('load', step('load', 1)),
+		Step('fill', step('fill', 2), after=['load']),
+	]
+	assert run_steps(steps) == {'load': 1, 'fill': 2, 'send': 3}
+	assert [name for name, _ in seen] == ['load', 'fill', 'send']
+	assert seen[-1][1] == {'load': 1, 'fill': 2}
+
+
+def test_off_page_steps_run_alongside_page_steps():
+	page_thread = threading.get_ident()
+	threads = {}
+	started = threading.Event()
+
+	def off_page(done):
+		threads['stage'] = threading.get_ident()
+		started.set()
+		time.sleep(0.05)
+		return 'staged'
+
+	def on_page(done):
+		threads['load'] = threading.get_ident()
+		# Only passes if the off-page step is already running.
+		assert started.wait(1)
+		return 'loaded'
+
+	results = run_steps([
+		Step('stage', off_page, page=False),
+		Step('load', on_page),
+		Step('upload', lambda done: done['stage'] + '+' + done['load'], after=['stage', 'load']),
+	])
+	assert results['upload'] == 'staged+loaded'
+	assert threads['load'] == page_thread
+	assert threads['stage'] != page_thread
+
+
+def test_first_failure_stops_the_run():
+	ran = []
+
+	def fail(done):
+		raise RuntimeError("boom")
+
+	with pytest.raises(RuntimeError, match="boom"):
+		run_steps([
+			Step('load', fail),
+			Step('login', lambda done: ran.append('login'), after=['load']),
+		])
+	assert ran == []
+
+
+def test_timed_wraps_every_step():
+	timed = []
+
+	class Timed:
+		def __init__(self, name):
+			self.name = name
+
+		def __enter__(self):
+			timed.append(self.name)
+
+		def __exit__(self, *exc):
+			return False
+
+	run_steps([Step('a', lambda done: 1), Step('b', lambda done: 2, page=False)], timed=Timed)
+	assert sorted(timed) == ['a', 'b']
+
+
+@pytest.mark.parametrize('steps, message', [
+	([Step('a', None), Step('a', None)], "Duplicate"),
+	([Step('a', None, after=['b'])], "unknown"),
+	([Step('a', None, after=['b']), Step('b', None, after=['a'])], "wait for each other"),
+])
+def test_check_steps_rejects_bad_graphs(steps, message):
+	with pytest.raises(ValueError, match=message):
+		check_steps(steps)
+
+
+def test_critical_path_follows_the_step_that_finished_last():
+	steps = [
+		Step('stage', None, page=False),
+		Step('load', None),
+		Step('upload', None, after=['load', 'stage']),
+	]
+	spans = {'stage': (0.0, 5.0), 'load': (0.0, 2.0), 'upload': (5.0, 6.0)}
+	assert critical_path(steps, spans) == ['stage', 'upload']
+	spans['stage'] = (0.0, 1.0)
+	spans['upload'] = (2.0, 3.0)
+	assert critical_path(steps, spans) == ['load', 'upload']
+
+
+def test_critical_path_chains_page_steps_run_one_after_another():
+	# Neither waits for the other, but both need the page thread.
+	steps = [Step('a', None), Step('b', None), Step('c', None, page=False)]
+	spans = {'a': (0.0, 2.0), 'b': (2.0, 4.0), 'c': (0.0, 3.0)}
+	assert critical_path(steps, spans) == ['a', 'b']
+
+
+def test_run_steps_fills_spans():
+	spans = {}
+	steps = [Step('a', lambda done: time.sleep(0.01)), Step('b', lambda done: None, after=['a'])]
+	run_steps(steps, spans=spans)
+	assert set(spans) == {'a', 'b'}
+	assert spans['a'][0] <= spans['a'][1] <= spans['b'][0] <= spans['b'][1]
+	assert critical_path(steps, spans) == ['a', 'b']
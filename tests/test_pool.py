@@ -0,0 +1,153 @@
+import pytest
+
+pytest.importorskip('browser_manager')
+pytest.importorskip('custom_logger')
+
+from chat_bot_ui_handler.pool import HandlerPool
+
+
+class Visible:
+	def __init__(self, page):
+		self.page = page
+
+	@property
+	def first(self):
+		return self
+
+	def is_visible(self):
+		return self.page.input_visible
+
+
+class Page:
+	def __init__(self, number):
+		self.number = number
+		self.closed = False
+		self.input_visible = True
+		self.resets = 0
+
+	def locator(self, selector):
+		return Visible(self)
+
+	def is_closed(self):
+		return self.closed
+
+	def close(self):
+		self.closed = True
+
+
+class Logger:
+	def info(self, message):
+		pass
+
+	error = debug = info
+
+
+class StubChat:
+	def __init__(self, config=None):
+		self.opened = []
+		self.logger = Logger()
+		self.cleaned_up = False
+
+	def get_browser_manager(self):
+		return self
+
+	def get_fresh_page(self):
+		page = Page(len(self.opened))
+		self.opened.append(page)
+		return page
+
+	def prepare(self, page):
+		pass
+
+	def load_url(self, page):
+		page.resets += 1
+
+	def login(self, page):
+		pass
+
+	def get_selectors(self):
+		return {'input': 'textarea'}
+
+	def process(self, page, user_prompt, system_prompt, file_path, prepared=False):
+		assert prepared
+		return None if user_prompt == 'fail' else f"{user_prompt} on page {page.number}"
+
+	def cleanup(self):
+		self.cleaned_up = True
+
+
+@pytest.fixture
+def pool():
+	pool = HandlerPool([StubChat], size=2, max_age=3600, max_uses=2, config_factory=lambda cls: None)
+	yield pool
+	pool.close()
+
+
+def handler(pool):
+	return pool.handlers[StubChat]
+
+
+def test_warm_fills_the_pool(pool):
+	pool.warm()
+	assert pool.stats() == {'StubChat': {'idle': 2, 'used': 0, 'busy': 0}}
+	pool.warm()
+	assert len(handler(pool).opened) == 2
+
+
+def test_checkin_does_no_page_work_and_warm_resets(pool):
+	pool.warm()
+	pooled = pool.checkout(StubChat)
+	assert pool.stats()['StubChat'] == {'idle': 1, 'used': 0, 'busy': 1}
+	pool.checkin(pooled)
+	assert pooled.page.resets == 0
+	assert pool.stats()['StubChat'] == {'idle': 1, 'used': 1, 'busy': 0}
+
+	pool.warm()
+	assert pooled.page.resets == 1
+	assert pool.stats()['StubChat'] == {'idle': 2, 'used': 0, 'busy': 0}
+
+
+def test_pages_are_recycled_after_max_uses_or_failure(pool):
+	pool.warm()
+	pooled = pool.checkout(StubChat)
+	pool.checkin(pooled)
+	pool.warm()
+	# The idle page that was never used comes first.
+	other = pool.checkout(StubChat)
+	assert other is not pooled
+	pool.checkin(other, healthy=False)
+	assert other.page.closed
+
+	again = pool.checkout(StubChat)
+	assert again is pooled and again.uses == 2
+	pool.checkin(again)
+	assert again.page.closed
+	assert pool.stats()['StubChat'] == {'idle': 0, 'used': 0, 'busy': 0}
+
+
+def test_checkout_skips_unhealthy_pages_and_opens_on_demand(pool):
+	pool.warm()
+	first, second = [pooled.page for pooled in pool.idle[StubChat]]
+	first.input_visible = False
+	second.closed = True
+	pooled = pool.checkout(StubChat)
+	assert pooled.page.number == 2
+	assert first.closed
+
+
+def test_chat_returns_the_answer_or_none(pool):
+	pool.warm()
+	assert pool.chat(StubChat, "Hello") == "Hello on page 0"
+	assert pool.chat(StubChat, "fail") is None
+	# The failed chat's page is closed, not kept for reuse.
+	assert [pooled.page.number for pooled in pool.used[StubChat]] == [0]
+
+
+def test_unknown_handler_and_close(pool):
+	with pytest.raises(KeyError):
+		pool.checkout(object)
+	pool.warm()
+	pages = list(handler(pool).opened)
+	pool.close()
+	assert all(page.closed for page in pages)
+	assert handler(pool).cleaned_up
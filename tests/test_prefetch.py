@@ -0,0 +1,114 @@
+import pytest
+
+pytest.importorskip('browser_manager')
+pytest.importorskip('custom_logger')
+
+from chat_bot_ui_handler import base_ui_flow
+from chat_bot_ui_handler.base_ui_flow import BaseUIChat
+
+
+class Keyboard:
+	def press(self, key):
+		pass
+
+
+class Page:
+	def __init__(self, number):
+		self.number = number
+		self.closed = False
+		self.visited = []
+		self.keyboard = Keyboard()
+
+	def on(self, event, callback):
+		pass
+
+	def route(self, pattern, handler):
+		pass
+
+	def goto(self, url, wait_until=None):
+		self.visited.append(url)
+
+	def wait_for_timeout(self, ms):
+		pass
+
+	def is_closed(self):
+		return self.closed
+
+	def close(self):
+		self.closed = True
+
+
+class Manager:
+	def __init__(self):
+		self.pages = []
+
+	def get_fresh_page(self):
+		page = Page(len(self.pages))
+		self.pages.append(page)
+		return page
+
+	def stop(self):
+		pass
+
+
+class StubChat(BaseUIChat):
+	def get_docker_name(self):
+		return 'stub'
+
+	def get_url(self):
+		return 'https://chat.example.com/'
+
+	def get_selectors(self):
+		return {'input': 'textarea', 'send_button': 'button', 'result': '.answer'}
+
+	def login(self, page):
+		page.logged_in = True
+
+	def save_screenshot(self, page, error=False):
+		pass
+
+	def process(self, page, user_prompt, system_prompt, file_path, prepared=False):
+		self.processed.append((page, prepared))
+		return f"answer on page {page.number}"
+
+
+@pytest.fixture
+def handler(monkeypatch):
+	monkeypatch.setenv('PREFETCH_PAGES', '1')
+	monkeypatch.setenv('ASSET_CACHE', 'off')
+	monkeypatch.setattr(base_ui_flow, 'load_env', lambda: None)
+	monkeypatch.setattr(base_ui_flow, 'shared_cache', lambda: None)
+	chat = StubChat()
+	chat.browser_manager = Manager()
+	chat.processed = []
+	return chat
+
+
+def test_chat_fresh_uses_the_prefetched_page(handler):
+	handler.prefetch()
+	page, = handler.browser_manager.pages
+	# Taken all the way to the prompt box while idle.
+	assert page.visited == ['https://chat.example.com/']
+	assert page.logged_in
+
+	assert handler.chat_fresh("Hello") == "answer on page 0"
+	assert handler.processed == [(page, True)]
+
+	# Nothing left in reserve: the next chat sets up its own page.
+	assert handler.chat_fresh("Again") == "answer on page 1"
+	assert handler.processed[-1] == (handler.browser_manager.pages[1], False)
+
+
+def test_prefetch_stops_when_no_longer_idle(handler):
+	handler.prefetch(idle=lambda: False)
+	assert handler.browser_manager.pages == []
+
+
+def test_old_prefetched_pages_are_replaced(handler):
+	handler.prefetch()
+	handler.prefetch_max_age = 0
+	handler.prefetch()
+	old, new = handler.browser_manager.pages
+	assert old.closed
+	assert handler.take_prefetched() is None
+	assert new.closed
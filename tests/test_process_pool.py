@@ -0,0 +1,69 @@
+import os
+
+import pytest
+
+pytest.importorskip('browser_manager')
+pytest.importorskip('custom_logger')
+
+import browser_manager.browser_config
+
+from chat_bot_ui_handler import process_pool
+from chat_bot_ui_handler.profiles import ProfileTemplates, ensure_template
+
+
+class Config:
+	def __init__(self):
+		self.docker_name = 'chat'
+		self.user_data_dir = None
+		self.debug_port = 9222
+		self.vnc_port = 5900
+		self.unset_port = None
+		self.headless_port = True
+		self.timeout = 30
+
+
+class StubChat:
+	pass
+
+
+@pytest.fixture
+def templates_dir(tmp_path, monkeypatch):
+	monkeypatch.setenv('PROFILE_TEMPLATE_DIR', str(tmp_path / 'templates'))
+	monkeypatch.setattr(browser_manager.browser_config, 'BrowserConfig', Config)
+	source = tmp_path / 'profile'
+	source.mkdir()
+	(source / 'Cookies').write_text('signed in')
+	return source
+
+
+def test_offset_ports_moves_only_port_numbers():
+	config = Config()
+	process_pool._offset_ports(config, 20)
+	assert (config.debug_port, config.vnc_port) == (9242, 5920)
+	assert config.unset_port is None
+	assert config.headless_port is True
+	assert config.timeout == 30
+
+
+def test_default_process_config_shifts_ports_per_worker(templates_dir, monkeypatch):
+	monkeypatch.setenv('PROCESS_POOL_PORT_STRIDE', '10')
+	snapshot = ensure_template(StubChat, str(templates_dir))
+	configs = [process_pool.default_process_config(StubChat, index, snapshot) for index in range(3)]
+	assert [config.debug_port for config in configs] == [9222, 9232, 9242]
+	assert [config.docker_name for config in configs] == ['chat_p0', 'chat_p1', 'chat_p2']
+	assert len({config.user_data_dir for config in configs}) == 3
+	for config in configs:
+		with open(os.path.join(config.user_data_dir, 'Cookies')) as f:
+			assert f.read() == 'signed in'
+
+
+def test_workers_clone_the_parents_snapshot_without_taking_one(templates_dir):
+	snapshot = ensure_template(StubChat, str(templates_dir))
+	process_pool.default_process_config(StubChat, 1, snapshot)
+	process_pool.default_process_config(StubChat, 2)
+	assert ProfileTemplates().snapshots('stubchat') == [snapshot]
+
+
+def test_workers_need_a_snapshot(templates_dir):
+	with pytest.raises(FileNotFoundError):
+		process_pool.default_process_config(StubChat, 1)
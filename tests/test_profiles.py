@@ -0,0 +1,113 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+pytest.importorskip('custom_logger')
+
+from chat_bot_ui_handler import profiles
+from chat_bot_ui_handler.profiles import ProfileTemplates
+
+
+@pytest.fixture
+def source(tmp_path):
+	profile = tmp_path / 'profile'
+	(profile / 'Default' / 'Cache').mkdir(parents=True)
+	(profile / 'Default' / 'Cache' / 'data_0').write_text('cache')
+	(profile / 'Default' / 'Cookies').write_text('signed in')
+	(profile / 'SingletonLock').write_text('lock')
+	return str(profile)
+
+
+@pytest.fixture
+def templates(tmp_path, monkeypatch):
+	monkeypatch.delenv('PROFILE_TEMPLATE_KEEP', raising=False)
+	monkeypatch.delenv('PROFILE_CLONE_MAX_AGE', raising=False)
+	return ProfileTemplates(str(tmp_path / 'store'))
+
+
+def dead_pid():
+	process = subprocess.Popen([sys.executable, '-c', 'pass'])
+	process.wait()
+	return process.pid
+
+
+def own(folder, pid):
+	meta_path = os.path.join(folder, profiles._META)
+	with open(meta_path) as f:
+		meta = json.load(f)
+	meta['pid'] = pid
+	with open(meta_path, 'w') as f:
+		json.dump(meta, f)
+
+
+def test_snapshot_and_clone_leave_out_locks_and_caches(templates, source):
+	snapshot = templates.snapshot('chat', source)
+	clone = templates.clone('chat', 'w1')
+	for folder in (snapshot, clone):
+		with open(os.path.join(folder, 'Default', 'Cookies')) as f:
+			assert f.read() == 'signed in'
+		assert not os.path.exists(os.path.join(folder, 'SingletonLock'))
+		assert not os.path.exists(os.path.join(folder, 'Default', 'Cache'))
+
+
+def test_clone_is_reused_until_a_newer_snapshot(templates, source, monkeypatch):
+	first = templates.snapshot('chat', source)
+	clone = templates.clone('chat', 'w1')
+	with open(os.path.join(clone, 'Default', 'History'), 'w') as f:
+		f.write('browsed')
+	assert templates.clone('chat', 'w1') == clone
+	assert os.path.exists(os.path.join(clone, 'Default', 'History'))
+
+	monkeypatch.setattr(profiles.time, 'strftime', lambda fmt: '99990101-000000')
+	second = templates.snapshot('chat', source)
+	assert templates.latest('chat') == second != first
+	assert templates.clone('chat', 'w1') == clone
+	assert not os.path.exists(os.path.join(clone, 'Default', 'History'))
+
+
+def test_clone_in_use_by_another_process_is_refused(templates, source):
+	templates.snapshot('chat', source)
+	clone = templates.clone('chat', 'w1')
+	own(clone, os.getppid())
+	with pytest.raises(RuntimeError, match="in use"):
+		templates.clone('chat', 'w1')
+	own(clone, dead_pid())
+	assert templates.clone('chat', 'w1') == clone
+
+
+def test_clone_needs_a_snapshot(templates):
+	with pytest.raises(FileNotFoundError):
+		templates.clone('chat', 'w1')
+
+
+def test_gc_keeps_owned_clones_and_the_snapshots_they_use(templates, source, monkeypatch):
+	templates.keep = 1
+	stamps = iter(['20240101-000000', '20240102-000000', '20240103-000000'])
+	monkeypatch.setattr(profiles.time, 'strftime', lambda fmt: next(stamps))
+	oldest = templates.snapshot('chat', source)
+	owned = templates.clone('chat', 'w1')
+	middle = templates.snapshot('chat', source)
+	orphan = templates.clone('chat', 'w2', snapshot=middle)
+	own(orphan, dead_pid())
+	newest = templates.snapshot('chat', source)
+	partial = os.path.join(templates.root, 'clones', 'chat', 'w3.partial-1')
+	os.makedirs(partial)
+
+	removed = templates.gc()
+	# w1 belongs to this live process, so its snapshot stays; w2's owner is gone
+	# and its snapshot is not the newest.
+	assert sorted(removed) == sorted([orphan, partial, middle])
+	assert templates.snapshots('chat') == [oldest, newest]
+	assert os.path.isdir(owned)
+
+
+def test_gc_removes_clones_unused_for_too_long(templates, source):
+	templates.snapshot('chat', source)
+	clone = templates.clone('chat', 'w1')
+	own(clone, dead_pid())
+	assert templates.gc() == []
+	templates.clone_max_age = -1
+	assert templates.gc() == [clone]
@@ -0,0 +1,59 @@
+import pytest
+
+from chat_bot_ui_handler.resources import ResourcePolicy, resource_policy
+
+
+@pytest.mark.parametrize('url', [
+	'https://www.google-analytics.com/g/collect?v=2',
+	'https://googletagmanager.com/gtag/js',
+	'https://connect.facebook.net/en_US/fbevents.js',
+	'https://www.facebook.com/tr?id=1',
+	'https://play.google.com/log?format=json',
+	'https://o123.ingest.sentry.io/api/1/envelope/',
+])
+def test_trackers_are_blocked(url):
+	assert ResourcePolicy('trackers').blocks(url, 'script') == 'tracker'
+
+
+@pytest.mark.parametrize('url', [
+	'https://gemini.google.com/app',
+	'https://notsentry.io/app.js',
+	'https://example.com/?next=https://google-analytics.com/',
+	'https://play.google.com/store',
+])
+def test_other_requests_pass(url):
+	assert ResourcePolicy('trackers').blocks(url, 'script') is None
+
+
+def test_lean_blocks_heavy_types_only():
+	policy = ResourcePolicy('lean')
+	assert policy.blocks('https://chat.qwen.ai/logo.png', 'image') == 'image'
+	assert policy.blocks('https://chat.qwen.ai/font.woff2', 'font') == 'font'
+	assert policy.blocks('https://chat.qwen.ai/app.css', 'stylesheet') is None
+	assert ResourcePolicy('text').blocks('https://chat.qwen.ai/app.css', 'stylesheet') == 'stylesheet'
+
+
+def test_google_sign_in_is_never_blocked():
+	policy = ResourcePolicy('text')
+	assert policy.blocks('https://accounts.google.com/logo.png', 'image') is None
+	assert policy.blocks('https://www.google-analytics.com/analytics.js', 'script', 'https://accounts.google.com/signin') is None
+
+
+def test_off_blocks_nothing():
+	policy = ResourcePolicy('off')
+	assert policy.blocks('https://www.google-analytics.com/analytics.js', 'script') is None
+	assert policy._route_pattern() is None
+
+
+def test_resource_policy_reads_the_environment(monkeypatch):
+	monkeypatch.delenv('RESOURCE_PROFILE', raising=False)
+	monkeypatch.delenv('RESOURCE_STRIP_STYLES', raising=False)
+	assert resource_policy().name == 'trackers'
+	assert resource_policy('lean').name == 'lean'
+	monkeypatch.setenv('RESOURCE_STRIP_STYLES', '1')
+	assert resource_policy('lean').name == 'text'
+	monkeypatch.setenv('RESOURCE_PROFILE', 'off')
+	assert resource_policy('lean').name == 'off'
+	monkeypatch.setenv('RESOURCE_PROFILE', 'nothing')
+	with pytest.raises(ValueError, match="Unknown resource profile"):
+		resource_policy()
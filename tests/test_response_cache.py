@@ -0,0 +1,82 @@
+import itertools
+
+import pytest
+
+pytest.importorskip('custom_logger')
+
+from chat_bot_ui_handler import response_cache
+from chat_bot_ui_handler.response_cache import MemoryBackend, ResponseCache, SQLiteBackend
+
+
+@pytest.fixture
+def clock(monkeypatch):
+	"""A time.time() that moves one second per call, or by hand"""
+	now = {'t': 1000.0}
+	ticks = itertools.count()
+
+	def fake_time():
+		return now['t'] + next(ticks)
+	monkeypatch.setattr(response_cache.time, 'time', fake_time)
+	return now
+
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def make_backend(request, tmp_path):
+	def make(**kwargs):
+		if request.param == 'memory':
+			return MemoryBackend(**kwargs)
+		return SQLiteBackend(str(tmp_path / 'answers.db'), **kwargs)
+	return make
+
+
+def test_put_and_get(make_backend):
+	backend = make_backend()
+	assert backend.get('k') is None
+	backend.put('k', 'answer')
+	assert backend.get('k') == 'answer'
+	assert len(backend) == 1
+	backend.clear()
+	assert len(backend) == 0
+
+
+def test_entries_expire(make_backend, clock):
+	backend = make_backend(ttl=100)
+	backend.put('k', 'answer')
+	assert backend.get('k') == 'answer'
+	clock['t'] += 200
+	assert backend.get('k') is None
+
+
+def test_least_recently_used_is_evicted(make_backend, clock):
+	backend = make_backend(max_entries=2)
+	backend.put('a', '1')
+	backend.put('b', '2')
+	assert backend.get('a') == '1'
+	backend.put('c', '3')
+	assert backend.get('b') is None
+	assert backend.get('a') == '1'
+	assert backend.get('c') == '3'
+
+
+def test_files_are_keyed_by_content(tmp_path):
+	cache = ResponseCache()
+	first = tmp_path / 'a.png'
+	second = tmp_path / 'b.png'
+	first.write_bytes(b'same')
+	second.write_bytes(b'same')
+	key = cache.key('gemini', 'caption', None, str(first))
+	assert cache.key('gemini', 'caption', None, str(second)) == key
+	assert cache.key('qwen', 'caption', None, str(first)) != key
+	assert cache.key('gemini', 'caption', 'be brief', str(first)) != key
+
+	second.write_bytes(b'different bytes')
+	assert cache.key('gemini', 'caption', None, str(second)) != key
+
+
+def test_counts_hits_and_skips_empty_answers():
+	cache = ResponseCache()
+	cache.put('k', None)
+	assert cache.get('k') is None
+	cache.put('k', 'answer')
+	assert cache.get('k') == 'answer'
+	assert cache.stats() == {'hits': 1, 'misses': 1, 'entries': 1}
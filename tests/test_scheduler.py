@@ -0,0 +1,103 @@
+import threading
+
+import pytest
+
+pytest.importorskip('browser_manager')
+pytest.importorskip('custom_logger')
+
+from chat_bot_ui_handler.scheduler import ChatScheduler, RateLimiter
+
+
+class StubChat:
+	"""Answers with its prompt; a prompt of 'block' waits until released or cancelled"""
+
+	release = None
+	asked = None
+
+	def __init__(self, config):
+		self.cancel_event = threading.Event()
+
+	def chat(self, user_prompt, system_prompt=None, file_path=None):
+		if user_prompt == 'block':
+			StubChat.release.wait(5)
+			return 'released'
+		if user_prompt == 'hang':
+			self.cancel_event.wait(5)
+			# As chat() does: a cancelled chat returns None.
+			return None
+		StubChat.asked.append(user_prompt)
+		return user_prompt.upper()
+
+	def chat_stream(self, user_prompt, system_prompt=None, file_path=None, fresh=False):
+		yield 'hel'
+		yield 'lo'
+		return 'Hello.'
+
+	def cleanup(self):
+		pass
+
+
+@pytest.fixture
+def scheduler():
+	StubChat.release = threading.Event()
+	StubChat.asked = []
+	scheduler = ChatScheduler({StubChat: 1}, config_factory=lambda handler_cls, index: None)
+	yield scheduler
+	StubChat.release.set()
+	scheduler.shutdown()
+
+
+def test_lower_priority_runs_first_then_submission_order(scheduler):
+	blocker = scheduler.submit(StubChat, 'block')
+	futures = [
+		scheduler.submit(StubChat, 'late', priority=5),
+		scheduler.submit(StubChat, 'first', priority=0),
+		scheduler.submit(StubChat, 'second', priority=0),
+		scheduler.submit(StubChat, 'urgent', priority=-1),
+	]
+	StubChat.release.set()
+	assert blocker.result(5) == 'released'
+	assert [future.result(5) for future in futures] == ['LATE', 'FIRST', 'SECOND', 'URGENT']
+	assert StubChat.asked == ['urgent', 'first', 'second', 'late']
+
+
+def test_job_still_queued_at_its_deadline_times_out(scheduler):
+	scheduler.submit(StubChat, 'block')
+	expired = scheduler.submit(StubChat, 'too late', deadline=0.05)
+	threading.Timer(0.2, StubChat.release.set).start()
+	with pytest.raises(TimeoutError, match="queued"):
+		expired.result(5)
+	assert StubChat.asked == []
+
+
+def test_running_job_is_cancelled_at_its_deadline(scheduler):
+	future = scheduler.submit(StubChat, 'hang', deadline=0.1)
+	with pytest.raises(TimeoutError, match="running"):
+		future.result(5)
+	# The worker carries on with the next job.
+	assert scheduler.submit(StubChat, 'next').result(5) == 'NEXT'
+
+
+def test_streamed_job_resolves_to_the_settled_answer(scheduler):
+	deltas = []
+	future = scheduler.submit(StubChat, 'hi', on_delta=deltas.append)
+	assert future.result(5) == 'Hello.'
+	assert deltas == ['hel', 'lo']
+
+
+def test_unknown_provider_and_shutdown(scheduler):
+	class Other:
+		pass
+
+	with pytest.raises(KeyError):
+		scheduler.submit(Other, 'hi')
+	scheduler.shutdown()
+	with pytest.raises(RuntimeError):
+		scheduler.submit(StubChat, 'hi')
+
+
+def test_rate_limiter_spaces_starts():
+	limiter = RateLimiter(per_minute=60)
+	assert limiter.reserve() == 0
+	assert limiter.reserve() == pytest.approx(1.0, abs=0.05)
+	assert RateLimiter(None).reserve() == 0
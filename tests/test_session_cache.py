@@ -0,0 +1,88 @@
+import pytest
+
+pytest.importorskip('custom_logger')
+pytest.importorskip('requests')
+
+from chat_bot_ui_handler.session_cache import _signed_in_url
+
+
+@pytest.mark.parametrize('url, signed_in', [
+	('https://myaccount.google.com/', True),
+	('https://myaccount.google.com', True),
+	('https://myaccount.google.com/u/1/', True),
+	('https://myaccount.google.com/?pli=1', True),
+	('https://accounts.google.com/v3/signin/identifier?continue=https%3A%2F%2Fmyaccount.google.com%2F', False),
+	('https://accounts.google.com/ServiceLogin?continue=https://myaccount.google.com/', False),
+	('https://myaccount.google.com.example.com/', False),
+	('https://www.google.com/', False),
+	('', False),
+])
+def test_signed_in_url(url, signed_in):
+	assert _signed_in_url(url) is signed_in
+
+
+SNAPSHOT = {
+	'cookies': [
+		{'name': 'SID', 'value': 'snapshot', 'domain': '.google.com', 'path': '/'},
+		{'name': 'HSID', 'value': 'snapshot', 'domain': '.google.com', 'path': '/'},
+	],
+	'origins': [{'origin': 'https://gemini.google.com', 'localStorage': [{'name': 'k', 'value': 'v'}]}],
+}
+
+
+class Context:
+	def __init__(self, cookies=()):
+		self.live = [dict(cookie) for cookie in cookies]
+		self.scripts = []
+
+	def cookies(self):
+		return self.live
+
+	def add_cookies(self, cookies):
+		keys = {(c['name'], c['domain'], c['path']) for c in cookies}
+		self.live = [c for c in self.live if (c['name'], c['domain'], c['path']) not in keys] + list(cookies)
+
+	def add_init_script(self, script):
+		self.scripts.append(script)
+
+
+class Page:
+	def __init__(self, context):
+		self.context = context
+
+
+@pytest.fixture
+def cache(tmp_path):
+	from chat_bot_ui_handler.session_cache import SessionCache
+
+	cache = SessionCache(str(tmp_path))
+	cache.store('me@example.com', SNAPSHOT)
+	return cache
+
+
+def test_restore_fills_an_empty_context_once(cache):
+	context = Context()
+	assert cache.restore(Page(context), 'me@example.com')
+	assert {c['value'] for c in context.live} == {'snapshot'}
+	assert len(context.scripts) == 1
+
+	# A second chat on the same context: its session is live now, nothing is added.
+	assert not cache.restore(Page(context), 'me@example.com')
+	assert len(context.scripts) == 1
+
+
+def test_restore_keeps_a_live_session_until_replace(cache):
+	live = [{'name': 'SID', 'value': 'live', 'domain': '.google.com', 'path': '/'}]
+	context = Context(live)
+	assert not cache.restore(Page(context), 'me@example.com')
+	assert context.live == live
+	assert context.scripts == []
+
+	assert cache.restore(Page(context), 'me@example.com', replace=True)
+	assert {c['value'] for c in context.live} == {'snapshot'}
+	# Nothing left to try once the context holds the snapshot.
+	assert not cache.restore(Page(context), 'me@example.com', replace=True)
+
+
+def test_restore_without_a_snapshot(cache):
+	assert not cache.restore(Page(Context()), 'someone-else@example.com')
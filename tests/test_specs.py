@@ -0,0 +1,122 @@
+import json
+import os
+
+import pytest
+
+from chat_bot_ui_handler.specs import BUILTIN_DIR, CompiledSpec, SpecError, SpecHandler, SpecRegistry
+
+
+def spec(**fields):
+	base = {
+		'name': 'example',
+		'url': 'https://chat.example.com/',
+		'docker_suffix': 'example',
+		'selectors': {'input': 'textarea', 'send_button': 'button.send', 'result': '.answer'},
+	}
+	base.update(fields)
+	return base
+
+
+def write(folder, name, data):
+	path = os.path.join(folder, f"{name}.json")
+	with open(path, 'w', encoding='utf-8') as f:
+		json.dump(data, f)
+	return path
+
+
+def test_builtin_specs_compile():
+	registry = SpecRegistry(dirs=[BUILTIN_DIR], reload_interval=0)
+	assert {'bing', 'grok'} <= set(registry.names())
+
+
+def test_completion_keys_map_to_selectors():
+	compiled = CompiledSpec(spec(completion={'stop_button': 'button.stop', 'quiet_ms': 500}))
+	assert compiled.selectors['stop_button'] == 'button.stop'
+	assert compiled.selectors['quiet_ms'] == 500
+	assert compiled.class_name == 'ExampleUIChat'
+
+
+@pytest.mark.parametrize('fields, message', [
+	({'name': ''}, "needs a name"),
+	({'url': None}, "missing url"),
+	({'selectors': {'input': 'textarea'}}, "missing send_button, result"),
+	({'completion': {'spinner': '.x'}}, "unknown completion key"),
+	({'upload': {'strategy': 'drag'}}, "upload strategy"),
+	({'upload': {'strategy': 'chooser'}}, "needs the selector that opens it"),
+	({'post_process': [{'shout': True}]}, "unknown post_process step"),
+	({'post_process': [{'strip': True, 'after': ':'}]}, "single-key"),
+])
+def test_bad_specs_are_rejected(fields, message):
+	with pytest.raises(SpecError, match=message):
+		CompiledSpec(spec(**fields))
+
+
+def test_extending_spec_needs_no_url_or_selectors():
+	compiled = CompiledSpec({'name': 'gemini-lite', 'extends': 'gemini'})
+	assert compiled.selectors == {}
+
+
+def test_post_process_runs_steps_in_order():
+	compiled = CompiledSpec(spec(post_process=[
+		{'after': 'Answer:'},
+		{'cut_at': ['Sources', 'Related']},
+		{'replace': ['**', '']},
+		{'sub': [r'\s+', ' ']},
+		{'strip': True},
+	]))
+	text = "Thinking...\nAnswer:  The **cat**\n is  grey.\nRelated questions"
+	assert compiled.post_process(text) == "The cat is grey."
+
+
+def test_reload_picks_up_new_changed_and_removed_specs(tmp_path):
+	folder = str(tmp_path)
+	path = write(folder, 'example', spec())
+	registry = SpecRegistry(dirs=[folder], reload_interval=0)
+	assert registry.names() == ['example']
+	assert registry.reload() == []
+
+	write(folder, 'example', spec(url='https://chat.example.com/v2/', extra=1))
+	assert registry.reload() == ['example']
+	assert registry.spec('example').url == 'https://chat.example.com/v2/'
+
+	os.remove(path)
+	assert registry.reload() == ['example']
+	with pytest.raises(KeyError):
+		registry.spec('example')
+
+
+def test_broken_edit_keeps_the_last_good_spec(tmp_path):
+	pytest.importorskip('custom_logger')
+	folder = str(tmp_path)
+	write(folder, 'example', spec())
+	registry = SpecRegistry(dirs=[folder], reload_interval=0)
+	good = registry.spec('example')
+	write(folder, 'example', spec(url=None, padding='x'))
+	assert registry.reload() == []
+	assert registry.spec('example') is good
+
+
+def test_a_chat_keeps_the_spec_it_started_with(tmp_path):
+	folder = str(tmp_path)
+	path = write(folder, 'example', spec())
+	registry = SpecRegistry(dirs=[folder], reload_interval=0)
+
+	class Base:
+		def start_attempt(self):
+			pass
+
+		def finish_attempt(self, ok):
+			pass
+
+	handler = type('ExampleUIChat', (SpecHandler, Base), {'spec_name': 'example', 'spec_registry': registry})()
+	handler.start_attempt()
+	write(folder, 'example', spec(url='https://chat.example.com/v2/', extra=1))
+	registry.reload()
+	assert handler.get_url() == 'https://chat.example.com/'
+	handler.finish_attempt(True)
+	assert handler.get_url() == 'https://chat.example.com/v2/'
+
+	# Once the file is gone, the handler keeps the last spec it saw.
+	os.remove(path)
+	registry.reload()
+	assert handler.get_url() == 'https://chat.example.com/v2/'
@@ -0,0 +1,91 @@
+import os
+
+import pytest
+
+pytest.importorskip('custom_logger')
+
+from chat_bot_ui_handler import uploads
+from chat_bot_ui_handler.uploads import UploadPipeline
+
+LIMITS = {'image_side': 1024, 'image_bytes': 1000, 'video_seconds': 0, 'video_side': 1280}
+
+
+@pytest.fixture
+def shrunk(monkeypatch):
+	"""Stands in for Pillow: every image is 'shrunk' to a marker file. Records the calls"""
+	calls = []
+
+	def fake_shrink(src, dest_base, limits):
+		calls.append((src, limits))
+		with open(src, 'rb') as f:
+			if b'small' in f.read():
+				return None
+		dest = f"{dest_base}.jpg"
+		with open(dest, 'w') as f:
+			f.write(f"shrunk to {limits['image_side']}")
+		return dest
+	monkeypatch.setattr(uploads, '_shrink_image', fake_shrink)
+	return calls
+
+
+@pytest.fixture
+def pipeline(tmp_path, monkeypatch):
+	monkeypatch.delenv('UPLOAD_PREPROCESS', raising=False)
+	return UploadPipeline(cache_dir=str(tmp_path / 'cache'), stage_dir=str(tmp_path / 'attach'))
+
+
+def image(tmp_path, name, data=b'big photo'):
+	path = tmp_path / name
+	path.write_bytes(data)
+	return str(path)
+
+
+def test_same_content_is_processed_once(pipeline, shrunk, tmp_path):
+	first = pipeline.prepare(image(tmp_path, 'a.png'), LIMITS)
+	second = pipeline.prepare(image(tmp_path, 'copy.png'), LIMITS)
+	assert first == second
+	assert first.startswith(pipeline.cache_dir)
+	assert len(shrunk) == 1
+
+
+def test_limits_and_content_are_part_of_the_key(pipeline, shrunk, tmp_path):
+	path = image(tmp_path, 'a.png')
+	small = pipeline.prepare(path, LIMITS)
+	large = pipeline.prepare(path, dict(LIMITS, image_side=2048))
+	assert small != large
+	with open(large) as f:
+		assert f.read() == "shrunk to 2048"
+
+	with open(path, 'wb') as f:
+		f.write(b'another big photo')
+	os.utime(path, ns=(1, 1))
+	assert pipeline.prepare(path, LIMITS) not in (small, large)
+	assert len(shrunk) == 3
+
+
+def test_files_within_the_limits_are_remembered(pipeline, shrunk, tmp_path):
+	path = image(tmp_path, 'a.jpg', b'small photo')
+	assert pipeline.prepare(path, LIMITS) == path
+	assert pipeline.prepare(path, LIMITS) == path
+	assert len(shrunk) == 1
+
+
+def test_other_files_and_disabled_preprocessing_pass_through(tmp_path, shrunk, monkeypatch):
+	pipeline = UploadPipeline(cache_dir=str(tmp_path / 'cache'))
+	document = image(tmp_path, 'notes.pdf')
+	assert pipeline.prepare(document, LIMITS) == document
+	monkeypatch.setenv('UPLOAD_PREPROCESS', '0')
+	photo = image(tmp_path, 'a.png')
+	assert UploadPipeline(cache_dir=str(tmp_path / 'cache')).prepare(photo, LIMITS) == photo
+	assert shrunk == []
+
+
+def test_staging_for_the_attach_folder(pipeline, shrunk, tmp_path):
+	os.makedirs(pipeline.stage_dir)
+	inside = image(tmp_path / 'attach', 'inside.txt')
+	assert pipeline.prepare(inside, LIMITS, attach_folder=True) == 'inside.txt'
+
+	staged = pipeline.prepare(image(tmp_path, 'a.png'), LIMITS, attach_folder=True)
+	assert staged.startswith('.uploads' + os.sep) and staged.endswith('.jpg')
+	with open(os.path.join(pipeline.stage_dir, staged)) as f:
+		assert f.read() == "shrunk to 1024"